@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the AI evolution tree
+Fast-start: data commands use the standard library only, each backend is imported when its command runs
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+sys.path.insert(0, DATA_DIR)
+
+# Importable packages each approach needs, checked without importing them
+BACKENDS = {
+    'matplotlib': ('matplotlib', 'numpy'),
+    'networkx': ('matplotlib', 'numpy', 'networkx'),
+    'artistic': ('matplotlib', 'numpy'),
+    'semicircular': ('matplotlib', 'numpy'),
+    'poster': ('matplotlib', 'numpy'),
+    'perfect': ('numpy', 'cairosvg'),
+    'plotly': ('plotly', 'numpy'),
+}
+D3_DATA_SCRIPT = 'approach_9_d3_ultimate/src/generate_data.py'
+
+
+def _approaches():
+    # build.py only pulls in the standard library at import time
+    from build import APPROACHES
+    return APPROACHES
+
+
+def _load_models(catalog):
+    if catalog:
+        os.environ['AI_TREE_CATALOG'] = catalog
+    from ai_models import AI_MODELS, BREAKTHROUGHS, COLOR_SCHEME
+    return AI_MODELS, BREAKTHROUGHS, COLOR_SCHEME
+
+
+def _run_script(script, argv=()):
+    import runpy
+
+    sys.argv = [script, *argv]
+    runpy.run_path(os.path.join(ROOT, script), run_name='__main__')
+
+
+# --- Commands ----------------------------------------------------------------
+
+def cmd_list(args):
+    """Approaches, their scripts and whether their backend is installed"""
+    from importlib.util import find_spec
+
+    for name, (script, _) in _approaches().items():
+        missing = [pkg for pkg in BACKENDS.get(name, ()) if find_spec(pkg) is None]
+        status = f"missing {', '.join(missing)}" if missing else 'ok'
+        print(f"{name:<14}{script:<60}{status}")
+    return 0
+
+
+def validate(models, breakthroughs=(), color_scheme=None):
+    """Problems in a model list, as messages (empty when the data is sound)"""
+    from tree_index import TreeIndex
+
+    problems = []
+    try:
+        index = TreeIndex.from_models(models)
+    except ValueError as e:
+        return [str(e)]
+    if len(index.roots) != 1:
+        problems.append(f"Expected one root, found {len(index.roots)}: "
+                        f"{', '.join(index.names[r] for r in index.roots[:5])}")
+    for i, (name, parent, year, color, importance, branch_type, extinct) in enumerate(models):
+        if parent and parent not in index.index:
+            problems.append(f"{name}: unknown parent {parent!r}")
+        elif parent and year < models[index.index[parent]][2]:
+            problems.append(f"{name}: year {year} is before its parent {parent!r} "
+                            f"({models[index.index[parent]][2]})")
+        if not (isinstance(color, str) and len(color) == 7 and color.startswith('#')):
+            problems.append(f"{name}: color {color!r} is not #rrggbb")
+        if importance not in (1, 2, 3, 4, 5):
+            problems.append(f"{name}: importance {importance!r} is not 1-5")
+        if color_scheme is not None and branch_type not in color_scheme:
+            problems.append(f"{name}: branch type {branch_type!r} has no color in COLOR_SCHEME")
+        if not isinstance(extinct, bool):
+            problems.append(f"{name}: extinct {extinct!r} is not a bool")
+    for name, _, _ in breakthroughs:
+        if name not in index.index:
+            problems.append(f"Breakthrough {name!r} is not a model")
+    return problems
+
+
+def cmd_validate(args):
+    models, breakthroughs, color_scheme = _load_models(args.catalog)
+    # A synthetic catalog brings its own families, not ai_models.py's
+    problems = validate(models, () if args.catalog else breakthroughs,
+                        None if args.catalog else color_scheme)
+    for problem in problems[:args.max_problems]:
+        print(f"✗ {problem}")
+    if len(problems) > args.max_problems:
+        print(f"  ... and {len(problems) - args.max_problems} more")
+    if problems:
+        return 1
+    print(f"✓ {len(models)} models, no problems")
+    return 0
+
+
+def cmd_stats(args):
+    from collections import Counter
+    from tree_index import TreeIndex
+
+    models, _, _ = _load_models(args.catalog)
+    index = TreeIndex.from_models(models)
+    years = [m[2] for m in models]
+    leaves = sum(1 for kids in index.children if not kids)
+    print(f"Models:      {len(models)}")
+    print(f"Years:       {min(years)}-{max(years)}")
+    print(f"Max depth:   {max(index.depth)}")
+    print(f"Leaves:      {leaves}")
+    print(f"Extinct:     {sum(1 for m in models if m[6])}")
+    print("Families:")
+    for family, count in Counter(m[5] for m in models).most_common():
+        print(f"  {family:<24}{count}")
+    return 0
+
+
+def cmd_data(args):
+    """The D3 hierarchy JSON (approach 9), no plotting libraries involved"""
+    if args.catalog:
+        os.environ['AI_TREE_CATALOG'] = args.catalog
+    if args.output_dir:
+        os.environ['AI_TREE_OUTPUT_DIR'] = args.output_dir
+    if args.chunks or args.split:
+        os.environ['AI_TREE_JSON_FORMAT'] = 'chunks'
+        os.environ['AI_TREE_JSON_SPLIT'] = args.split or 'branch'
+    elif args.columns or args.binary:
+        os.environ['AI_TREE_JSON_FORMAT'] = 'columns'
+    if args.binary:
+        os.environ['AI_TREE_JSON_BINARY'] = '1'
+    if args.compress:
+        os.environ['AI_TREE_JSON_COMPRESS'] = args.compress
+    _run_script(D3_DATA_SCRIPT)
+    return 0
+
+
+def cmd_layout(args):
+    """Radial layout positions; numpy is only imported here"""
+    import json
+    import math
+    from tree_index import TreeIndex
+    from layout_cache import cached_radial_layout
+
+    models, _, _ = _load_models(args.catalog)
+    index = TreeIndex.from_models(models)
+    start = time.time()
+    layout = cached_radial_layout(index, [m[2] for m in models], math.radians(args.start),
+                                  math.radians(args.end), weight=args.weight,
+                                  placement=args.placement)
+    print(f"✓ Layout of {len(index)} models in {time.time() - start:.3f}s", file=sys.stderr)
+    if args.output:
+        if args.output.endswith('.npy'):
+            import numpy as np
+            np.save(args.output, np.stack(layout))
+        else:
+            with open(args.output, 'w') as f:
+                json.dump({'names': index.names, **{field: getattr(layout, field).tolist()
+                                                    for field in layout._fields}}, f)
+        print(f"✓ Saved: {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_render(args):
+    if args.daemon:
+        import render_daemon
+        return render_daemon.main(['render', *args.names]
+                                  + (['--formats', args.formats] if args.formats else []))
+    approaches = _approaches()
+    for name in args.names:
+        if args.formats:
+            os.environ['AI_TREE_FORMATS'] = args.formats
+        _run_script(approaches[name][0])
+    return 0
+
+
+def cmd_build(args):
+    import build
+    return build.main(args.args)
+
+
+def cmd_benchmark(args):
+    import benchmark
+    return benchmark.main(args.args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ai_tree.py',
+                                     description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def command(name, func, help):
+        sub = commands.add_parser(name, help=help, description=help)
+        sub.set_defaults(func=func)
+        return sub
+
+    command('list', cmd_list, "approaches and whether their backend is installed")
+    sub = command('validate', cmd_validate, "check the dataset (parents, years, colors, ...)")
+    sub.add_argument('--catalog', help="check a catalog file instead of data/ai_models.py")
+    sub.add_argument('--max-problems', type=int, default=50)
+    sub = command('stats', cmd_stats, "dataset summary")
+    sub.add_argument('--catalog')
+    sub = command('data', cmd_data, "write the D3 hierarchy JSON (ai_data.json)")
+    sub.add_argument('--catalog')
+    sub.add_argument('--output-dir', help="default: approach_9_d3_ultimate/src/")
+    sub.add_argument('--columns', action='store_true',
+                     help="columnar ai_data.columns.json instead of the nested hierarchy")
+    sub.add_argument('--chunks', action='store_true',
+                     help="ai_data_chunks/: a manifest and content-hashed subtree chunks "
+                          "that the viewers load on demand")
+    sub.add_argument('--split', choices=('branch', 'family'),
+                     help="chunks per branch under Transformers (default) or per family")
+    sub.add_argument('--binary', action='store_true',
+                     help="columnar, numbers as base64 typed arrays")
+    sub.add_argument('--compress', help="precompressed copies, e.g. gz,br")
+    sub = command('layout', cmd_layout, "compute (and cache) a radial layout")
+    sub.add_argument('--catalog')
+    sub.add_argument('--start', type=float, default=-180, help="start angle in degrees")
+    sub.add_argument('--end', type=float, default=180, help="end angle in degrees")
+    sub.add_argument('--weight', choices=('leaves', 'descendants'), default='leaves')
+    sub.add_argument('--placement', choices=('center', 'centroid'), default='centroid')
+    sub.add_argument('-o', '--output', help="positions as .json or .npy")
+    sub = command('render', cmd_render, "run approach scripts in this process")
+    sub.add_argument('names', nargs='+', choices=sorted(BACKENDS), metavar='NAME')
+    sub.add_argument('--formats', help="same as AI_TREE_FORMATS, e.g. png,svg")
+    sub.add_argument('--daemon', action='store_true',
+                     help="render through a running render_daemon.py (warm start)")
+    for name, func, help in (('build', cmd_build, "the cached, parallel gallery build (build.py)"),
+                             ('benchmark', cmd_benchmark, "the cross-approach benchmark (benchmark.py)")):
+        sub = command(name, func, help)
+        sub.add_argument('args', nargs=argparse.REMAINDER, help="passed on unchanged")
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
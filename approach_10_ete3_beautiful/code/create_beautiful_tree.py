@@ -8,10 +8,11 @@ from ete3 import Tree, TreeStyle, NodeStyle, TextFace, faces, AttrFace
 import sys
 import os
 
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS
 
-os.makedirs("../output", exist_ok=True)
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 print("="*80)
 print("CREATING BEAUTIFUL PHYLOGENETIC TREE WITH ETE3")
@@ -187,15 +188,15 @@ print("\n🖼️  Rendering beautiful tree...")
 
 try:
     # Render to PNG at high resolution
-    t.render("../output/ai_tree_ete3_beautiful.png", w=4000, h=4000, dpi=300, tree_style=ts)
+    t.render(os.path.join(OUTPUT_DIR, "ai_tree_ete3_beautiful.png"), w=4000, h=4000, dpi=300, tree_style=ts)
     print("✓ Saved: ai_tree_ete3_beautiful.png (4000x4000, 300 DPI)")
 
     # PDF for vector
-    t.render("../output/ai_tree_ete3_beautiful.pdf", tree_style=ts)
+    t.render(os.path.join(OUTPUT_DIR, "ai_tree_ete3_beautiful.pdf"), tree_style=ts)
     print("✓ Saved: ai_tree_ete3_beautiful.pdf (vector)")
 
     # SVG for web
-    t.render("../output/ai_tree_ete3_beautiful.svg", tree_style=ts)
+    t.render(os.path.join(OUTPUT_DIR, "ai_tree_ete3_beautiful.svg"), tree_style=ts)
     print("✓ Saved: ai_tree_ete3_beautiful.svg (vector)")
 
 except Exception as e:
@@ -203,7 +204,7 @@ except Exception as e:
     print("Trying alternative rendering...")
 
     # Fallback - render with display mode
-    t.render("../output/ai_tree_ete3_beautiful.png", tree_style=ts)
+    t.render(os.path.join(OUTPUT_DIR, "ai_tree_ete3_beautiful.png"), tree_style=ts)
     print("✓ Saved: ai_tree_ete3_beautiful.png")
 
 print("\n" + "="*80)
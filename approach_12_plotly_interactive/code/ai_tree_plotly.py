@@ -4,9 +4,6 @@ AI Evolution Tree - Interactive Plotly Visualization
 Approach 12: Interactive web-based tree with zoom, pan, and hover details
 """
 
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 import numpy as np
 from math import radians, cos, sin, pi
 import sys
@@ -15,6 +12,30 @@ import os
 # Add parent directory to path to import data
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from data.ai_models import AI_MODELS, COLOR_SCHEME, EXTINCTION_EVENTS, BREAKTHROUGHS
+from data.tree_index import TreeIndex, build_tree_dict
+from data.layout_cache import cached_array, layout_key, tree_hash
+from data import instrument
+
+# Code behind _compute_angles (it counts subtrees through TreeIndex), hashed
+# into the key of its cached result
+_ANGLE_SOURCES = (os.path.abspath(__file__), sys.modules[TreeIndex.__module__].__file__)
+
+# From this many models on, create_interactive_tree() draws the large-tree mode
+LARGE_TREE_MODELS = 5000
+
+
+def large_tree_mode(n_models):
+    """AI_TREE_PLOTLY_LARGE=1/0 forces the large-tree mode on/off; otherwise
+    it is on from LARGE_TREE_MODELS models"""
+    value = os.environ.get('AI_TREE_PLOTLY_LARGE', '').strip().lower()
+    if value:
+        return value in ('1', 'true', 'yes')
+    return n_models >= LARGE_TREE_MODELS
+
+
+def _rgba(color, alpha):
+    return f"rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, {alpha})"
+
 
 class PlotlyAITree:
     def __init__(self):
@@ -22,6 +43,7 @@ class PlotlyAITree:
         self.color_scheme = COLOR_SCHEME
         self.extinction_events = EXTINCTION_EVENTS
         self.breakthroughs = BREAKTHROUGHS
+        self.tree_index = TreeIndex.from_models(self.models)
         
         # Layout parameters
         self.max_radius = 10
@@ -31,84 +53,63 @@ class PlotlyAITree:
         
     def build_tree_structure(self):
         """Build hierarchical tree structure from models data"""
-        # Create model lookup
-        model_dict = {name: {'parent': parent, 'year': year, 'color': color, 
-                           'importance': importance, 'branch_type': branch_type, 
-                           'extinct': extinct}
-                     for name, parent, year, color, importance, branch_type, extinct in self.models}
-        
-        # Build tree structure
-        tree = {}
-        for name, data in model_dict.items():
-            tree[name] = {
-                'parent': data['parent'],
-                'children': [],
-                'year': data['year'],
-                'color': data['color'],
-                'importance': data['importance'],
-                'branch_type': data['branch_type'],
-                'extinct': data['extinct']
-            }
-        
-        # Add children relationships
-        for name, data in tree.items():
-            if data['parent']:
-                tree[data['parent']]['children'].append(name)
-        
-        return tree
+        return build_tree_dict(self.models, self.tree_index)
     
     def calculate_positions(self, tree):
-        """Calculate radial positions for all nodes"""
-        positions = {}
-        
-        # Get root node
-        root = None
-        for name, data in tree.items():
-            if data['parent'] is None:
-                root = name
-                break
-        
-        if not root:
+        """Angular positions for all nodes, cached on disk per tree shape"""
+        angles = self.angle_array()
+        return {name: float(a) for name, a in zip(self.tree_index.names, angles)
+                if not np.isnan(a)}
+
+    def angle_array(self):
+        """_compute_angles, cached on disk per tree shape"""
+        key = layout_key('plotly_angular', tree_hash(self.tree_index.parent), {},
+                         source=_ANGLE_SOURCES)
+        return cached_array(key, self._compute_angles)
+
+    def _compute_angles(self):
+        """Angle per model (NaN outside the root's subtree).
+
+        The root sits at 0 and spans the half circle from the top. Each
+        node's children are spread evenly over its span, and each child gets
+        a span of its own in proportion to its subtree size. Every child
+        depends only on its parent, so a whole tree level is placed at once.
+        """
+        index = self.tree_index
+        root = next((i for i, m in enumerate(self.models) if m[1] is None), None)
+        if root is None:
             raise ValueError("No root node found")
-        
-        # Calculate angular distribution for children
-        def assign_angles(node_name, start_angle, angle_span):
-            if node_name not in tree:
-                return
-            
-            children = tree[node_name]['children']
-            if not children:
-                return
-            
-            # Distribute children evenly in the angle span
-            child_angles = []
-            for i, child in enumerate(children):
-                angle = start_angle + (i / (len(children) - 1)) * angle_span if len(children) > 1 else start_angle + angle_span / 2
-                child_angles.append(angle)
-            
-            # Recursively assign angles to grandchildren
-            for child, angle in zip(children, child_angles):
-                positions[child] = angle
-                # Calculate how much space this subtree needs
-                subtree_size = self._count_descendants(tree, child)
-                child_span = (angle_span / len(children)) * (subtree_size / sum(self._count_descendants(tree, c) for c in children))
-                assign_angles(child, angle - child_span/2, child_span)
-        
-        # Start with full circle for root
-        positions[root] = 0
-        assign_angles(root, -pi/2, pi)  # Start from top, span half circle
-        
-        return positions
-    
-    def _count_descendants(self, tree, node_name):
-        """Count total descendants of a node"""
-        if node_name not in tree:
-            return 0
-        
-        count = 1  # Count self
-        for child in tree[node_name]['children']:
-            count += self._count_descendants(tree, child)
-        return count
+
+        parent = np.asarray(index.parent)
+        size = np.asarray(index.subtree_size, dtype=np.float64)
+        n = len(parent)
+        n_children = np.bincount(parent[parent >= 0], minlength=n)
+        # Position of each node among its parent's children (dataset order)
+        by_parent = np.argsort(parent, kind='stable')
+        first = np.flatnonzero(np.diff(parent[by_parent], prepend=-2))
+        rank = np.empty(n, dtype=np.int64)
+        rank[by_parent] = np.arange(n) - np.repeat(first, np.diff(first, append=n))
+
+        # The root's subtree, level by level
+        pre_pos = np.asarray(index.pre_pos)
+        subtree = np.asarray(index.preorder[pre_pos[root]:pre_pos[root] + index.subtree_size[root]])
+        depth = np.asarray(index.depth)[subtree]
+        levels = np.split(subtree[np.argsort(depth, kind='stable')],
+                          np.flatnonzero(np.diff(np.sort(depth))) + 1)
+
+        angle = np.full(n, np.nan)
+        start = np.zeros(n)
+        span = np.zeros(n)
+        angle[root], start[root], span[root] = 0, -pi/2, pi
+        for level in levels[1:]:
+            p = parent[level]
+            k = n_children[p]
+            angle[level] = np.where(k > 1, start[p] + (rank[level] / np.maximum(k - 1, 1)) * span[p],
+                                    start[p] + span[p] / 2)
+            # Children share the parent's span by subtree size
+            span[level] = (span[p] / k) * (size[level] / (size[p] - 1))
+            start[level] = angle[level] - span[level] / 2
+        return angle
     
     def calculate_radial_positions(self, tree):
         """Calculate radial distances based on years"""
@@ -125,13 +126,43 @@ class PlotlyAITree:
         
         return radial_positions
     
-    def create_interactive_tree(self):
-        """Create interactive Plotly tree visualization"""
+    def timeline_rings(self):
+        """(x, y) of the dotted year rings, one None-separated polyline"""
+        timeline_rings_x = []
+        timeline_rings_y = []
+        
+        years = [1958, 1960, 1970, 1980, 1990, 2000, 2010, 2015, 2020, 2025]
+        for year in years:
+            normalized_year = (year - 1958) / (2025 - 1958)
+            radius = self.min_radius + normalized_year * (self.max_radius - self.min_radius)
+            
+            # Create circle
+            angles = np.linspace(0, 2*pi, 100)
+            ring_x = [self.center_x + radius * cos(a) for a in angles]
+            ring_y = [self.center_y + radius * sin(a) for a in angles]
+            
+            timeline_rings_x.extend(ring_x + [None])
+            timeline_rings_y.extend(ring_y + [None])
+        return timeline_rings_x, timeline_rings_y
+    
+    def create_interactive_tree(self, large=None):
+        """Create interactive Plotly tree visualization (the large-tree mode
+        for big catalogs, see large_tree_mode)"""
+        if large is None:
+            large = large_tree_mode(len(self.models))
+        if large:
+            return self.create_large_tree()
+        # Imported here so the data/layout methods work without plotly loaded
+        import plotly.graph_objects as go
+        
+        instrument.stage("build tree")
         tree = self.build_tree_structure()
+        instrument.stage("layout")
         angular_positions = self.calculate_positions(tree)
         radial_positions = self.calculate_radial_positions(tree)
         
         # Prepare data for plotting
+        instrument.stage("nodes")
         nodes_x = []
         nodes_y = []
         node_text = []
@@ -168,7 +199,10 @@ class PlotlyAITree:
             
             hover_text.append(hover)
         
+        instrument.count(len(nodes_x))
+        
         # Create edge data
+        instrument.stage("branches")
         edge_x = []
         edge_y = []
         edge_colors = []
@@ -200,24 +234,14 @@ class PlotlyAITree:
                 
                 edge_colors.append(edge_color)
         
-        # Create timeline rings
-        timeline_rings_x = []
-        timeline_rings_y = []
+        instrument.count(len(edge_colors))
         
-        years = [1958, 1960, 1970, 1980, 1990, 2000, 2010, 2015, 2020, 2025]
-        for year in years:
-            normalized_year = (year - 1958) / (2025 - 1958)
-            radius = self.min_radius + normalized_year * (self.max_radius - self.min_radius)
-            
-            # Create circle
-            angles = np.linspace(0, 2*pi, 100)
-            ring_x = [self.center_x + radius * cos(a) for a in angles]
-            ring_y = [self.center_y + radius * sin(a) for a in angles]
-            
-            timeline_rings_x.extend(ring_x + [None])
-            timeline_rings_y.extend(ring_y + [None])
+        # Create timeline rings
+        instrument.stage("rings")
+        timeline_rings_x, timeline_rings_y = self.timeline_rings()
         
         # Create the plot
+        instrument.stage("traces")
         fig = go.Figure()
         
         # Add timeline rings
@@ -289,10 +313,15 @@ class PlotlyAITree:
                 hoverinfo='skip'
             ))
         
-        # Update layout
+        self._update_layout(fig, "AI Evolution Tree (1958-2025) - Interactive")
+        instrument.count(len(fig.data))
+        
+        return fig
+    
+    def _update_layout(self, fig, title):
         fig.update_layout(
             title=dict(
-                text="AI Evolution Tree (1958-2025) - Interactive",
+                text=title,
                 x=0.5,
                 font=dict(size=20)
             ),
@@ -315,6 +344,112 @@ class PlotlyAITree:
             height=800,
             margin=dict(l=50, r=50, t=80, b=50)
         )
+    
+    def large_tree_positions(self):
+        """(x, y) per model as arrays, from the cached angle_array"""
+        years = np.array([m[2] for m in self.models], dtype=np.float64)
+        angles = self.angle_array()
+        # Map year to radius as calculate_radial_positions does
+        span = (years.max() - years.min()) or 1
+        radius = self.min_radius + (years - years.min()) / span * (self.max_radius - self.min_radius)
+        return self.center_x + radius * np.cos(angles), self.center_y + radius * np.sin(angles)
+    
+    def create_large_tree(self):
+        """WebGL figure for catalogs far beyond AI_MODELS (100k+ models).
+        
+        Scattergl traces only: branches batched into one trace per family
+        color (extinct ones fainter), nodes into one per family, color and
+        status. Numbers go
+        in as small numpy dtypes, which plotly writes as base64 typed arrays,
+        and each trace has one hovertemplate over customdata (year,
+        importance) instead of an HTML string per node. Nodes are not
+        labelled; names show on hover.
+        """
+        import plotly.graph_objects as go
+        
+        instrument.stage("layout")
+        x, y = self.large_tree_positions()
+        parent = np.asarray(self.tree_index.parent)
+        names = [m[0] for m in self.models]
+        years = np.array([m[2] for m in self.models], dtype=np.uint16)
+        colors = np.array([m[3] for m in self.models])
+        importance = np.array([m[4] for m in self.models], dtype=np.uint8)
+        families = np.array([m[5] for m in self.models])
+        extinct = np.array([m[6] for m in self.models], dtype=bool)
+        instrument.count(len(names))
+        
+        fig = go.Figure()
+        instrument.stage("rings")
+        rings_x, rings_y = self.timeline_rings()
+        fig.add_trace(go.Scattergl(
+            x=np.array(rings_x, dtype=np.float32),
+            y=np.array(rings_y, dtype=np.float32),
+            mode='lines',
+            line=dict(color='lightgray', width=1, dash='dot'),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        
+        # One polyline per color and status: parent, child, NaN (a gap) per edge
+        instrument.stage("branches")
+        child = np.flatnonzero(parent >= 0)
+        edges = 0
+        for color in np.unique(colors[child]):
+            for dead in (False, True):
+                rows = child[(colors[child] == color) & (extinct[child] == dead)]
+                if not len(rows):
+                    continue
+                gap = np.full(len(rows), np.nan)
+                fig.add_trace(go.Scattergl(
+                    x=np.column_stack([x[parent[rows]], x[rows], gap]).ravel().astype(np.float32),
+                    y=np.column_stack([y[parent[rows]], y[rows], gap]).ravel().astype(np.float32),
+                    mode='lines',
+                    line=dict(color=_rgba(color, 0.3 if dead else 0.8), width=1),
+                    showlegend=False,
+                    hoverinfo='skip'
+                ))
+                edges += len(rows)
+        instrument.count(edges)
+        
+        instrument.stage("nodes")
+        groups = {}
+        for i, group in enumerate(zip(families.tolist(), colors.tolist(), extinct.tolist())):
+            groups.setdefault(group, []).append(i)
+        for (family, color, dead), rows in sorted(groups.items()):
+            rows = np.array(rows)
+            status = "Extinct" if dead else "Active"
+            fig.add_trace(go.Scattergl(
+                x=x[rows].astype(np.float32),
+                y=y[rows].astype(np.float32),
+                mode='markers',
+                # Size based on importance, as in the standard mode but smaller
+                marker=dict(size=(2 + importance[rows]).astype(np.uint8), color=color, opacity=0.8),
+                text=[names[i] for i in rows],
+                customdata=np.column_stack([years[rows], importance[rows]]).astype(np.uint16),
+                hovertemplate=("<b>%{text}</b><br>Year: %{customdata[0]}<br>"
+                               f"Branch: {family}<br>Importance: %{{customdata[1]}}/5<br>"
+                               f"Status: {status}<extra></extra>"),
+                showlegend=False
+            ))
+        
+        # Breakthrough markers
+        rows = [self.tree_index.index[name] for name, _, _ in self.breakthroughs
+                if name in self.tree_index.index]
+        if rows:
+            fig.add_trace(go.Scattergl(
+                x=x[rows].astype(np.float32),
+                y=y[rows].astype(np.float32),
+                mode='markers',
+                marker=dict(size=14, color='gold', symbol='star'),
+                text=[names[i] for i in rows],
+                hovertemplate="<b>%{text}</b><extra></extra>",
+                showlegend=False
+            ))
+        
+        instrument.stage("traces")
+        self._update_layout(fig, f"AI Evolution Tree ({int(years.min())}-{int(years.max())}) - "
+                                 f"{len(names):,} models")
+        instrument.count(len(fig.data))
         
         return fig
     
@@ -322,9 +457,12 @@ class PlotlyAITree:
         """Save interactive tree as HTML file"""
         fig = self.create_interactive_tree()
         
-        output_path = os.path.join(os.path.dirname(__file__), '..', 'output', filename)
+        output_dir = (os.environ.get('AI_TREE_OUTPUT_DIR') or
+                      os.path.join(os.path.dirname(__file__), '..', 'output'))
+        output_path = os.path.join(output_dir, filename)
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        instrument.stage("save html")
         fig.write_html(output_path, config={'displayModeBar': True})
         print(f"Interactive tree saved to: {output_path}")
         
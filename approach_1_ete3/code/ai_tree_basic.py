@@ -8,7 +8,8 @@ from ete3 import Tree, TreeStyle, NodeStyle, TextFace, CircleFace
 import os
 
 # Create output directory
-os.makedirs("../output", exist_ok=True)
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Build a basic tree structure with key milestones (Newick format)
 # Using a simplified subset to test layout and styling
@@ -100,7 +101,7 @@ ts.title.add_face(TextFace("AI Evolution Tree (Basic Test - ETE3)", fsize=20, bo
 
 # Render the tree
 print("Rendering basic AI evolution tree with ETE3...")
-output_file = "../output/ai_tree_basic"
+output_file = os.path.join(OUTPUT_DIR, "ai_tree_basic")
 
 # Try rendering to different formats
 try:
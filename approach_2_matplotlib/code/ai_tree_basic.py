@@ -12,7 +12,8 @@ from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
 import os
 
 # Create output directory
-os.makedirs("../output", exist_ok=True)
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Define a simple tree structure for testing
 # Format: (name, parent, year, color, importance)
@@ -177,7 +178,7 @@ ax.set_yticks([])
 
 # Save outputs
 print("Rendering basic AI evolution tree with Matplotlib...")
-output_base = "../output/ai_tree_basic_matplotlib"
+output_base = os.path.join(OUTPUT_DIR, "ai_tree_basic_matplotlib")
 
 plt.savefig(f"{output_base}.png", dpi=300, bbox_inches='tight', facecolor='white')
 print(f"✓ Rendered PNG: {output_base}.png")
@@ -14,87 +14,47 @@ import sys
 import os
 
 # Add data directory to path
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS, EXTINCTION_EVENTS, BREAKTHROUGHS
+from model_store import ModelStore
+from tree_index import TreeIndex, build_tree_dict
+from layout_cache import cached_radial_layout
+from label_index import PointLabelIndex
+from export import export_figure
+import instrument
 
 # Create output directory
-os.makedirs("../output", exist_ok=True)
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+instrument.stage("build tree")
 print("Building complete AI evolution tree...")
 print(f"Total models: {len(AI_MODELS)}")
 
-# Build tree structure
-tree_dict = {}
-for model_data in AI_MODELS:
-    name, parent, year, color, importance, branch_type, extinct = model_data
-    tree_dict[name] = {
-        'parent': parent,
-        'year': year,
-        'color': color,
-        'importance': importance,
-        'branch_type': branch_type,
-        'extinct': extinct,
-        'children': []
-    }
-
-# Link children to parents
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in tree_dict:
-        tree_dict[data['parent']]['children'].append(name)
+# Build tree structure once; subtree counts come from the shared index
+model_store = ModelStore.from_records(AI_MODELS)
+tree_index = TreeIndex.from_store(model_store)
+tree_dict = build_tree_dict(AI_MODELS, tree_index)
 
 print(f"Tree structure built. Root: Perceptron with {len(tree_dict['Perceptron']['children'])} main branches")
 
-# Assign positions with improved algorithm
-def assign_positions(tree_dict, root_name, start_angle, end_angle, min_year=1958, max_year=2026):
-    """Recursively assign polar coordinates with better angular distribution"""
-    positions = {}
-
-    def count_descendants(name):
-        """Count total descendants to weight angular space"""
-        node = tree_dict[name]
-        if not node['children']:
-            return 1
-        return sum(count_descendants(child) for child in node['children']) + 1
-
-    def recurse(name, angle_start, angle_end, depth=0):
-        node = tree_dict[name]
-        year = node['year']
-
-        # Radial position based on year
-        radius = (year - min_year) / (max_year - min_year)
-
-        # Angular position
-        children = node['children']
-        if children:
-            # Center parent between children
-            angle = (angle_start + angle_end) / 2
-        else:
-            # Leaf node - use middle of span
-            angle = (angle_start + angle_end) / 2
-
-        positions[name] = (radius, angle)
-
-        # Allocate angular space to children based on their descendant counts
-        if children:
-            total_descendants = sum(count_descendants(child) for child in children)
-            current_angle = angle_start
-
-            for child in children:
-                child_descendants = count_descendants(child)
-                child_span = (angle_end - angle_start) * (child_descendants / total_descendants)
-                recurse(child, current_angle, current_angle + child_span, depth + 1)
-                current_angle += child_span
-
-    recurse(root_name, start_angle, end_angle)
-    return positions
+# Assign positions with the shared vectorized layout engine
+def assign_positions(tree_index, years, start_angle, end_angle, min_year=1958, max_year=2026):
+    """Polar coordinates with angular space weighted by descendant counts"""
+    layout = cached_radial_layout(tree_index, years, start_angle, end_angle,
+                                  weight='descendants', min_year=min_year, max_year=max_year)
+    radius, angle = layout.radius.tolist(), layout.angle.tolist()
+    return {tree_index.names[i]: (radius[i], angle[i]) for i in tree_index.preorder}
 
+instrument.stage("layout")
 print("Calculating node positions...")
-positions = assign_positions(tree_dict, "Perceptron", -np.pi, np.pi)
+positions = assign_positions(tree_index, model_store.year, -np.pi, np.pi)
 
 # Create figure with high resolution
 fig = plt.figure(figsize=(24, 24))
 ax = fig.add_subplot(111, projection='polar')
 
+instrument.stage("branches", fig)
 print("Rendering branches and nodes...")
 
 # Draw branches first (background layer)
@@ -114,6 +74,7 @@ for name, data in tree_dict.items():
                 solid_capstyle='round', zorder=1)
 
 # Draw nodes (middle layer)
+instrument.stage("nodes")
 for name, (radius, angle) in positions.items():
     node_data = tree_dict[name]
 
@@ -126,23 +87,11 @@ for name, (radius, angle) in positions.items():
               edgecolors='black', linewidths=0.5, alpha=alpha, zorder=2)
 
 # Add labels (top layer) - selective labeling to avoid clutter
+instrument.stage("labels")
 print("Adding labels...")
 LABEL_THRESHOLD = 3  # Only label important nodes
-labeled_positions = []
-
-def is_label_clear(angle, radius, min_distance=0.08):
-    """Check if label position is clear of other labels"""
-    for prev_angle, prev_radius in labeled_positions:
-        # Calculate angular distance (handle wraparound)
-        angle_diff = abs(angle - prev_angle)
-        if angle_diff > np.pi:
-            angle_diff = 2 * np.pi - angle_diff
-
-        # Euclidean-ish distance in polar space
-        dist = np.sqrt((radius - prev_radius)**2 + (radius * angle_diff)**2)
-        if dist < min_distance:
-            return False
-    return True
+# Placed labels in a polar grid hash (angular distance wraps around)
+labeled_positions = PointLabelIndex(0.08, polar=True)
 
 for name, (radius, angle) in positions.items():
     node_data = tree_dict[name]
@@ -151,7 +100,7 @@ for name, (radius, angle) in positions.items():
     is_breakthrough = any(name == b[0] for b in BREAKTHROUGHS)
 
     if node_data['importance'] >= LABEL_THRESHOLD or is_breakthrough:
-        if radius > 0.05 and is_label_clear(angle, radius):
+        if radius > 0.05 and labeled_positions.is_clear(angle, radius):
             # Text angle for readability
             text_angle = np.degrees(angle)
             if text_angle > 90 and text_angle < 270:
@@ -175,9 +124,10 @@ for name, (radius, angle) in positions.items():
                    ha=ha, va='center', fontsize=fontsize,
                    fontweight=fontweight, alpha=0.9)
 
-            labeled_positions.append((angle, radius))
+            labeled_positions.add(angle, radius)
 
 # Add timeline rings
+instrument.stage("rings")
 print("Adding timeline rings...")
 year_labels = [1960, 1970, 1980, 1990, 2000, 2010, 2015, 2020, 2025]
 for year in year_labels:
@@ -193,6 +143,7 @@ for year in year_labels:
            ha='left', va='center', alpha=0.6)
 
 # Add extinction event markers
+instrument.stage("extinction events")
 print("Adding extinction event markers...")
 for event_name, start_year, end_year in EXTINCTION_EVENTS:
     r_start = (start_year - 1958) / (2026 - 1958)
@@ -224,6 +175,7 @@ title_text = "Phylogenetic Tree of Artificial Intelligence\nFrom Perceptrons to
 ax.set_title(title_text, fontsize=22, fontweight='bold', pad=30, loc='center')
 
 # Add legend for major branches
+instrument.stage("legend")
 print("Adding legend...")
 from matplotlib.patches import Patch
 legend_elements = [
@@ -249,17 +201,18 @@ legend = ax.legend(handles=legend_elements, loc='upper left',
 subtitle = "Branch thickness = model importance  |  Faded = deprecated/extinct  |  ⭐ = major innovation  |  💥 = breakthrough  |  💀 = extinction event"
 fig.text(0.5, 0.02, subtitle, ha='center', fontsize=9, style='italic', color='gray')
 
+instrument.stage("save")
 print("Saving outputs...")
-output_base = "../output/ai_tree_full_matplotlib"
-
-plt.savefig(f"{output_base}.png", dpi=300, bbox_inches='tight', facecolor='white')
-print(f"✓ Rendered PNG: {output_base}.png")
-
-plt.savefig(f"{output_base}.pdf", bbox_inches='tight', facecolor='white')
-print(f"✓ Rendered PDF: {output_base}.pdf")
-
-plt.savefig(f"{output_base}.svg", bbox_inches='tight', facecolor='white')
-print(f"✓ Rendered SVG: {output_base}.svg")
+output_base = os.path.join(OUTPUT_DIR, "ai_tree_full_matplotlib")
+
+# One tight-bbox pass, formats written in parallel (AI_TREE_FORMATS=png,svg to pick)
+exports = {
+    'png': (f"{output_base}.png", {'dpi': 300}),
+    'pdf': (f"{output_base}.pdf", {}),
+    'svg': (f"{output_base}.svg", {}),
+}
+for fmt, path in export_figure(fig, exports, facecolor='white'):
+    print(f"✓ Rendered {fmt.upper()}: {path}")
 
 print("\n" + "="*70)
 print("FULL DATASET VISUALIZATION COMPLETE - Matplotlib Approach")
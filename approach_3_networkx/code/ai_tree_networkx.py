@@ -13,12 +13,20 @@ import sys
 import os
 
 # Add data directory to path
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS, EXTINCTION_EVENTS, BREAKTHROUGHS
+from tree_index import TreeIndex
+from layout import polar_to_xy
+from layout_cache import cached_radial_layout
+from label_index import PointLabelIndex
+from export import export_figure
+import instrument
 
 # Create output directory
-os.makedirs("../output", exist_ok=True)
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+instrument.stage("build tree")
 print("Building AI evolution tree with NetworkX...")
 print(f"Total models: {len(AI_MODELS)}")
 
@@ -42,72 +50,32 @@ for model_data in AI_MODELS:
 
 print(f"Graph created: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
 
+# Leaf counts and traversal orders for the layout engine
+tree_index = TreeIndex.from_models(AI_MODELS)
+
 # Custom radial layout based on tree hierarchy
-def hierarchical_radial_layout(G, root, min_year=1958, max_year=2026):
+def hierarchical_radial_layout(G, min_year=1958, max_year=2026):
     """
     Create radial layout where:
     - Radius = year (temporal position)
-    - Angle = hierarchical position in tree
+    - Angle = hierarchical position in tree (leaf-weighted spans,
+      parents at the average angle of their children)
     """
-    pos = {}
-
-    # Get all descendants for angular allocation
-    def get_leaf_count(node):
-        """Count leaf nodes in subtree"""
-        successors = list(G.successors(node))
-        if not successors:
-            return 1
-        return sum(get_leaf_count(s) for s in successors)
-
-    # Recursive position assignment
-    def assign_positions(node, angle_start, angle_span, depth=0):
-        # Get node attributes
-        year = G.nodes[node].get('year', 1958)
-
-        # Radial position based on year
-        radius = (year - min_year) / (max_year - min_year)
-
-        # Get children
-        children = list(G.successors(node))
-
-        if not children:
-            # Leaf node - use center of span
-            angle = angle_start + angle_span / 2
-            pos[node] = (radius * np.cos(angle), radius * np.sin(angle))
-        else:
-            # Internal node - calculate weighted position
-            total_leaves = sum(get_leaf_count(child) for child in children)
-
-            # Assign angular space to children proportionally
-            current_angle = angle_start
-            child_positions = []
-
-            for child in children:
-                child_leaves = get_leaf_count(child)
-                child_span = angle_span * (child_leaves / total_leaves)
-                child_angle = assign_positions(child, current_angle, child_span, depth + 1)
-                child_positions.append(child_angle)
-                current_angle += child_span
-
-            # Position parent at weighted average of children angles
-            avg_angle = np.mean([np.arctan2(pos[c][1], pos[c][0]) for c in children])
-            pos[node] = (radius * np.cos(avg_angle), radius * np.sin(avg_angle))
-
-            return avg_angle
-
-        return angle_start + angle_span / 2
-
-    # Start from root
-    assign_positions(root, -np.pi, 2 * np.pi)
-
-    return pos
-
+    years = [G.nodes[name].get('year', 1958) for name in tree_index.names]
+    layout = cached_radial_layout(tree_index, years, -np.pi, np.pi,
+                                  weight='leaves', placement='centroid',
+                                  min_year=min_year, max_year=max_year)
+    x, y = polar_to_xy(layout)
+    return {name: (x[i], y[i]) for i, name in enumerate(tree_index.names)}
+
+instrument.stage("layout")
 print("Calculating layout...")
-pos = hierarchical_radial_layout(G, 'Perceptron')
+pos = hierarchical_radial_layout(G)
 
 # Create figure
 fig, ax = plt.subplots(figsize=(24, 24))
 
+instrument.stage("branches", fig)
 print("Drawing graph...")
 
 # Draw edges with custom styling
@@ -130,6 +98,7 @@ for edge in G.edges():
            solid_capstyle='round', zorder=1)
 
 # Draw nodes
+instrument.stage("nodes")
 for node in G.nodes():
     node_data = G.nodes[node]
     x, y = pos[node]
@@ -143,6 +112,7 @@ for node in G.nodes():
               alpha=alpha, zorder=2)
 
 # Add timeline rings
+instrument.stage("rings")
 print("Adding timeline rings...")
 year_labels = [1960, 1970, 1980, 1990, 2000, 2010, 2015, 2020, 2025]
 for year in year_labels:
@@ -156,16 +126,10 @@ for year in year_labels:
            ha='center', va='bottom', alpha=0.6)
 
 # Add labels for important nodes
+instrument.stage("labels")
 print("Adding labels...")
-labeled_positions = []
-
-def is_label_clear(x, y, min_distance=0.08):
-    """Check if label position is clear"""
-    for prev_x, prev_y in labeled_positions:
-        dist = np.sqrt((x - prev_x)**2 + (y - prev_y)**2)
-        if dist < min_distance:
-            return False
-    return True
+# Placed labels in a grid hash, so each check only visits nearby labels
+labeled_positions = PointLabelIndex(0.08)
 
 for node in G.nodes():
     node_data = G.nodes[node]
@@ -175,7 +139,7 @@ for node in G.nodes():
     is_breakthrough = any(node == b[0] for b in BREAKTHROUGHS)
 
     if node_data['importance'] >= 3 or is_breakthrough:
-        if is_label_clear(x, y):
+        if labeled_positions.is_clear(x, y):
             # Calculate angle for text rotation
             angle = np.arctan2(y, x)
             text_angle = np.degrees(angle)
@@ -206,9 +170,10 @@ for node in G.nodes():
                    ha=ha, va='center', fontsize=fontsize,
                    fontweight=fontweight, alpha=0.9)
 
-            labeled_positions.append((x, y))
+            labeled_positions.add(x, y)
 
 # Add extinction event markers
+instrument.stage("extinction events")
 print("Adding extinction events...")
 for event_name, start_year, end_year in EXTINCTION_EVENTS:
     r_start = (start_year - 1958) / (2026 - 1958)
@@ -244,6 +209,7 @@ title_text = "Phylogenetic Tree of Artificial Intelligence\nFrom Perceptrons to
 ax.set_title(title_text, fontsize=22, fontweight='bold', pad=30)
 
 # Add legend
+instrument.stage("legend")
 from matplotlib.patches import Patch
 legend_elements = [
     Patch(facecolor='#8B7355', label='Symbolic AI (extinct)'),
@@ -267,17 +233,18 @@ ax.legend(handles=legend_elements, loc='upper right',
 subtitle = "Branch thickness = importance  |  Faded = extinct  |  NetworkX graph library"
 fig.text(0.5, 0.02, subtitle, ha='center', fontsize=9, style='italic', color='gray')
 
+instrument.stage("save")
 print("Saving outputs...")
-output_base = "../output/ai_tree_networkx"
-
-plt.savefig(f"{output_base}.png", dpi=300, bbox_inches='tight', facecolor='white')
-print(f"✓ Rendered PNG: {output_base}.png")
-
-plt.savefig(f"{output_base}.pdf", bbox_inches='tight', facecolor='white')
-print(f"✓ Rendered PDF: {output_base}.pdf")
-
-plt.savefig(f"{output_base}.svg", bbox_inches='tight', facecolor='white')
-print(f"✓ Rendered SVG: {output_base}.svg")
+output_base = os.path.join(OUTPUT_DIR, "ai_tree_networkx")
+
+# One tight-bbox pass, formats written in parallel (AI_TREE_FORMATS=png,svg to pick)
+exports = {
+    'png': (f"{output_base}.png", {'dpi': 300}),
+    'pdf': (f"{output_base}.pdf", {}),
+    'svg': (f"{output_base}.svg", {}),
+}
+for fmt, path in export_figure(fig, exports, facecolor='white'):
+    print(f"✓ Rendered {fmt.upper()}: {path}")
 
 plt.close()
 
@@ -8,90 +8,58 @@ import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.path import Path
 from matplotlib.patches import PathPatch, Circle, Wedge
 from matplotlib.collections import PatchCollection
 import sys
 import os
 
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS, EXTINCTION_EVENTS, BREAKTHROUGHS
-
-os.makedirs("../output", exist_ok=True)
-
+from model_store import ModelStore
+from tree_index import TreeIndex, build_tree_dict
+from layout_cache import cached_radial_layout
+from label_index import PointLabelIndex
+from export import export_figure
+from branch_render import BranchBatch, polyline_interpolate, segment_rgba
+import instrument
+
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+instrument.stage("build tree")
 print("Creating artistic AI evolution tree with Bezier curves...")
 print(f"Total models: {len(AI_MODELS)}")
 
-# Build tree structure
-tree_dict = {}
-for model_data in AI_MODELS:
-    name, parent, year, color, importance, branch_type, extinct = model_data
-    tree_dict[name] = {
-        'parent': parent,
-        'year': year,
-        'color': color,
-        'importance': importance,
-        'branch_type': branch_type,
-        'extinct': extinct,
-        'children': []
-    }
-
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in tree_dict:
-        tree_dict[data['parent']]['children'].append(name)
+# Build tree structure once; subtree counts come from the shared index
+model_store = ModelStore.from_records(AI_MODELS)
+tree_index = TreeIndex.from_store(model_store)
+tree_dict = build_tree_dict(AI_MODELS, tree_index)
 
+instrument.stage("layout")
 print("Calculating elegant layout...")
 
 # Position calculation with better weighting
-def assign_positions_artistic(tree_dict, root_name, start_angle, end_angle, min_year=1958, max_year=2026):
-    positions = {}
-
-    def count_descendants(name):
-        node = tree_dict[name]
-        if not node['children']:
-            return 1
-        return sum(count_descendants(child) for child in node['children']) + 1
-
-    def recurse(name, angle_start, angle_end, depth=0):
-        node = tree_dict[name]
-        year = node['year']
-
-        # Smoother radial scaling
-        radius = np.power((year - min_year) / (max_year - min_year), 0.9)
-
-        children = node['children']
-        if children:
-            angle = (angle_start + angle_end) / 2
-        else:
-            angle = (angle_start + angle_end) / 2
-
-        positions[name] = (radius, angle)
-
-        if children:
-            total_descendants = sum(count_descendants(child) for child in children)
-            current_angle = angle_start
-
-            for child in children:
-                child_descendants = count_descendants(child)
-                child_span = (angle_end - angle_start) * (child_descendants / total_descendants)
-                recurse(child, current_angle, current_angle + child_span, depth + 1)
-                current_angle += child_span
+def assign_positions_artistic(tree_index, years, start_angle, end_angle, min_year=1958, max_year=2026):
+    # Smoother radial scaling, descendant-weighted angular spans
+    layout = cached_radial_layout(tree_index, years, start_angle, end_angle,
+                                  weight='descendants', min_year=min_year,
+                                  max_year=max_year, exponent=0.9)
+    radius, angle = layout.radius.tolist(), layout.angle.tolist()
+    return {tree_index.names[i]: (radius[i], angle[i]) for i in tree_index.preorder}
 
-    recurse(root_name, start_angle, end_angle)
-    return positions
-
-positions = assign_positions_artistic(tree_dict, "Perceptron", -np.pi, np.pi)
+positions = assign_positions_artistic(tree_index, model_store.year, -np.pi, np.pi)
 
 # Create figure with artistic styling
 fig = plt.figure(figsize=(26, 26), facecolor='#FAFAF8')
 ax = fig.add_subplot(111, projection='polar')
 ax.set_facecolor('#FAFAF8')
 
+instrument.stage("branches", fig)
 print("Drawing artistic branches with Bezier curves...")
 
 # Draw branches with smooth curves
-def draw_curved_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, extinct):
-    """Draw smooth curved branch using Bezier curves"""
+def curved_branch_paths(r1, theta1, r2, theta2, steps=100):
+    """Smooth curved branches using Bezier curves, as (theta, r) polylines per edge"""
     # Convert polar to cartesian
     x1 = r1 * np.cos(theta1)
     y1 = r1 * np.sin(theta1)
@@ -103,69 +71,61 @@ def draw_curved_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, exti
     ctrl_dist = dist * 0.3
 
     # Control point 1 - extend from parent
-    angle1 = theta1
-    cx1 = x1 + ctrl_dist * np.cos(angle1)
-    cy1 = y1 + ctrl_dist * np.sin(angle1)
+    cx1 = x1 + ctrl_dist * np.cos(theta1)
+    cy1 = y1 + ctrl_dist * np.sin(theta1)
 
     # Control point 2 - approach child
     angle2 = np.arctan2(y2 - y1, x2 - x1)
     cx2 = x2 - ctrl_dist * np.cos(angle2)
     cy2 = y2 - ctrl_dist * np.sin(angle2)
 
-    # Create Bezier curve path
-    vertices = [
-        (x1, y1),
-        (cx1, cy1),
-        (cx2, cy2),
-        (x2, y2)
-    ]
-
-    codes = [
-        Path.MOVETO,
-        Path.CURVE4,
-        Path.CURVE4,
-        Path.CURVE4
-    ]
-
-    path = Path(vertices, codes)
+    # Bezier control polygon, sampled like Path.interpolated(steps)
+    vertices = np.stack([np.column_stack(p) for p in ((x1, y1), (cx1, cy1), (cx2, cy2), (x2, y2))], axis=1)
+    points = polyline_interpolate(vertices, steps)
 
     # Convert back to polar for plotting
-    t = np.linspace(0, 1, 100)
-    points = path.interpolated(100).vertices
+    r_curve = np.sqrt(points[..., 0]**2 + points[..., 1]**2)
+    theta_curve = np.arctan2(points[..., 1], points[..., 0])
+    return np.stack([theta_curve, r_curve], axis=-1)
 
-    r_curve = np.sqrt(points[:, 0]**2 + points[:, 1]**2)
-    theta_curve = np.arctan2(points[:, 1], points[:, 0])
+def draw_curved_branches(ax, curves, rgba, linewidths, alphas, extinct, segments=20):
+    """All branches as one LineCollection; extinct ones fade out in `segments` pieces"""
+    solid = np.flatnonzero(~extinct)
+    faded = np.flatnonzero(extinct)
 
     # Gradient effect for extinct branches
-    if extinct:
-        # Draw with gradient fade
-        segments = 20
-        for i in range(segments):
-            start_idx = i * (len(r_curve) // segments)
-            end_idx = min((i + 1) * (len(r_curve) // segments), len(r_curve))
-
-            segment_alpha = alpha * (1 - 0.6 * (i / segments))
-
-            ax.plot(theta_curve[start_idx:end_idx], r_curve[start_idx:end_idx],
-                   color=color, linewidth=linewidth * (1 - 0.3 * (i/segments)),
-                   alpha=segment_alpha, solid_capstyle='round', zorder=1)
-    else:
-        ax.plot(theta_curve, r_curve,
-               color=color, linewidth=linewidth, alpha=alpha,
-               solid_capstyle='round', zorder=1)
+    step = curves.shape[1] // segments
+    chunks = curves[faded, :segments * step].reshape(-1, step, 2)
+    fade = np.arange(segments) / segments
+
+    pieces = list(curves[solid]) + list(chunks)
+    owner = np.concatenate([solid, np.repeat(faded, segments)])
+    widths = np.concatenate([linewidths[solid],
+                             (linewidths[faded, None] * (1 - 0.3 * fade)).ravel()])
+    piece_alpha = np.concatenate([alphas[solid],
+                                  (alphas[faded, None] * (1 - 0.6 * fade)).ravel()])
+
+    # Keep edges stacked in dataset order, as the per-edge plot calls were
+    order = np.argsort(owner, kind='stable')
+    batch = BranchBatch()
+    batch.add([pieces[k] for k in order], segment_rgba(rgba[owner[order]], piece_alpha[order, None]),
+              widths[order], zorder=1)
+    batch.draw(ax)
 
 # Draw all branches with curves
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in positions:
-        r1, theta1 = positions[data['parent']]
-        r2, theta2 = positions[name]
+child = np.flatnonzero(np.asarray(tree_index.parent) >= 0)
+parent = np.asarray(tree_index.parent)[child]
+radius = np.array([positions[name][0] for name in tree_index.names])
+angle = np.array([positions[name][1] for name in tree_index.names])
 
-        linewidth = data['importance'] * 2.0
-        alpha = 0.35 if data['extinct'] else 0.75
-        color = data['color']
+linewidths = model_store.importance[child] * 2.0
+extinct = model_store.extinct[child]
+alphas = np.where(extinct, 0.35, 0.75)
 
-        draw_curved_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, data['extinct'])
+curves = curved_branch_paths(radius[parent], angle[parent], radius[child], angle[child])
+draw_curved_branches(ax, curves, model_store.rgba()[child], linewidths, alphas, extinct)
 
+instrument.stage("nodes")
 print("Adding beautiful nodes with halos...")
 
 # Draw nodes with artistic halos
@@ -192,20 +152,11 @@ for name, (radius, angle) in positions.items():
         ax.scatter(angle, radius, s=highlight_size, c='white',
                   alpha=0.4, zorder=2.5, edgecolors='none')
 
+instrument.stage("labels")
 print("Adding elegant labels...")
 
 # Selective, artistic labeling
-labeled_positions = []
-
-def is_label_clear(angle, radius, min_distance=0.08):
-    for prev_angle, prev_radius in labeled_positions:
-        angle_diff = abs(angle - prev_angle)
-        if angle_diff > np.pi:
-            angle_diff = 2 * np.pi - angle_diff
-        dist = np.sqrt((radius - prev_radius)**2 + (radius * angle_diff)**2)
-        if dist < min_distance:
-            return False
-    return True
+labeled_positions = PointLabelIndex(0.09, polar=True)
 
 # Label only the most important nodes
 for name, (radius, angle) in positions.items():
@@ -213,7 +164,7 @@ for name, (radius, angle) in positions.items():
     is_breakthrough = any(name == b[0] for b in BREAKTHROUGHS)
 
     if node_data['importance'] >= 4 or is_breakthrough:
-        if radius > 0.08 and is_label_clear(angle, radius, 0.09):
+        if radius > 0.08 and labeled_positions.is_clear(angle, radius):
             text_angle = np.degrees(angle)
             if text_angle > 90 and text_angle < 270:
                 text_angle += 180
@@ -238,8 +189,9 @@ for name, (radius, angle) in positions.items():
                    fontweight=fontweight, alpha=0.9, color='#2C3E50',
                    zorder=3)
 
-            labeled_positions.append((angle, radius))
+            labeled_positions.add(angle, radius)
 
+instrument.stage("rings")
 print("Adding timeline rings with elegant styling...")
 
 # Artistic timeline rings
@@ -263,6 +215,7 @@ for i, year in enumerate(year_labels):
            bbox=dict(boxstyle='round,pad=0.3', facecolor='white',
                     edgecolor='none', alpha=0.6))
 
+instrument.stage("extinction events")
 print("Adding extinction event markers...")
 
 # Artistic extinction zones
@@ -302,6 +255,7 @@ ax.text(0.5, 1.11, subtitle_text, transform=ax.transAxes,
        color='#5D6D7E', family='serif')
 
 # Elegant legend
+instrument.stage("legend")
 from matplotlib.patches import Patch
 legend_elements = [
     Patch(facecolor='#8B7355', alpha=0.7, label='Symbolic AI'),
@@ -327,25 +281,20 @@ caption = "Branch thickness reflects model importance  •  Faded branches show
 fig.text(0.5, 0.015, caption, ha='center', fontsize=9,
         style='italic', color='#7F8C8D', family='serif')
 
+instrument.stage("save")
 print("Rendering artistic outputs...")
-output_base = "../output/ai_tree_artistic"
-
-plt.savefig(f"{output_base}.png", dpi=300, bbox_inches='tight',
-           facecolor='#FAFAF8', edgecolor='none')
-print(f"✓ Rendered PNG: {output_base}.png")
-
-plt.savefig(f"{output_base}.pdf", bbox_inches='tight',
-           facecolor='#FAFAF8', edgecolor='none')
-print(f"✓ Rendered PDF: {output_base}.pdf")
-
-plt.savefig(f"{output_base}.svg", bbox_inches='tight',
-           facecolor='#FAFAF8', edgecolor='none')
-print(f"✓ Rendered SVG: {output_base}.svg")
-
-# Also create high-res version for printing
-plt.savefig(f"{output_base}_highres.png", dpi=600, bbox_inches='tight',
-           facecolor='#FAFAF8', edgecolor='none')
-print(f"✓ Rendered High-Res PNG: {output_base}_highres.png")
+output_base = os.path.join(OUTPUT_DIR, "ai_tree_artistic")
+
+# Also create high-res version for printing; one tight-bbox pass for all
+exports = {
+    'png': (f"{output_base}.png", {'dpi': 300}),
+    'pdf': (f"{output_base}.pdf", {}),
+    'svg': (f"{output_base}.svg", {}),
+    'print': (f"{output_base}_highres.png", {'dpi': 600, 'tile_rows': 1024}),
+}
+labels = {'png': 'PNG', 'pdf': 'PDF', 'svg': 'SVG', 'print': 'High-Res PNG'}
+for fmt, path in export_figure(fig, exports, facecolor='#FAFAF8', edgecolor='none'):
+    print(f"✓ Rendered {labels[fmt]}: {path}")
 
 plt.close()
 
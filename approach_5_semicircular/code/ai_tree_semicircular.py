@@ -12,74 +12,42 @@ from matplotlib.path import Path
 import sys
 import os
 
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS, EXTINCTION_EVENTS, BREAKTHROUGHS
-
-os.makedirs("../output", exist_ok=True)
-
+from model_store import ModelStore
+from tree_index import TreeIndex, build_tree_dict
+from layout_cache import cached_radial_layout
+from label_index import PointLabelIndex
+from export import export_figure
+from branch_render import BranchBatch, cubic_bezier, segments_from_points, segment_rgba
+import instrument
+
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+instrument.stage("build tree")
 print("Creating semicircular AI evolution tree (biological style)...")
 print(f"Total models: {len(AI_MODELS)}")
 
-# Build tree
-tree_dict = {}
-for model_data in AI_MODELS:
-    name, parent, year, color, importance, branch_type, extinct = model_data
-    tree_dict[name] = {
-        'parent': parent,
-        'year': year,
-        'color': color,
-        'importance': importance,
-        'branch_type': branch_type,
-        'extinct': extinct,
-        'children': []
-    }
-
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in tree_dict:
-        tree_dict[data['parent']]['children'].append(name)
+# Build tree structure once; subtree counts come from the shared index
+model_store = ModelStore.from_records(AI_MODELS)
+tree_index = TreeIndex.from_store(model_store)
+tree_dict = build_tree_dict(AI_MODELS, tree_index)
 
+instrument.stage("layout")
 print("Calculating semicircular fan layout...")
 
 # SEMICIRCULAR layout (180 degrees)
-def assign_positions_semicircular(tree_dict, root_name, min_year=1958, max_year=2026):
-    positions = {}
-
-    def count_descendants(name):
-        node = tree_dict[name]
-        if not node['children']:
-            return 1
-        return sum(count_descendants(child) for child in node['children']) + 1
-
-    def recurse(name, angle_start, angle_end, depth=0):
-        node = tree_dict[name]
-        year = node['year']
-
-        # Radial position with slight curve for visual appeal
-        radius = np.power((year - min_year) / (max_year - min_year), 0.85)
-
-        children = node['children']
-        if children:
-            angle = (angle_start + angle_end) / 2
-        else:
-            angle = (angle_start + angle_end) / 2
-
-        positions[name] = (radius, angle)
-
-        if children:
-            total_descendants = sum(count_descendants(child) for child in children)
-            current_angle = angle_start
-
-            for child in children:
-                child_descendants = count_descendants(child)
-                child_span = (angle_end - angle_start) * (child_descendants / total_descendants)
-                recurse(child, current_angle, current_angle + child_span, depth + 1)
-                current_angle += child_span
-
+def assign_positions_semicircular(tree_index, years, min_year=1958, max_year=2026):
     # Semicircle: -π/2 to π/2 (bottom half of circle, opening upward)
-    recurse(root_name, -np.pi/2, np.pi/2)
-    return positions
+    # Radial position with slight curve for visual appeal
+    layout = cached_radial_layout(tree_index, years, -np.pi/2, np.pi/2,
+                                  weight='descendants', min_year=min_year,
+                                  max_year=max_year, exponent=0.85)
+    radius, angle = layout.radius.tolist(), layout.angle.tolist()
+    return {tree_index.names[i]: (radius[i], angle[i]) for i in tree_index.preorder}
 
-positions = assign_positions_semicircular(tree_dict, "Perceptron")
+positions = assign_positions_semicircular(tree_index, model_store.year)
 
 # Create figure - rectangular for semicircular layout
 fig = plt.figure(figsize=(30, 18), facecolor='#FCFCFA')
@@ -87,11 +55,12 @@ ax = fig.add_subplot(111)
 ax.set_facecolor('#FCFCFA')
 ax.set_aspect('equal')
 
+instrument.stage("branches", fig)
 print("Drawing branches with organic curves...")
 
 # Draw branches with smooth curves
-def draw_organic_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, extinct):
-    """Draw organic-looking branch"""
+def organic_branch_curves(r1, theta1, r2, theta2, n_points=80):
+    """Organic-looking branches, one (n_points, 2) curve per edge"""
     x1 = r1 * np.cos(theta1)
     y1 = r1 * np.sin(theta1)
     x2 = r2 * np.cos(theta2)
@@ -111,43 +80,39 @@ def draw_organic_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, ext
     cy2 = y2 - ctrl_dist * 0.8 * np.sin(mid_angle)
 
     # Bezier curve
-    t = np.linspace(0, 1, 80)
-    curve_x = (1-t)**3 * x1 + 3*(1-t)**2*t * cx1 + 3*(1-t)*t**2 * cx2 + t**3 * x2
-    curve_y = (1-t)**3 * y1 + 3*(1-t)**2*t * cy1 + 3*(1-t)*t**2 * cy2 + t**3 * y2
-
-    # Tapering effect - branches get thinner toward tips
-    if extinct:
-        # Fading extinct branches
-        for i in range(len(curve_x) - 1):
-            progress = i / len(curve_x)
-            segment_alpha = alpha * (1 - 0.5 * progress)
-            segment_width = linewidth * (1 - 0.4 * progress)
-
-            ax.plot(curve_x[i:i+2], curve_y[i:i+2],
-                   color=color, linewidth=segment_width,
-                   alpha=segment_alpha, solid_capstyle='round', zorder=1)
-    else:
-        # Vibrant active branches with slight taper
-        for i in range(len(curve_x) - 1):
-            progress = i / len(curve_x)
-            segment_width = linewidth * (1 - 0.15 * progress)
+    return cubic_bezier(np.column_stack([x1, y1]), np.column_stack([cx1, cy1]),
+                        np.column_stack([cx2, cy2]), np.column_stack([x2, y2]), n_points)
+
+def draw_organic_branches(ax, curves, rgba, linewidths, alphas, extinct):
+    """All tapered branch segments as one batched LineCollection"""
+    segments = segments_from_points(curves)
+    progress = np.arange(segments.shape[1]) / curves.shape[1]
+    lw = linewidths[:, None]
+    alpha = alphas[:, None]
 
-            ax.plot(curve_x[i:i+2], curve_y[i:i+2],
-                   color=color, linewidth=segment_width,
-                   alpha=alpha, solid_capstyle='round', zorder=1)
+    # Tapering effect - branches get thinner toward tips; extinct ones also fade
+    seg_width = np.where(extinct[:, None], lw * (1 - 0.4 * progress), lw * (1 - 0.15 * progress))
+    seg_alpha = np.where(extinct[:, None], alpha * (1 - 0.5 * progress), alpha)
+
+    batch = BranchBatch()
+    batch.add(segments.reshape(-1, 2, 2), segment_rgba(rgba, seg_alpha),
+              seg_width.ravel(), zorder=1)
+    batch.draw(ax)
 
 # Draw all branches
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in positions:
-        r1, theta1 = positions[data['parent']]
-        r2, theta2 = positions[name]
+child = np.flatnonzero(np.asarray(tree_index.parent) >= 0)
+parent = np.asarray(tree_index.parent)[child]
+radius = np.array([positions[name][0] for name in tree_index.names])
+angle = np.array([positions[name][1] for name in tree_index.names])
 
-        linewidth = data['importance'] * 2.5
-        alpha = 0.3 if data['extinct'] else 0.8
-        color = data['color']
+linewidths = model_store.importance[child] * 2.5
+extinct = model_store.extinct[child]
+alphas = np.where(extinct, 0.3, 0.8)
 
-        draw_organic_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, data['extinct'])
+curves = organic_branch_curves(radius[parent], angle[parent], radius[child], angle[child])
+draw_organic_branches(ax, curves, model_store.rgba()[child], linewidths, alphas, extinct)
 
+instrument.stage("nodes")
 print("Adding elegant nodes...")
 
 # Draw nodes with artistic styling
@@ -173,17 +138,11 @@ for name, (radius, angle) in positions.items():
     if node_data['importance'] >= 4:
         ax.scatter(x, y, s=size*0.25, c='white', alpha=0.5, zorder=2.5, edgecolors='none')
 
+instrument.stage("labels")
 print("Adding labels with optimal placement...")
 
 # Smart labeling
-labeled_positions = []
-
-def is_label_clear_cart(x, y, min_distance=0.08):
-    for prev_x, prev_y in labeled_positions:
-        dist = np.sqrt((x - prev_x)**2 + (y - prev_y)**2)
-        if dist < min_distance:
-            return False
-    return True
+labeled_positions = PointLabelIndex(0.085)
 
 for name, (radius, angle) in positions.items():
     node_data = tree_dict[name]
@@ -193,7 +152,7 @@ for name, (radius, angle) in positions.items():
     y = radius * np.sin(angle)
 
     if node_data['importance'] >= 4 or is_breakthrough:
-        if radius > 0.1 and is_label_clear_cart(x, y, 0.085):
+        if radius > 0.1 and labeled_positions.is_clear(x, y):
             # Text angle for fan layout
             text_angle = np.degrees(angle)
 
@@ -227,8 +186,9 @@ for name, (radius, angle) in positions.items():
                    ha=ha, va='center', fontsize=fontsize,
                    fontweight=fontweight, alpha=0.92, color='#1A1A1A', zorder=3)
 
-            labeled_positions.append((x, y))
+            labeled_positions.add(x, y)
 
+instrument.stage("rings")
 print("Adding timeline arcs...")
 
 # Timeline arcs (semicircular)
@@ -255,6 +215,7 @@ for i, year in enumerate(year_labels):
     ax.text(label_x, label_y, str(year), fontsize=10, color='#566573',
            ha='center', va='top', alpha=0.7, fontweight='normal')
 
+instrument.stage("extinction events")
 print("Adding extinction zones...")
 
 # Extinction event shading
@@ -298,6 +259,7 @@ ax.text(0, 0.18, subtitle_text, fontsize=15, ha='center',
        va='top', style='italic', color='#515A5A', family='serif')
 
 # Legend at top
+instrument.stage("legend")
 from matplotlib.patches import Patch
 legend_elements = [
     Patch(facecolor='#8B7355', alpha=0.6, label='Symbolic AI'),
@@ -322,25 +284,20 @@ caption = "A biological-style phylogenetic visualization • Branch thickness =
 ax.text(0, -1.08, caption, ha='center', fontsize=9.5,
        style='italic', color='#7F8C8D', family='serif')
 
+instrument.stage("save")
 print("Rendering beautiful outputs...")
-output_base = "../output/ai_tree_semicircular"
-
-plt.savefig(f"{output_base}.png", dpi=300, bbox_inches='tight',
-           facecolor='#FCFCFA', edgecolor='none')
-print(f"✓ Rendered PNG: {output_base}.png")
-
-plt.savefig(f"{output_base}.pdf", bbox_inches='tight',
-           facecolor='#FCFCFA', edgecolor='none')
-print(f"✓ Rendered PDF: {output_base}.pdf")
-
-plt.savefig(f"{output_base}.svg", bbox_inches='tight',
-           facecolor='#FCFCFA', edgecolor='none')
-print(f"✓ Rendered SVG: {output_base}.svg")
-
-# Ultra high-res for printing
-plt.savefig(f"{output_base}_print.png", dpi=600, bbox_inches='tight',
-           facecolor='#FCFCFA', edgecolor='none')
-print(f"✓ Rendered Print-Quality PNG: {output_base}_print.png")
+output_base = os.path.join(OUTPUT_DIR, "ai_tree_semicircular")
+
+# Ultra high-res for printing; one tight-bbox pass for all
+exports = {
+    'png': (f"{output_base}.png", {'dpi': 300}),
+    'pdf': (f"{output_base}.pdf", {}),
+    'svg': (f"{output_base}.svg", {}),
+    'print': (f"{output_base}_print.png", {'dpi': 600, 'tile_rows': 1024}),
+}
+labels = {'png': 'PNG', 'pdf': 'PDF', 'svg': 'SVG', 'print': 'Print-Quality PNG'}
+for fmt, path in export_figure(fig, exports, facecolor='#FCFCFA', edgecolor='none'):
+    print(f"✓ Rendered {labels[fmt]}: {path}")
 
 plt.close()
 
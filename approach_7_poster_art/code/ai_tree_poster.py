@@ -13,10 +13,18 @@ from matplotlib.path import Path
 import sys
 import os
 
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS, EXTINCTION_EVENTS, BREAKTHROUGHS
+from model_store import ModelStore
+from tree_index import TreeIndex, build_tree_dict
+from layout_cache import cached_radial_layout
+from label_index import PointLabelIndex
+from export import export_figure
+from branch_render import BranchBatch, cubic_bezier, segments_from_points, segment_rgba
+import instrument
 
-os.makedirs("../output", exist_ok=True)
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 print("="*80)
 print("CREATING MUSEUM-QUALITY POSTER ART")
@@ -25,76 +33,33 @@ print(f"\n✨ Total models to visualize: {len(AI_MODELS)}")
 print("🎨 All branches will be shown with artistic detail")
 print("🖼️  Output will be poster/print quality (ultra high resolution)\n")
 
-# Build complete tree
-tree_dict = {}
-for model_data in AI_MODELS:
-    name, parent, year, color, importance, branch_type, extinct = model_data
-    tree_dict[name] = {
-        'parent': parent,
-        'year': year,
-        'color': color,
-        'importance': importance,
-        'branch_type': branch_type,
-        'extinct': extinct,
-        'children': []
-    }
-
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in tree_dict:
-        tree_dict[data['parent']]['children'].append(name)
+# Build tree structure once; subtree counts come from the shared index
+instrument.stage("build tree")
+model_store = ModelStore.from_records(AI_MODELS)
+tree_index = TreeIndex.from_store(model_store)
+tree_dict = build_tree_dict(AI_MODELS, tree_index)
 
 print(f"🌳 Tree structure: {len(tree_dict)} models organized hierarchically")
 print(f"📊 Branches: {sum(1 for d in tree_dict.values() if d['parent'])}")
 print(f"🍂 Extinct lineages: {sum(1 for d in tree_dict.values() if d['extinct'])}")
 
 # Semicircular layout optimized for maximum beauty
-def assign_positions_poster(tree_dict, root_name, min_year=1958, max_year=2026):
-    positions = {}
-
-    def count_leaves(name):
-        node = tree_dict[name]
-        if not node['children']:
-            return 1
-        return sum(count_leaves(child) for child in node['children'])
-
-    total_leaves = count_leaves(root_name)
+def assign_positions_poster(tree_index, years, min_year=1958, max_year=2026):
+    total_leaves = sum(1 for size in tree_index.subtree_size if size == 1)
     print(f"🍃 Leaf nodes (terminal models): {total_leaves}")
 
-    def recurse(name, angle_start, angle_end, depth=0):
-        node = tree_dict[name]
-        year = node['year']
-
-        # Smooth radial progression
-        radius = np.power((year - min_year) / (max_year - min_year), 0.88)
-
-        children = node['children']
-
-        if children:
-            # Parent centered among children
-            angle = (angle_start + angle_end) / 2
-        else:
-            # Leaf at span center
-            angle = (angle_start + angle_end) / 2
-
-        positions[name] = (radius, angle, depth)
-
-        if children:
-            # Proportional angular allocation
-            child_leaves = [count_leaves(child) for child in children]
-            total = sum(child_leaves)
-            current_angle = angle_start
-
-            for child, leaves in zip(children, child_leaves):
-                child_span = (angle_end - angle_start) * (leaves / total)
-                recurse(child, current_angle, current_angle + child_span, depth + 1)
-                current_angle += child_span
-
-    # Semicircle with slight asymmetry for aesthetic
-    recurse(root_name, -np.pi/1.8, np.pi/1.8)
-    return positions
+    # Semicircle with slight asymmetry for aesthetic; smooth radial
+    # progression and leaf-proportional angular allocation
+    layout = cached_radial_layout(tree_index, years, -np.pi/1.8, np.pi/1.8,
+                                  weight='leaves', min_year=min_year,
+                                  max_year=max_year, exponent=0.88)
+    radius, angle = layout.radius.tolist(), layout.angle.tolist()
+    depth = tree_index.depth
+    return {tree_index.names[i]: (radius[i], angle[i], depth[i]) for i in tree_index.preorder}
 
+instrument.stage("layout")
 print("\n🎯 Calculating optimal node positions...")
-positions = assign_positions_poster(tree_dict, "Perceptron")
+positions = assign_positions_poster(tree_index, model_store.year)
 print(f"✓ Positioned {len(positions)} nodes in semicircular fan layout")
 
 # Create MASSIVE figure for print quality
@@ -104,90 +69,79 @@ ax = fig.add_subplot(111)
 ax.set_facecolor('#FEFEFE')
 ax.set_aspect('equal')
 
+instrument.stage("branches", fig)
 print("🎨 Rendering artistic branches with organic curves...")
 
 # Enhanced curve drawing with even smoother bezier curves
-def draw_artistic_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, extinct, depth):
-    """Ultra-smooth artistic branch"""
+def artistic_branch_curves(r1, theta1, r2, theta2, n_points=120):
+    """Ultra-smooth artistic branches, one (n_points, 2) curve per edge"""
     x1 = r1 * np.cos(theta1)
     y1 = r1 * np.sin(theta1)
     x2 = r2 * np.cos(theta2)
     y2 = r2 * np.sin(theta2)
 
     dist = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-
-    # Multi-point Bezier for ultra-smooth curves
     ctrl_dist1 = dist * 0.4
-    ctrl_dist2 = dist * 0.3
 
     # Radial control from parent
     cx1 = x1 + ctrl_dist1 * np.cos(theta1)
     cy1 = y1 + ctrl_dist1 * np.sin(theta1)
 
-    # Intermediate curve control
-    mid_angle = (theta1 + theta2) / 2
-    mid_r = (r1 + r2) / 2
-    cx2 = mid_r * np.cos(mid_angle) + ctrl_dist2 * 0.3 * np.cos(mid_angle + np.pi/2)
-    cy2 = mid_r * np.sin(mid_angle) + ctrl_dist2 * 0.3 * np.sin(mid_angle + np.pi/2)
-
     # Approach child tangentially
     cx3 = x2 - ctrl_dist1 * 0.6 * np.cos(theta2)
     cy3 = y2 - ctrl_dist1 * 0.6 * np.sin(theta2)
 
-    # Super-smooth curve with many points
-    t = np.linspace(0, 1, 120)
-    # Cubic bezier
-    curve_x = (1-t)**3*x1 + 3*(1-t)**2*t*cx1 + 3*(1-t)*t**2*cx3 + t**3*x2
-    curve_y = (1-t)**3*y1 + 3*(1-t)**2*t*cy1 + 3*(1-t)*t**2*cy3 + t**3*y2
-
-    # Draw with beautiful tapering and optional gradient
-    if extinct:
-        # Elegant fade for extinct branches
-        segments = 25
-        for i in range(len(curve_x) - 1):
-            progress = i / (len(curve_x) - 1)
-            segment_alpha = alpha * (1 - 0.65 * progress)
-            segment_width = linewidth * (1 - 0.5 * progress)
-
-            # Slight color shift for depth
-            ax.plot(curve_x[i:i+2], curve_y[i:i+2],
-                   color=color, linewidth=max(0.5, segment_width),
-                   alpha=segment_alpha, solid_capstyle='round',
-                   solid_joinstyle='round', zorder=1 + depth*0.01)
-    else:
-        # Vibrant active branches with subtle taper
-        for i in range(len(curve_x) - 1):
-            progress = i / (len(curve_x) - 1)
-            segment_width = linewidth * (1 - 0.2 * progress)
-
-            # Glow effect for important branches
-            if linewidth > 8:
-                ax.plot(curve_x[i:i+2], curve_y[i:i+2],
-                       color=color, linewidth=segment_width*1.8,
-                       alpha=alpha*0.15, solid_capstyle='round', zorder=0.8 + depth*0.01)
-
-            ax.plot(curve_x[i:i+2], curve_y[i:i+2],
-                   color=color, linewidth=segment_width,
-                   alpha=alpha, solid_capstyle='round',
-                   solid_joinstyle='round', zorder=1 + depth*0.01)
+    # Super-smooth cubic bezier with many points
+    return cubic_bezier(np.column_stack([x1, y1]), np.column_stack([cx1, cy1]),
+                        np.column_stack([cx3, cy3]), np.column_stack([x2, y2]), n_points)
+
+def draw_artistic_branches(ax, curves, rgba, linewidths, alphas, extinct, depths):
+    """Tapered, faded segments for every edge as a few batched LineCollections"""
+    segments = segments_from_points(curves)
+    n_seg = segments.shape[1]
+    progress = np.arange(n_seg) / n_seg
+    lw = linewidths[:, None]
+    alpha = alphas[:, None]
+
+    # Elegant fade for extinct branches, vibrant active branches with subtle taper
+    seg_width = np.where(extinct[:, None],
+                         np.maximum(0.5, lw * (1 - 0.5 * progress)),
+                         lw * (1 - 0.2 * progress))
+    seg_alpha = np.where(extinct[:, None], alpha * (1 - 0.65 * progress), alpha)
+    # Glow effect for important branches
+    glow = ~extinct & (linewidths > 8)
+
+    batch = BranchBatch()
+    for depth in np.unique(depths):
+        edges = np.flatnonzero(depths == depth)
+        halo = edges[glow[edges]]
+        batch.add(segments[halo].reshape(-1, 2, 2),
+                  segment_rgba(rgba[halo], np.broadcast_to(alpha[halo] * 0.15, (len(halo), n_seg))),
+                  (seg_width[halo] * 1.8).ravel(), zorder=0.8 + depth*0.01)
+        batch.add(segments[edges].reshape(-1, 2, 2),
+                  segment_rgba(rgba[edges], seg_alpha[edges]),
+                  seg_width[edges].ravel(), zorder=1 + depth*0.01)
+    batch.draw(ax)
 
 # Draw ALL branches (this is the key - showing every connection)
-branch_count = 0
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in positions:
-        r1, theta1, depth1 = positions[data['parent']]
-        r2, theta2, depth2 = positions[name]
+child = np.flatnonzero(np.asarray(tree_index.parent) >= 0)
+parent = np.asarray(tree_index.parent)[child]
+radius = np.array([positions[name][0] for name in tree_index.names])
+angle = np.array([positions[name][1] for name in tree_index.names])
 
-        # Vary width by importance
-        linewidth = data['importance'] * 2.8
-        alpha = 0.28 if data['extinct'] else 0.82
-        color = data['color']
+# Vary width by importance
+linewidths = model_store.importance[child] * 2.8
+extinct = model_store.extinct[child]
+alphas = np.where(extinct, 0.28, 0.82)
 
-        draw_artistic_branch(ax, r1, theta1, r2, theta2, color, linewidth, alpha, data['extinct'], depth2)
-        branch_count += 1
+curves = artistic_branch_curves(radius[parent], angle[parent], radius[child], angle[child])
+draw_artistic_branches(ax, curves, model_store.rgba()[child], linewidths, alphas,
+                       extinct, np.asarray(tree_index.depth)[child])
+branch_count = len(child)
 
 print(f"✓ Drew {branch_count} beautiful curved branches")
 
+instrument.stage("nodes")
 print("💎 Adding nodes with artistic halos...")
 
 # Draw ALL nodes with artistic treatment
@@ -222,17 +176,11 @@ for name, (radius, angle, depth) in positions.items():
 
 print(f"✓ Rendered {node_count} nodes with depth and dimension")
 
+instrument.stage("labels")
 print("✍️  Adding selective labels (only key models for clarity)...")
 
 # Strategic labeling - only the most important to avoid clutter
-labeled_positions = []
-
-def is_label_clear_poster(x, y, min_distance=0.075):
-    for prev_x, prev_y in labeled_positions:
-        dist = np.sqrt((x - prev_x)**2 + (y - prev_y)**2)
-        if dist < min_distance:
-            return False
-    return True
+labeled_positions = PointLabelIndex(0.08)
 
 label_count = 0
 for name, (radius, angle, depth) in positions.items():
@@ -244,7 +192,7 @@ for name, (radius, angle, depth) in positions.items():
 
     # Only label highest importance or breakthroughs
     if node_data['importance'] >= 5 or (is_breakthrough and node_data['importance'] >= 4):
-        if radius > 0.12 and is_label_clear_poster(x, y, 0.08):
+        if radius > 0.12 and labeled_positions.is_clear(x, y):
             text_angle = np.degrees(angle)
 
             # Optimal reading angle
@@ -281,11 +229,12 @@ for name, (radius, angle, depth) in positions.items():
                    fontweight=fontweight, alpha=0.94, color='#0D0D0D',
                    zorder=3, family='serif')
 
-            labeled_positions.append((x, y))
+            labeled_positions.add(x, y)
             label_count += 1
 
 print(f"✓ Labeled {label_count} key innovations (selective for clarity)")
 
+instrument.stage("rings")
 print("🕰️  Adding elegant timeline arcs...")
 
 # Beautiful timeline arcs
@@ -313,6 +262,7 @@ for i, year in enumerate(year_labels):
            ha='center', va='top', alpha=0.75, fontweight='normal',
            family='sans-serif')
 
+instrument.stage("extinction events")
 print("💀 Adding extinction event zones...")
 
 # Artistic extinction markers
@@ -349,6 +299,7 @@ ax.set_ylim(-1.25, 0.42)
 ax.axis('off')
 
 # Museum-quality title
+instrument.stage("legend")
 print("📝 Adding elegant title and metadata...")
 title_text = "The Phylogenetic Tree of Artificial Intelligence"
 subtitle_text = "A Visual Chronicle of Machine Learning Evolution • 1958—2025"
@@ -398,31 +349,25 @@ ax.text(0.98, -1.18, "Generative visualization • Data-driven art", ha='right',
        fontsize=8, style='italic', color='#95A5A6',
        transform=ax.transData, alpha=0.7, family='sans-serif')
 
+instrument.stage("save")
 print("\n🎨 Rendering ultra-high resolution outputs...")
-output_base = "../output/ai_tree_poster"
-
-# Standard high-res
-print("   → PNG (300 DPI)...")
-plt.savefig(f"{output_base}.png", dpi=300, bbox_inches='tight',
-           facecolor='#FEFEFE', edgecolor='none', pad_inches=0.1)
-print(f"   ✓ {output_base}.png")
-
-# Vector for editing
-print("   → PDF (vector)...")
-plt.savefig(f"{output_base}.pdf", bbox_inches='tight',
-           facecolor='#FEFEFE', edgecolor='none', pad_inches=0.1)
-print(f"   ✓ {output_base}.pdf")
-
-print("   → SVG (web vector)...")
-plt.savefig(f"{output_base}.svg", bbox_inches='tight',
-           facecolor='#FEFEFE', edgecolor='none', pad_inches=0.1)
-print(f"   ✓ {output_base}.svg")
-
-# ULTRA high-res for museum/gallery printing
-print("   → ULTRA High-Res PNG (600 DPI) for printing...")
-plt.savefig(f"{output_base}_museum_print.png", dpi=600, bbox_inches='tight',
-           facecolor='#FEFEFE', edgecolor='none', pad_inches=0.1)
-print(f"   ✓ {output_base}_museum_print.png")
+output_base = os.path.join(OUTPUT_DIR, "ai_tree_poster")
+
+# Standard high-res, vector for editing, SVG for the web and ULTRA
+# high-res for museum/gallery printing, all from one tight-bbox pass
+exports = {
+    'png': (f"{output_base}.png", {'dpi': 300}),
+    'pdf': (f"{output_base}.pdf", {}),
+    'svg': (f"{output_base}.svg", {}),
+    'print': (f"{output_base}_museum_print.png", {'dpi': 600, 'tile_rows': 1024}),
+    # Deep-zoom XYZ tiles of the museum print, open tiles/index.html; a
+    # second 600 DPI render, so only with AI_TREE_FORMATS naming 'tiles'
+    'tiles': (f"{output_base}_tiles", {'dpi': 600, 'tile_pyramid': 'png'}),
+}
+print(f"   → {', '.join(exports)} (written in parallel)...")
+for fmt, path in export_figure(fig, exports, pad_inches=0.1,
+                               facecolor='#FEFEFE', edgecolor='none'):
+    print(f"   ✓ {path}")
 
 plt.close()
 
@@ -1,21 +1,28 @@
 #!/usr/bin/env python3
 """
 Approach 8: Pure SVG - Perfect Control, Zero Glitches
-Using svgwrite for pixel-perfect professional output
+Streamed SVG for pixel-perfect professional output
 No matplotlib, no overlaps, just beautiful art
 """
 
-import svgwrite
-from svgwrite import cm, mm
 import numpy as np
 import sys
 import os
 from collections import defaultdict
 
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS, EXTINCTION_EVENTS, BREAKTHROUGHS
-
-os.makedirs("../output", exist_ok=True)
+from model_store import ModelStore
+from tree_index import TreeIndex, build_tree_dict
+from layout import polar_to_xy
+from layout_cache import cached_radial_layout
+from label_index import BoxLabelIndex
+from svg_stream import SVGStreamWriter, element, path, circle, rect, text, use
+from svg_compact import svg_options, write_svgz
+import instrument
+
+OUTPUT_DIR = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(os.path.dirname(__file__), '..', 'output')
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 print("="*80)
 print("CREATING PERFECT SVG VISUALIZATION")
@@ -31,121 +38,110 @@ CENTER_Y = HEIGHT - 100  # Bottom center
 MIN_YEAR = 1958
 MAX_YEAR = 2026
 
+# Compact mode (AI_TREE_SVG_PRECISION=2): CSS classes per family, <symbol>
+# node glyphs and rounded coordinates; AI_TREE_SVGZ=1 also writes .svgz
+SVG_PRECISION, WRITE_SVGZ = svg_options()
+COMPACT = SVG_PRECISION is not None
+
 print(f"\n📐 Canvas: {WIDTH}mm x {HEIGHT}mm ({WIDTH/25.4:.1f}\" x {HEIGHT/25.4:.1f}\")")
 print(f"🎨 Scale: Professional print quality")
 
-# Build tree structure
-tree_dict = {}
-for model_data in AI_MODELS:
-    name, parent, year, color, importance, branch_type, extinct = model_data
-    tree_dict[name] = {
-        'parent': parent,
-        'year': year,
-        'color': color,
-        'importance': importance,
-        'branch_type': branch_type,
-        'extinct': extinct,
-        'children': []
-    }
-
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in tree_dict:
-        tree_dict[data['parent']]['children'].append(name)
+# Build tree structure once; subtree counts come from the shared index
+instrument.stage("build tree")
+model_store = ModelStore.from_records(AI_MODELS)
+tree_index = TreeIndex.from_store(model_store)
+tree_dict = build_tree_dict(AI_MODELS, tree_index)
 
 print(f"🌳 Models: {len(tree_dict)}")
 
 # Calculate positions with intelligent spacing
-def calculate_positions_perfect(tree_dict, root_name):
+def calculate_positions_perfect(tree_index, years):
     """Calculate perfect positions with no overlaps"""
-    positions = {}
-
-    def count_leaves(name):
-        node = tree_dict[name]
-        if not node['children']:
-            return 1
-        return sum(count_leaves(child) for child in node['children'])
-
-    total_leaves = count_leaves(root_name)
+    total_leaves = sum(1 for size in tree_index.subtree_size if size == 1)
     print(f"🍃 Leaf nodes: {total_leaves}")
 
-    # Use semicircle for better spacing
-    angle_start = -np.pi * 0.75  # 135 degrees
-    angle_end = np.pi * 0.75     # 135 degrees
-
-    def recurse(name, angle_min, angle_max, depth=0):
-        node = tree_dict[name]
-        year = node['year']
+    # Use semicircle for better spacing (135 degrees each side); leaves
+    # share the span evenly, parents sit at the centroid of their children
+    layout = cached_radial_layout(tree_index, years, -np.pi * 0.75, np.pi * 0.75,
+                                  weight='leaves', placement='centroid',
+                                  min_year=MIN_YEAR, max_year=MAX_YEAR,
+                                  exponent=0.85, scale=HEIGHT - 200)
 
-        # Smooth radial scaling
-        time_progress = (year - MIN_YEAR) / (MAX_YEAR - MIN_YEAR)
-        radius = np.power(time_progress, 0.85) * (HEIGHT - 200)
+    # Convert to cartesian (SVG y axis points down)
+    x, y = polar_to_xy(layout, center=(CENTER_X, CENTER_Y), flip_y=True)
 
-        children = node['children']
-
-        if not children:
-            # Leaf node - center of angle span
-            angle = (angle_min + angle_max) / 2
-        else:
-            # Parent - will be centered among children
-            # First recurse to position children
-            leaves_list = [count_leaves(child) for child in children]
-            total = sum(leaves_list)
-
-            current_angle = angle_min
-            child_angles = []
-
-            for child, leaf_count in zip(children, leaves_list):
-                child_span = (angle_max - angle_min) * (leaf_count / total)
-                child_angle = recurse(child, current_angle, current_angle + child_span, depth + 1)
-                child_angles.append(child_angle)
-                current_angle += child_span
-
-            # Parent at centroid of children
-            angle = np.mean(child_angles)
-
-        # Convert to cartesian
-        x = CENTER_X + radius * np.cos(angle)
-        y = CENTER_Y - radius * np.sin(angle)
-
-        positions[name] = {
-            'x': x,
-            'y': y,
-            'angle': angle,
-            'radius': radius,
-            'depth': depth
+    positions = {}
+    for i in tree_index.postorder:
+        positions[tree_index.names[i]] = {
+            'x': float(x[i]),
+            'y': float(y[i]),
+            'angle': float(layout.angle[i]),
+            'radius': float(layout.radius[i]),
+            'depth': tree_index.depth[i]
         }
-
-        return angle
-
-    recurse(root_name, angle_start, angle_end)
     return positions
 
+instrument.stage("layout")
 print("\n🎯 Computing optimal layout...")
-positions = calculate_positions_perfect(tree_dict, "Perceptron")
+positions = calculate_positions_perfect(tree_index, model_store.year)
 
-# Create SVG with professional settings
-dwg = svgwrite.Drawing(
-    '../output/ai_tree_perfect.svg',
+# Stream the SVG straight to disk, one layer group at a time
+SVG_PATH = os.path.join(OUTPUT_DIR, 'ai_tree_perfect.svg')
+svg = SVGStreamWriter(
+    SVG_PATH,
     size=(f'{WIDTH}mm', f'{HEIGHT}mm'),
     viewBox=f'0 0 {WIDTH} {HEIGHT}',
-    profile='full'
+    profile='full',
+    precision=SVG_PRECISION
 )
 
-# Add beautiful gradient definitions
-defs = dwg.defs
+# One CSS class per color family (stroke for branches, fill for nodes)
+family_class = {color: f'f{i}' for i, color in enumerate(model_store.color_labels)}
+
+def node_symbol_id(node_data):
+    return f"n{node_data['importance']}{'x' if node_data['extinct'] else ''}"
+
+def compact_stylesheet():
+    rules = [
+        '#branches path{fill:none;stroke-linecap:round;stroke-linejoin:round;opacity:0.7}',
+        '#branches .x{opacity:0.25}',
+        '#labels .s{fill:#333333;opacity:0.15}',
+        '#labels .m{fill:#1A1A1A;opacity:0.9}',
+        '#labels .b{font-weight:bold;font-size:8px}',
+        '#labels .e{text-anchor:end}',
+    ]
+    rules += [f'.{name}{{stroke:{color};fill:{color}}}' for color, name in family_class.items()]
+    return ''.join(rules)
+
+def write_node_symbols():
+    """Halo + body + highlight glyph per (importance, extinct), colored by the <use>"""
+    glyphs = {node_symbol_id(d): d for d in tree_dict.values()}
+    for symbol_id, node_data in sorted(glyphs.items()):
+        size = node_data['importance'] * 2.5
+        opacity = 0.4 if node_data['extinct'] else 0.95
+        with svg.group('symbol', id=symbol_id, overflow='visible'):
+            if node_data['importance'] >= 4:
+                svg.write(circle(center=(0, 0), r=size * 1.8, stroke='none', opacity=0.08))
+            svg.write(circle(center=(0, 0), r=size, stroke='white', stroke_width=0.8,
+                             opacity=opacity))
+            if node_data['importance'] >= 4:
+                svg.write(circle(center=(size*0.2, -size*0.2), r=size * 0.25, fill='white',
+                                 stroke='none', opacity=0.5))
 
 # Glow filters for important nodes
-blur = defs.add(dwg.filter(id='glow', x='-50%', y='-50%', width='200%', height='200%'))
-blur.feGaussianBlur(in_='SourceGraphic', stdDeviation='2')
+with svg.group('defs'):
+    with svg.group('filter', id='glow', x='-50%', y='-50%', width='200%', height='200%'):
+        svg.write(element('feGaussianBlur', in_='SourceGraphic', stdDeviation='2'))
+    if COMPACT:
+        svg.write(element('style', compact_stylesheet(), type='text/css'))
+        write_node_symbols()
 
 # Background
-dwg.add(dwg.rect(insert=(0, 0), size=('100%', '100%'), fill='#FCFCFA'))
+svg.write(rect(insert=(0, 0), size=('100%', '100%'), fill='#FCFCFA'))
 
+instrument.stage("branches")
 print("\n🎨 Drawing branches with perfect curves...")
 
-# Group for branches (background layer)
-branch_group = dwg.g(id='branches', opacity='0.8')
-
 def create_smooth_curve(x1, y1, x2, y2, angle1, angle2):
     """Create smooth quadratic bezier curve"""
     # Control points for natural flow
@@ -164,238 +160,244 @@ def create_smooth_curve(x1, y1, x2, y2, angle1, angle2):
     path_data = f'M {x1},{y1} C {cx1},{cy1} {cx2},{cy2} {x2},{y2}'
     return path_data
 
-branch_count = 0
-for name, data in tree_dict.items():
-    if data['parent'] and data['parent'] in positions:
-        parent_pos = positions[data['parent']]
-        child_pos = positions[name]
-
-        x1, y1 = parent_pos['x'], parent_pos['y']
-        x2, y2 = child_pos['x'], child_pos['y']
-        angle1, angle2 = parent_pos['angle'], child_pos['angle']
-
-        # Branch styling
-        width = data['importance'] * 1.2
-        opacity = 0.25 if data['extinct'] else 0.7
-        color = data['color']
-
-        path = create_smooth_curve(x1, y1, x2, y2, angle1, angle2)
-
-        branch_group.add(dwg.path(
-            d=path,
-            stroke=color,
-            stroke_width=width,
-            fill='none',
-            stroke_linecap='round',
-            stroke_linejoin='round',
-            opacity=opacity
-        ))
-        branch_count += 1
-
-dwg.add(branch_group)
+def branch_elements():
+    for name, data in tree_dict.items():
+        if data['parent'] and data['parent'] in positions:
+            parent_pos = positions[data['parent']]
+            child_pos = positions[name]
+
+            x1, y1 = parent_pos['x'], parent_pos['y']
+            x2, y2 = child_pos['x'], child_pos['y']
+            angle1, angle2 = parent_pos['angle'], child_pos['angle']
+
+            # Branch styling
+            width = data['importance'] * 1.2
+            opacity = 0.25 if data['extinct'] else 0.7
+            color = data['color']
+
+            d = create_smooth_curve(x1, y1, x2, y2, angle1, angle2)
+            if COMPACT:
+                classes = family_class[color] + (' x' if data['extinct'] else '')
+                yield path(d=d, class_=classes, stroke_width=width)
+                continue
+
+            yield path(
+                d=d,
+                stroke=color,
+                stroke_width=width,
+                fill='none',
+                stroke_linecap='round',
+                stroke_linejoin='round',
+                opacity=opacity
+            )
+
+# Branches (background layer)
+with svg.group(id='branches', opacity='0.8'):
+    branch_count = svg.write_all(branch_elements())
 print(f"✓ {branch_count} smooth branches")
+instrument.count(branch_count)
 
+instrument.stage("nodes")
 print("💎 Adding nodes with perfect placement...")
 
-# Group for nodes (middle layer)
-node_group = dwg.g(id='nodes')
+def node_elements():
+    for name, pos in positions.items():
+        node_data = tree_dict[name]
+        x, y = pos['x'], pos['y']
+
+        if COMPACT:
+            yield use(f'#{node_symbol_id(node_data)}', insert=(x, y),
+                      class_=family_class[node_data['color']])
+            continue
 
-node_count = 0
-for name, pos in positions.items():
-    node_data = tree_dict[name]
-    x, y = pos['x'], pos['y']
+        size = node_data['importance'] * 2.5
+        color = node_data['color']
+        opacity = 0.4 if node_data['extinct'] else 0.95
 
-    size = node_data['importance'] * 2.5
-    color = node_data['color']
-    opacity = 0.4 if node_data['extinct'] else 0.95
+        # Outer glow for important nodes
+        if node_data['importance'] >= 4:
+            yield circle(center=(x, y), r=size * 1.8, fill=color, opacity=0.08)
 
-    # Outer glow for important nodes
-    if node_data['importance'] >= 4:
-        node_group.add(dwg.circle(
+        # Main node
+        yield circle(
             center=(x, y),
-            r=size * 1.8,
+            r=size,
             fill=color,
-            opacity=0.08
-        ))
-
-    # Main node
-    node_group.add(dwg.circle(
-        center=(x, y),
-        r=size,
-        fill=color,
-        stroke='white',
-        stroke_width=0.8,
-        opacity=opacity
-    ))
-
-    # Highlight
-    if node_data['importance'] >= 4:
-        node_group.add(dwg.circle(
-            center=(x + size*0.2, y - size*0.2),
-            r=size * 0.25,
-            fill='white',
-            opacity=0.5
-        ))
-
-    node_count += 1
-
-dwg.add(node_group)
+            stroke='white',
+            stroke_width=0.8,
+            opacity=opacity
+        )
+
+        # Highlight
+        if node_data['importance'] >= 4:
+            yield circle(
+                center=(x + size*0.2, y - size*0.2),
+                r=size * 0.25,
+                fill='white',
+                opacity=0.5
+            )
+
+# Nodes (middle layer)
+with svg.group(id='nodes'):
+    svg.write_all(node_elements())
+node_count = len(positions)
 print(f"✓ {node_count} perfect nodes")
+instrument.count(node_count)
 
+instrument.stage("labels")
 print("✍️  Adding labels with intelligent placement...")
 
-# Group for labels (top layer)
-label_group = dwg.g(id='labels', font_family='Georgia, serif', font_size='7')
-
-# Track label bounds to prevent overlaps
-label_bounds = []
-
-def check_label_space(x, y, width, height, padding=15):
-    """Check if label space is clear"""
-    for bx, by, bw, bh in label_bounds:
-        if (abs(x - bx) < (width + bw)/2 + padding and
-            abs(y - by) < (height + bh)/2 + padding):
-            return False
-    return True
-
-labeled_count = 0
-
-# Sort by importance for priority labeling
-sorted_models = sorted(positions.items(),
-                       key=lambda x: tree_dict[x[0]]['importance'],
-                       reverse=True)
-
-for name, pos in sorted_models:
-    node_data = tree_dict[name]
-
-    # Only label important models
-    if node_data['importance'] < 4:
-        continue
-
-    x, y = pos['x'], pos['y']
-    angle = pos['angle']
-
-    # Determine label position (radial offset)
-    label_dist = 15
-    label_x = x + label_dist * np.cos(angle)
-    label_y = y - label_dist * np.sin(angle)
-
-    # Text anchor based on angle
-    if angle > np.pi/4 or angle < -np.pi/4:
-        anchor = 'end'
-        label_x = x - label_dist * np.cos(angle)
-    else:
-        anchor = 'start'
-
-    # Estimate label dimensions
-    label_width = len(name) * 4.5
-    label_height = 8
-
-    # Check if space is clear
-    if not check_label_space(label_x, label_y, label_width, label_height, 10):
-        continue
-
-    # Add label with subtle shadow
-    label_group.add(dwg.text(
-        name,
-        insert=(label_x + 0.5, label_y + 0.5),
-        fill='#333333',
-        opacity=0.15,
-        font_weight='bold' if node_data['importance'] >= 5 else 'normal',
-        text_anchor=anchor,
-        font_size='8' if node_data['importance'] >= 5 else '7'
-    ))
+# Track label bounds in a grid hash to prevent overlaps
+label_bounds = BoxLabelIndex(cell_size=50)
 
-    # Main label
-    label_group.add(dwg.text(
-        name,
-        insert=(label_x, label_y),
-        fill='#1A1A1A',
-        opacity=0.9,
-        font_weight='bold' if node_data['importance'] >= 5 else 'normal',
-        text_anchor=anchor,
-        font_size='8' if node_data['importance'] >= 5 else '7'
-    ))
+def label_elements():
+    # Sort by importance for priority labeling
+    sorted_models = sorted(positions.items(),
+                           key=lambda x: tree_dict[x[0]]['importance'],
+                           reverse=True)
 
-    label_bounds.append((label_x, label_y, label_width, label_height))
-    labeled_count += 1
+    for name, pos in sorted_models:
+        node_data = tree_dict[name]
 
-dwg.add(label_group)
-print(f"✓ {labeled_count} labels (no overlaps)")
+        # Only label important models
+        if node_data['importance'] < 4:
+            continue
 
-print("🕰️  Adding timeline rings...")
+        x, y = pos['x'], pos['y']
+        angle = pos['angle']
 
-# Timeline arcs
-timeline_group = dwg.g(id='timeline', opacity='0.25')
+        # Determine label position (radial offset)
+        label_dist = 15
+        label_x = x + label_dist * np.cos(angle)
+        label_y = y - label_dist * np.sin(angle)
 
-years = [1960, 1970, 1980, 1990, 2000, 2010, 2020, 2025]
-for year in years:
-    time_progress = (year - MIN_YEAR) / (MAX_YEAR - MIN_YEAR)
-    radius = np.power(time_progress, 0.85) * (HEIGHT - 200)
+        # Text anchor based on angle
+        if angle > np.pi/4 or angle < -np.pi/4:
+            anchor = 'end'
+            label_x = x - label_dist * np.cos(angle)
+        else:
+            anchor = 'start'
+
+        # Estimate label dimensions
+        label_width = len(name) * 4.5
+        label_height = 8
+
+        # Check if space is clear
+        if not label_bounds.is_clear(label_x, label_y, label_width, label_height, padding=10):
+            continue
+
+        label_bounds.add(label_x, label_y, label_width, label_height)
+
+        if COMPACT:
+            style = (' b' if node_data['importance'] >= 5 else '') + (' e' if anchor == 'end' else '')
+            yield text(name, insert=(label_x + 0.5, label_y + 0.5), class_='s' + style)
+            yield text(name, insert=(label_x, label_y), class_='m' + style)
+            continue
+
+        font_weight = 'bold' if node_data['importance'] >= 5 else 'normal'
+        font_size = '8' if node_data['importance'] >= 5 else '7'
+
+        # Add label with subtle shadow
+        yield text(
+            name,
+            insert=(label_x + 0.5, label_y + 0.5),
+            fill='#333333',
+            opacity=0.15,
+            font_weight=font_weight,
+            text_anchor=anchor,
+            font_size=font_size
+        )
+
+        # Main label
+        yield text(
+            name,
+            insert=(label_x, label_y),
+            fill='#1A1A1A',
+            opacity=0.9,
+            font_weight=font_weight,
+            text_anchor=anchor,
+            font_size=font_size
+        )
+
+# Labels (top layer)
+with svg.group(id='labels', font_family='Georgia, serif', font_size='7'):
+    svg.write_all(label_elements())
+labeled_count = len(label_bounds)
+print(f"✓ {labeled_count} labels (no overlaps)")
+instrument.count(labeled_count)
 
-    # Arc path
-    angle_start_deg = -135
-    angle_end_deg = 135
+instrument.stage("rings")
+print("🕰️  Adding timeline rings...")
 
-    large_arc = 1 if (angle_end_deg - angle_start_deg) > 180 else 0
+def timeline_elements():
+    years = [1960, 1970, 1980, 1990, 2000, 2010, 2020, 2025]
+    for year in years:
+        time_progress = (year - MIN_YEAR) / (MAX_YEAR - MIN_YEAR)
+        radius = np.power(time_progress, 0.85) * (HEIGHT - 200)
 
-    x1 = CENTER_X + radius * np.cos(np.radians(angle_start_deg))
-    y1 = CENTER_Y - radius * np.sin(np.radians(angle_start_deg))
-    x2 = CENTER_X + radius * np.cos(np.radians(angle_end_deg))
-    y2 = CENTER_Y - radius * np.sin(np.radians(angle_end_deg))
+        # Arc path
+        angle_start_deg = -135
+        angle_end_deg = 135
 
-    arc_path = f'M {x1},{y1} A {radius},{radius} 0 {large_arc},1 {x2},{y2}'
+        large_arc = 1 if (angle_end_deg - angle_start_deg) > 180 else 0
 
-    path_attrs = {
-        'd': arc_path,
-        'stroke': '#BDC3C7',
-        'stroke_width': 0.5,
-        'fill': 'none'
-    }
-    if year % 10 != 0:
-        path_attrs['stroke_dasharray'] = '2,3'
+        x1 = CENTER_X + radius * np.cos(np.radians(angle_start_deg))
+        y1 = CENTER_Y - radius * np.sin(np.radians(angle_start_deg))
+        x2 = CENTER_X + radius * np.cos(np.radians(angle_end_deg))
+        y2 = CENTER_Y - radius * np.sin(np.radians(angle_end_deg))
 
-    timeline_group.add(dwg.path(**path_attrs))
+        arc_path = f'M {x1},{y1} A {radius},{radius} 0 {large_arc},1 {x2},{y2}'
 
-    # Year label at bottom
-    label_y = CENTER_Y - radius * np.sin(np.radians(-90)) + 12
-    timeline_group.add(dwg.text(
-        str(year),
-        insert=(CENTER_X, label_y),
-        fill='#7F8C8D',
-        font_family='Arial, sans-serif',
-        font_size='6',
-        text_anchor='middle',
-        opacity='0.7'
-    ))
+        path_attrs = {
+            'stroke': '#BDC3C7',
+            'stroke_width': 0.5,
+            'fill': 'none'
+        }
+        if year % 10 != 0:
+            path_attrs['stroke_dasharray'] = '2,3'
+
+        yield path(arc_path, **path_attrs)
+
+        # Year label at bottom
+        label_y = CENTER_Y - radius * np.sin(np.radians(-90)) + 12
+        yield text(
+            str(year),
+            insert=(CENTER_X, label_y),
+            fill='#7F8C8D',
+            font_family='Arial, sans-serif',
+            font_size='6',
+            text_anchor='middle',
+            opacity='0.7'
+        )
 
-dwg.add(timeline_group)
+# Timeline arcs
+with svg.group(id='timeline', opacity='0.25'):
+    svg.write_all(timeline_elements())
 
+instrument.stage("legend")
 print("📝 Adding title and legend...")
 
 # Title
-title_group = dwg.g(id='title')
-title_group.add(dwg.text(
-    'The Phylogenetic Tree of Artificial Intelligence',
-    insert=(CENTER_X, 40),
-    fill='#1C2833',
-    font_family='Georgia, serif',
-    font_size='20',
-    font_weight='bold',
-    text_anchor='middle'
-))
-
-title_group.add(dwg.text(
-    'Evolution from Perceptrons to AGI • 1958—2025',
-    insert=(CENTER_X, 60),
-    fill='#515A5A',
-    font_family='Georgia, serif',
-    font_size='11',
-    font_style='italic',
-    text_anchor='middle'
-))
-
-dwg.add(title_group)
+with svg.group(id='title'):
+    svg.write(text(
+        'The Phylogenetic Tree of Artificial Intelligence',
+        insert=(CENTER_X, 40),
+        fill='#1C2833',
+        font_family='Georgia, serif',
+        font_size='20',
+        font_weight='bold',
+        text_anchor='middle'
+    ))
+
+    svg.write(text(
+        'Evolution from Perceptrons to AGI • 1958—2025',
+        insert=(CENTER_X, 60),
+        fill='#515A5A',
+        font_family='Georgia, serif',
+        font_size='11',
+        font_style='italic',
+        text_anchor='middle'
+    ))
 
 # Compact legend
 legend_items = [
@@ -409,88 +411,76 @@ legend_items = [
     ('#DC143C', 'Chinese AI'),
 ]
 
-legend_group = dwg.g(id='legend')
 legend_x = 50
 legend_y = 80
 
-for i, (color, label) in enumerate(legend_items):
-    x = legend_x + (i % 4) * 120
-    y = legend_y + (i // 4) * 15
-
-    legend_group.add(dwg.rect(
-        insert=(x, y-5),
-        size=(10, 8),
-        fill=color,
-        opacity=0.8,
-        rx=2
-    ))
+with svg.group(id='legend'):
+    for i, (color, label) in enumerate(legend_items):
+        x = legend_x + (i % 4) * 120
+        y = legend_y + (i // 4) * 15
 
-    legend_group.add(dwg.text(
-        label,
-        insert=(x + 15, y + 2),
-        fill='#515A5A',
-        font_family='Arial, sans-serif',
-        font_size='6'
-    ))
+        svg.write(rect(
+            insert=(x, y-5),
+            size=(10, 8),
+            fill=color,
+            opacity=0.8,
+            rx=2
+        ))
 
-dwg.add(legend_group)
+        svg.write(text(
+            label,
+            insert=(x + 15, y + 2),
+            fill='#515A5A',
+            font_family='Arial, sans-serif',
+            font_size='6'
+        ))
 
 # Caption
-caption_group = dwg.g(id='caption')
-caption_group.add(dwg.text(
-    f'Visualizing {len(tree_dict)} AI models • {branch_count} evolutionary connections • {labeled_count} key innovations labeled',
-    insert=(CENTER_X, HEIGHT - 20),
-    fill='#7F8C8D',
-    font_family='Georgia, serif',
-    font_size='7',
-    font_style='italic',
-    text_anchor='middle',
-    opacity='0.85'
-))
-
-dwg.add(caption_group)
-
-# Save perfect SVG
-print("\n💾 Saving perfect SVG...")
-dwg.save()
-print("✓ Saved: ../output/ai_tree_perfect.svg")
+with svg.group(id='caption'):
+    svg.write(text(
+        f'Visualizing {len(tree_dict)} AI models • {branch_count} evolutionary connections • {labeled_count} key innovations labeled',
+        insert=(CENTER_X, HEIGHT - 20),
+        fill='#7F8C8D',
+        font_family='Georgia, serif',
+        font_size='7',
+        font_style='italic',
+        text_anchor='middle',
+        opacity='0.85'
+    ))
 
-# Convert to high-res PNG
+# Finish the document
+instrument.stage("save")
+print("\n💾 Saving perfect SVG...")
+svg.close()
+print(f"✓ Saved: {SVG_PATH}")
+if WRITE_SVGZ:
+    print(f"✓ Saved: {write_svgz(SVG_PATH)}")
+
+# Convert to high-res PNGs: the SVG is parsed once and every size is
+# rendered in parallel (600 DPI in strips to bound memory)
+instrument.stage("rasterize")
 print("\n🖼️  Converting to high-resolution PNG...")
 try:
-    import cairosvg
-
-    # 300 DPI
-    scale = 300 / 25.4  # mm to pixels at 300 DPI
-    png_width = int(WIDTH * scale)
-    png_height = int(HEIGHT * scale)
-
-    cairosvg.svg2png(
-        url='../output/ai_tree_perfect.svg',
-        write_to='../output/ai_tree_perfect.png',
-        output_width=png_width,
-        output_height=png_height,
-        background_color='#FCFCFA'
-    )
-    print(f"✓ Saved: ../output/ai_tree_perfect.png ({png_width}x{png_height} px, 300 DPI)")
-
-    # 600 DPI for museum quality
-    scale_hires = 600 / 25.4
-    png_width_hires = int(WIDTH * scale_hires)
-    png_height_hires = int(HEIGHT * scale_hires)
-
-    cairosvg.svg2png(
-        url='../output/ai_tree_perfect.svg',
-        write_to='../output/ai_tree_perfect_print.png',
-        output_width=png_width_hires,
-        output_height=png_height_hires,
-        background_color='#FCFCFA'
-    )
-    print(f"✓ Saved: ../output/ai_tree_perfect_print.png ({png_width_hires}x{png_height_hires} px, 600 DPI)")
-
-except Exception as e:
-    print(f"⚠ PNG conversion failed: {e}")
+    # cairosvg, and through cairocffi the system cairo library
+    import cairosvg  # noqa: F401
+except (ImportError, OSError) as e:
+    print(f"⚠ PNG conversion skipped: {e}")
     print("  SVG is still perfect - open in Inkscape/Illustrator to export")
+else:
+    from svg_raster import rasterize_svg
+
+    rasters = {
+        'png': (os.path.join(OUTPUT_DIR, 'ai_tree_perfect.png'), {'dpi': 300}),
+        'print': (os.path.join(OUTPUT_DIR, 'ai_tree_perfect_print.png'), {'dpi': 600, 'tile_rows': 1024}),
+        'thumb': (os.path.join(OUTPUT_DIR, 'ai_tree_perfect_thumb.png'), {'width': 600}),
+        # Only with AI_TREE_FORMATS naming 'tiles' (a second 600 DPI render)
+        'tiles': (os.path.join(OUTPUT_DIR, 'ai_tree_perfect_tiles'), {'dpi': 600, 'tile_pyramid': 'png'}),
+    }
+    descriptions = {'png': '300 DPI', 'print': '600 DPI', 'thumb': 'gallery thumbnail',
+                    'tiles': 'deep-zoom tiles, open index.html'}
+    for key, png_path, (png_width, png_height) in rasterize_svg(
+            SVG_PATH, rasters, background_color='#FCFCFA'):
+        print(f"✓ Saved: {png_path} ({png_width}x{png_height} px, {descriptions[key]})")
 
 print("\n" + "="*80)
 print("✨ PERFECT VISUALIZATION COMPLETE")
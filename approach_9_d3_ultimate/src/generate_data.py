@@ -2,48 +2,86 @@
 """Generate JSON data for D3.js visualization"""
 
 import json
+import os
 import sys
-sys.path.insert(0, '../../data')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
 from ai_models import AI_MODELS
+from tree_index import TreeIndex
+import instrument
 
 # Build hierarchical structure for D3
 def build_hierarchy(models, root_name="Perceptron"):
     """Build D3-compatible hierarchy"""
-    model_dict = {}
+    index = TreeIndex.from_models(models)
+
+    nodes = []
     for model_data in models:
         name, parent, year, color, importance, branch_type, extinct = model_data
-        model_dict[name] = {
+        nodes.append({
             "name": name,
-            "parent": parent,
             "year": year,
             "color": color,
             "importance": importance,
             "branch_type": branch_type,
-            "extinct": extinct,
-            "children": []
-        }
-
-    # Link children
-    for name, data in model_dict.items():
-        if data['parent'] and data['parent'] in model_dict:
-            model_dict[data['parent']]['children'].append(data)
-
-    # Remove parent keys and return root
-    def clean_node(node):
-        node.pop('parent', None)
-        if node['children']:
-            for child in node['children']:
-                clean_node(child)
-        else:
-            node.pop('children', None)
-        return node
-
-    return clean_node(model_dict[root_name])
-
-hierarchy = build_hierarchy(AI_MODELS)
-
-# Save to JSON
-with open('../src/ai_data.json', 'w') as f:
-    json.dump(hierarchy, f, indent=2)
-
-print(f"✓ Generated ai_data.json with {len(AI_MODELS)} models")
+            "extinct": extinct
+        })
+
+    # Link children (leaves carry no "children" key)
+    for i, kids in enumerate(index.children):
+        if kids:
+            nodes[i]["children"] = [nodes[c] for c in kids]
+
+    return nodes[index.index[root_name]]
+
+# AI_TREE_JSON_FORMAT=columns writes the columnar payload (see
+# data/columnar_json.py) instead of the nested one; AI_TREE_JSON_BINARY=1
+# stores its numbers as typed arrays, AI_TREE_JSON_COMPRESS=gz,br adds
+# precompressed copies. AI_TREE_JSON_FORMAT=chunks writes ai_data_chunks/: a
+# manifest plus content-hashed subtree chunks (data/data_chunks.py), split
+# per branch under Transformers or, with AI_TREE_JSON_SPLIT=family, per family
+JSON_FORMATS = ('nested', 'columns', 'chunks')
+json_format = os.environ.get('AI_TREE_JSON_FORMAT', 'nested').strip().lower() or 'nested'
+if json_format not in JSON_FORMATS:
+    raise ValueError(f"Unknown AI_TREE_JSON_FORMAT {json_format!r} (use {', '.join(JSON_FORMATS)})")
+output_dir = os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.dirname(os.path.abspath(__file__))
+os.makedirs(output_dir, exist_ok=True)
+
+compress = [e.strip() for e in os.environ.get('AI_TREE_JSON_COMPRESS', '').split(',') if e.strip()]
+binary = os.environ.get('AI_TREE_JSON_BINARY', '').strip().lower() in ('1', 'true', 'yes')
+years = [m[2] for m in AI_MODELS]
+metadata = {'totalModels': len(AI_MODELS), 'yearRange': [min(years), max(years)]}
+
+if json_format == 'columns':
+    from columnar_json import write_models
+    # Straight from the model list, one row at a time: no hierarchy is built
+    instrument.stage("save columns")
+    filename = 'ai_data.columns.json'
+    write_models(os.path.join(output_dir, filename), AI_MODELS, {'metadata': metadata}, binary)
+elif json_format == 'chunks':
+    from data_chunks import write_model_chunks
+    instrument.stage("save chunks")
+    filename = 'ai_data_chunks'
+    split = os.environ.get('AI_TREE_JSON_SPLIT', 'branch').strip().lower()
+    write_model_chunks(os.path.join(output_dir, filename), AI_MODELS, {'metadata': metadata},
+                       binary, compress, split=split)
+    # Precompressed along with the chunks
+    compress = []
+else:
+    instrument.stage("build tree")
+    hierarchy = build_hierarchy(AI_MODELS)
+
+    # Save to JSON (next to this script unless AI_TREE_OUTPUT_DIR is set)
+    instrument.stage("save json")
+    filename = 'ai_data.json'
+    with open(os.path.join(output_dir, filename), 'w') as f:
+        json.dump(hierarchy, f, indent=2)
+
+if compress:
+    from columnar_json import brotli_available, precompress
+    instrument.stage("precompress")
+    for path in precompress(os.path.join(output_dir, filename), compress):
+        print(f"✓ Saved: {os.path.basename(path)}")
+    if 'br' in compress and not brotli_available():
+        print("⚠ brotli is not installed (pip install brotli); skipped .br")
+
+print(f"✓ Generated {filename} with {len(AI_MODELS)} models")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Cross-approach benchmark on synthetic catalogs
+Wall time per stage, CPU time, peak RSS, artist/element counts and output sizes, as JSON and a table
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+sys.path.insert(0, DATA_DIR)
+
+from build import APPROACHES
+
+BENCHMARKS = {name: script for name, (script, _) in APPROACHES.items()}
+BENCHMARKS['d3_data'] = 'approach_9_d3_ultimate/src/generate_data.py'
+
+DEFAULT_SIZES = ['curated', '1000', '10000']
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmark_results')
+RSS_INTERVAL = 0.05
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+# --- Child side: run one script, then count what it drew ---------------------
+
+def count_artists(namespace):
+    """Artists in every matplotlib Figure the script left in its globals"""
+    if 'matplotlib.figure' not in sys.modules:
+        return None
+    from matplotlib.figure import Figure
+
+    figures = {id(obj): obj for obj in namespace.values() if isinstance(obj, Figure)}
+    if not figures:
+        return None
+    return sum(len(fig.findobj()) for fig in figures.values())
+
+
+def run_child(script, result_path):
+    import runpy
+
+    sys.argv = [script]
+    namespace = runpy.run_path(script, run_name='__main__')
+    with open(result_path, 'w') as f:
+        json.dump({'artists': count_artists(namespace)}, f)
+
+
+# --- Parent side: measure ----------------------------------------------------
+
+def _process_tree_rss(pid):
+    """Resident bytes of pid plus all of its descendants (export workers)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f'/proc/{p}/statm') as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(p, ()))
+    return total
+
+
+def _stages(lines, start, end, burst=0.001):
+    """Progress lines -> [(label, seconds)]. A stage runs from a line to the
+    next one; lines printed in one burst (summaries, then the next "Doing
+    X..." line) are merged and named after the last of them"""
+    stages = []
+    label, since = 'startup', start
+    for t, text in lines:
+        if not re.search(r'\w', text):
+            continue
+        if t - since >= burst or label == 'startup':
+            stages.append((label, round(t - since, 4)))
+            since = t
+        label = text.strip()[:80]
+    stages.append((label, round(end - since, 4)))
+    return stages
+
+
+def _outputs(directory):
+    sizes, elements = {}, 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            sizes[os.path.relpath(path, directory)] = os.path.getsize(path)
+            if name.endswith('.svg'):
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    elements += sum(len(re.findall(r'<[A-Za-z]', block))
+                                    for block in iter(lambda: f.read(1 << 20), ''))
+    return sizes, elements
+
+
+def measure(name, script, catalog, timeout, profile=False):
+    """Run one approach on one catalog in a fresh process and measure it;
+    with profile, stages come from the script's instrument markers instead
+    of its progress lines"""
+    workdir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    output_dir = os.path.join(workdir, 'output')
+    os.makedirs(output_dir)
+    result_path = os.path.join(workdir, 'result.json')
+    profile_path = os.path.join(workdir, 'profile.json')
+    env = dict(os.environ, AI_TREE_OUTPUT_DIR=output_dir, AI_TREE_LAYOUT_CACHE='0',
+               PYTHONUNBUFFERED='1')
+    env.pop('AI_TREE_PROFILE', None)
+    if profile:
+        env.update(AI_TREE_PROFILE=profile_path, AI_TREE_PROFILE_FORMAT='json')
+    if catalog:
+        env['AI_TREE_CATALOG'] = catalog
+    else:
+        env.pop('AI_TREE_CATALOG', None)
+
+    stderr = open(os.path.join(workdir, 'stderr.log'), 'w+')
+    start = time.time()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child',
+                             os.path.join(ROOT, script), result_path],
+                            stdout=subprocess.PIPE, stderr=stderr, env=env, text=True,
+                            encoding='utf-8', errors='replace', start_new_session=True)
+
+    peak = [0]
+    timed_out = threading.Event()
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_INTERVAL):
+            peak[0] = max(peak[0], _process_tree_rss(proc.pid))
+            if time.time() - start > timeout and not timed_out.is_set():
+                timed_out.set()
+                os.killpg(proc.pid, 9)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    lines = [(time.time(), line) for line in proc.stdout]
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    end = time.time()
+    done.set()
+    sampler.join()
+
+    stderr.seek(0)
+    errors = [line.rstrip() for line in stderr if line.strip()]
+    stderr.close()
+    try:
+        with open(result_path) as f:
+            artists = json.load(f)['artists']
+    except (OSError, ValueError):
+        artists = None
+    try:
+        with open(profile_path) as f:
+            profiled = json.load(f)['stages']
+    except (OSError, ValueError):
+        profiled = None
+    sizes, elements = _outputs(output_dir)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    status = 'ok' if proc.returncode == 0 else 'timeout' if timed_out.is_set() else 'failed'
+    return {
+        'approach': name,
+        'status': status,
+        'exit_code': proc.returncode,
+        'wall_s': round(end - start, 3),
+        'cpu_s': round(usage.ru_utime + usage.ru_stime, 3),
+        # Whole process tree (sampled) and the main process alone (exact)
+        'peak_rss_mb': round(peak[0] / 2 ** 20, 1),
+        'main_peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        'artists': artists,
+        'svg_elements': elements or None,
+        'output_bytes': sum(sizes.values()),
+        'outputs': sizes,
+        'stages': ([(s['name'], s['wall_s']) for s in profiled] if profiled
+                   else _stages(lines, start, end)),
+        'profile': profiled,
+        'error': errors[-1] if status != 'ok' and errors else None,
+    }
+
+
+def make_catalogs(sizes, directory, seed, branching):
+    """{size label: catalog path or None for the curated dataset}"""
+    from catalog_io import write_jsonl
+    from synthetic_catalog import generate, iter_records
+
+    catalogs = {}
+    for size in sizes:
+        if size == 'curated':
+            catalogs[size] = None
+            continue
+        path = os.path.join(directory, f'catalog_{size}.jsonl')
+        write_jsonl(path, iter_records(generate(int(float(size)), seed, branching)))
+        catalogs[size] = path
+    return catalogs
+
+
+def _cell(run):
+    if run is None:
+        return ''
+    if run['status'] != 'ok':
+        return f"✗ {run['status']} ({run['wall_s']:.0f} s)"
+    return (f"{run['wall_s']:.1f} s · {run['peak_rss_mb']:.0f} MB · "
+            f"{run['output_bytes'] / 2 ** 20:.1f} MB out")
+
+
+def comparison_table(report):
+    sizes = report['sizes']
+    runs = {(r['approach'], r['size']): r for r in report['runs']}
+    lines = ['| Approach | ' + ' | '.join(f'{s} models' if s != 'curated' else
+                                           'curated (114)' for s in sizes) + ' |',
+             '|---' * (len(sizes) + 1) + '|']
+    for name in report['approaches']:
+        lines.append(f'| {name} | ' + ' | '.join(_cell(runs.get((name, s))) for s in sizes)
+                     + ' |')
+    lines.append('')
+    lines.append('Cells: wall time · peak RSS of the process tree · total output size.')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    if argv is None and sys.argv[1:2] == ['--child']:
+        return run_child(*sys.argv[2:4])
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help="catalog sizes, 'curated' for the real dataset "
+                             f"(default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), metavar='NAME',
+                        help=f"approaches (default: {', '.join(BENCHMARKS)})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--branching', default='preferential')
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="seconds before a run counts as broken (default: 600)")
+    parser.add_argument('--profile', action='store_true',
+                        help="record per-stage CPU time, memory and artist counts "
+                             "(tracemalloc slows the runs down)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help="report directory (default: benchmark_results/)")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    os.makedirs(args.output, exist_ok=True)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'seed': args.seed, 'branching': args.branching,
+        'sizes': args.sizes, 'approaches': names, 'runs': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='bench_catalogs_') as catalog_dir:
+        print(f"🧬 Generating catalogs: {', '.join(args.sizes)}")
+        catalogs = make_catalogs(args.sizes, catalog_dir, args.seed, args.branching)
+        for size in args.sizes:
+            for name in names:
+                print(f"⏱️  {name} @ {size}...", end=' ', flush=True)
+                run = measure(name, BENCHMARKS[name], catalogs[size], args.timeout,
+                              args.profile)
+                run['size'] = size
+                report['runs'].append(run)
+                print(_cell(run))
+
+    table = comparison_table(report)
+    with open(os.path.join(args.output, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=1)
+    with open(os.path.join(args.output, 'report.md'), 'w') as f:
+        f.write(f"# Benchmark ({report['created']}, {report['machine']['cpus']} CPUs)\n\n")
+        f.write(table + '\n')
+    print('\n' + table)
+    print(f"\n✓ Saved: {os.path.join(args.output, 'report.json')} and report.md")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Gallery build: every approach script plus the final_output/ copies in one pass
+The pipeline is a DAG; independent approaches render concurrently, unchanged ones are skipped
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+FINAL_DIR = os.path.join(ROOT, 'final_output')
+LOG_DIR = os.path.join(ROOT, '.build_cache', 'logs')
+PROFILE_DIR = os.path.join(ROOT, '.build_cache', 'profiles')
+sys.path.insert(0, DATA_DIR)
+
+from build_cache import (BuildCache, script_sources, render_params, files_written_since,
+                         script_output_dir, sync_file)
+
+# name: (script, files copied from its output/ into final_output/)
+APPROACHES = {
+    'matplotlib': ('approach_2_matplotlib/code/ai_tree_full.py',
+                   ['ai_tree_full_matplotlib.png', 'ai_tree_full_matplotlib.pdf',
+                    'ai_tree_full_matplotlib.svg']),
+    'networkx': ('approach_3_networkx/code/ai_tree_networkx.py',
+                 ['ai_tree_networkx.png', 'ai_tree_networkx.pdf', 'ai_tree_networkx.svg']),
+    'artistic': ('approach_4_artistic_matplotlib/code/ai_tree_artistic.py',
+                 ['ai_tree_artistic.png', 'ai_tree_artistic.pdf', 'ai_tree_artistic.svg']),
+    'semicircular': ('approach_5_semicircular/code/ai_tree_semicircular.py',
+                     ['ai_tree_semicircular.png', 'ai_tree_semicircular.pdf',
+                      'ai_tree_semicircular.svg']),
+    'poster': ('approach_7_poster_art/code/ai_tree_poster.py',
+               ['ai_tree_poster.png', 'ai_tree_poster.pdf']),
+    'perfect': ('approach_8_pure_svg/code/ai_tree_perfect.py',
+                ['ai_tree_perfect.png', 'ai_tree_perfect.svg']),
+    'plotly': ('approach_12_plotly_interactive/code/ai_tree_plotly.py', []),
+}
+
+# Angular range and keyword parameters each approach passes to
+# cached_radial_layout; the parent computes these once, the renderers it
+# forks then load them from the layout cache
+LAYOUTS = {
+    'matplotlib': (-math.pi, math.pi, {'weight': 'descendants'}),
+    'networkx': (-math.pi, math.pi, {'weight': 'leaves', 'placement': 'centroid'}),
+    'artistic': (-math.pi, math.pi, {'weight': 'descendants'}),
+    'semicircular': (-math.pi / 2, math.pi / 2, {'weight': 'descendants'}),
+    'poster': (-math.pi / 1.8, math.pi / 1.8, {'weight': 'leaves'}),
+    'perfect': (-math.pi * 0.75, math.pi * 0.75, {'weight': 'leaves', 'placement': 'centroid'}),
+}
+
+# Hand-written viewers and data copied as-is
+STATIC_FILES = {
+    'ai_tree_d3.html': 'approach_6_d3js/src/ai_tree_d3.html',
+    'ai_tree_data.json': 'tree_builder/ai_tree_data.json',
+    'tree_viewer.html': 'tree_builder/tree_viewer.html',
+}
+
+
+# --- Shared upstream stages, run once in the parent -------------------------
+# Renderers are forked from the parent, so they start with the dataset,
+# numpy and matplotlib already imported.
+
+def stage_dataset():
+    from ai_models import AI_MODELS
+    from model_store import ModelStore
+    return ModelStore.from_records(AI_MODELS)
+
+
+def stage_tree_index(store):
+    from tree_index import TreeIndex
+    # Raises on duplicate names, before any renderer starts
+    return TreeIndex.from_store(store)
+
+
+def stage_layout(index, store, names):
+    """Angular layouts of the approaches in `names`, into the layout cache"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    from layout_cache import cached_radial_layout, enabled
+
+    if not enabled():
+        return
+    for name in names:
+        if name in LAYOUTS:
+            angle_start, angle_end, params = LAYOUTS[name]
+            cached_radial_layout(index, store.year, angle_start, angle_end, **params)
+
+
+# --- Render + export, one forked process per approach -----------------------
+
+def _run_approach(script, log_path, export_jobs):
+    """Child process body: run the script as __main__ with output sent to its
+    log, its export pools sized to `export_jobs` unless AI_TREE_JOBS is set"""
+    import runpy
+
+    os.environ.setdefault('AI_TREE_JOBS', str(export_jobs))
+    log = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(log, 1)
+    os.dup2(log, 2)
+    sys.argv = [script]
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise
+    except BaseException:
+        traceback.print_exc()
+        sys.stderr.flush()
+        raise SystemExit(1)
+    finally:
+        # multiprocessing children skip atexit, where the profile is written
+        for module in ('instrument', 'data.instrument'):
+            if module in sys.modules:
+                sys.modules[module].finish()
+
+
+def plan(names, cache, force):
+    """{name: (script, key)} for the approaches that need rendering"""
+    params = render_params()
+    stale = {}
+    for name in names:
+        script = os.path.join(ROOT, APPROACHES[name][0])
+        key = cache.key(script_sources(script), params)
+        if force or not cache.is_fresh(APPROACHES[name][0], key):
+            stale[name] = (script, key)
+    return stale
+
+
+def render_all(stale, cache, jobs):
+    """Render the stale approaches, at most `jobs` at a time; returns failed names"""
+    from multiprocessing import connection
+    from export import fork_context
+
+    context = fork_context()
+    os.makedirs(LOG_DIR, exist_ok=True)
+    queue = sorted(stale)
+    running, failed = {}, []
+    # Every approach fans out its own export pool: share the CPUs out among
+    # those running at once rather than start up to cpu_count**2 processes
+    export_jobs = max(1, (os.cpu_count() or 1) // min(jobs, len(queue)))
+
+    while queue or running:
+        while queue and len(running) < jobs:
+            name = queue.pop(0)
+            script, _ = stale[name]
+            log_path = os.path.join(LOG_DIR, f'{name}.log')
+            # Workers fan out their own export pools, so they must not be daemonic
+            process = context.Process(target=_run_approach,
+                                      args=(script, log_path, export_jobs),
+                                      name=name, daemon=False)
+            start = time.time()
+            # Children would otherwise flush our buffered output into their logs
+            sys.stdout.flush()
+            process.start()
+            running[process.sentinel] = (name, process, start, log_path)
+            print(f"   🔨 {name} started")
+
+        for sentinel in connection.wait(list(running)):
+            name, process, start, log_path = running.pop(sentinel)
+            process.join()
+            script, key = stale[name]
+            elapsed = time.time() - start
+            if process.exitcode != 0:
+                failed.append(name)
+                print(f"   ✗ {name} failed after {elapsed:.1f}s (see {os.path.relpath(log_path, ROOT)})")
+                continue
+            # Filesystem mtimes can lag the wall clock slightly
+            outputs = files_written_since(script_output_dir(script), start - 1)
+            if outputs:
+                cache.record(APPROACHES[name][0], key, outputs)
+            print(f"   ✓ {name} done in {elapsed:.1f}s ({len(outputs)} files)")
+    return failed
+
+
+# --- Copy to final_output/ --------------------------------------------------
+
+def copy_final(names, failed):
+    copies = []
+    for name in names:
+        if name in failed:
+            continue
+        output_dir = script_output_dir(os.path.join(ROOT, APPROACHES[name][0]))
+        copies.extend((os.path.join(output_dir, f), f) for f in APPROACHES[name][1])
+    copies.extend((os.path.join(ROOT, src), dst) for dst, src in STATIC_FILES.items())
+
+    copied = 0
+    for src, dst in copies:
+        if not os.path.exists(src):
+            print(f"   ⚠ missing {os.path.relpath(src, ROOT)}")
+            continue
+        copied += sync_file(src, os.path.join(FINAL_DIR, dst))
+    print(f"   ✓ final_output/: {copied} updated, {len(copies) - copied} unchanged")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(APPROACHES), metavar='NAME',
+                        help=f"approaches to build (default: all of {', '.join(APPROACHES)})")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help="approaches rendered at once (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="ignore the build cache")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, metavar='DIR',
+                        help="write a per-stage profile of each script to DIR "
+                             "(default: .build_cache/profiles/); use with --force")
+    args = parser.parse_args(argv)
+    if args.profile:
+        os.environ['AI_TREE_PROFILE'] = os.path.join(args.profile, '')
+
+    names = args.only or list(APPROACHES)
+    cache = BuildCache()
+    started = time.time()
+
+    print("📋 Checking build cache...")
+    stale = plan(names, cache, args.force)
+    for name in names:
+        if name not in stale:
+            print(f"   ✓ {name} up to date")
+
+    failed = []
+    if stale:
+        print("📊 Loading dataset and tree index, computing layouts...")
+        store = stage_dataset()
+        stage_layout(stage_tree_index(store), store, stale)
+        print(f"🎨 Rendering {len(stale)} approach(es), {args.jobs} at a time...")
+        failed = render_all(stale, cache, max(1, args.jobs))
+
+    print("📁 Updating final_output/...")
+    copy_final(names, failed)
+    print(f"\n✨ Build finished in {time.time() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
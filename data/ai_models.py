@@ -3,6 +3,8 @@ Complete AI Evolution Dataset
 All major AI models from 1958-2025 with relationships
 """
 
+import os
+
 # Format: (name, parent, year, color, importance, branch_type, extinct)
 AI_MODELS = [
     # ROOT
@@ -217,3 +219,17 @@ BREAKTHROUGHS = [
     ("ChatGPT", 2022, "💥"),
     ("DeepSeek-R1", 2025, "💥"),
 ]
+
+# Point every renderer at another catalog (e.g. one written by
+# synthetic_catalog.py) without editing them: AI_TREE_CATALOG=catalog.jsonl.
+# Whatever the catalog doesn't define keeps the values above
+if os.environ.get('AI_TREE_CATALOG'):
+    if __package__:
+        from .catalog_io import read_catalog_tables as _read_catalog_tables
+    else:
+        from catalog_io import read_catalog_tables as _read_catalog_tables
+    _tables = _read_catalog_tables(os.environ['AI_TREE_CATALOG'])
+    AI_MODELS = _tables['AI_MODELS']
+    COLOR_SCHEME = {**COLOR_SCHEME, **_tables.get('COLOR_SCHEME', {})}
+    EXTINCTION_EVENTS = _tables.get('EXTINCTION_EVENTS', EXTINCTION_EVENTS)
+    BREAKTHROUGHS = _tables.get('BREAKTHROUGHS', BREAKTHROUGHS)
@@ -0,0 +1,97 @@
+"""
+Batched branch rendering for the matplotlib renderers
+All tapered, alpha-faded branch segments emitted as a few LineCollections
+"""
+
+import numpy as np
+
+
+def cubic_bezier(p0, p1, p2, p3, n_points):
+    """Sample E cubic Bezier curves at once.
+
+    p0..p3 are (E, 2) arrays of end/control points; returns an
+    (E, n_points, 2) array, matching the per-edge
+    (1-t)**3*p0 + 3*(1-t)**2*t*p1 + 3*(1-t)*t**2*p2 + t**3*p3 formula.
+    """
+    t = np.linspace(0, 1, n_points)[None, :, None]
+    p0, p1, p2, p3 = (np.asarray(p, dtype=np.float64)[:, None, :] for p in (p0, p1, p2, p3))
+    return (1-t)**3*p0 + 3*(1-t)**2*t*p1 + 3*(1-t)*t**2*p2 + t**3*p3
+
+
+def polyline_interpolate(vertices, steps):
+    """Linearly resample (E, V, 2) polylines with `steps` parts per leg.
+
+    Vectorized equivalent of Path(vertices).interpolated(steps).vertices,
+    returning (E, (V-1)*steps + 1, 2).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    legs = vertices.shape[1] - 1
+    s = np.arange(steps) / steps
+    start = vertices[:, :-1, None, :]
+    delta = (vertices[:, 1:] - vertices[:, :-1])[:, :, None, :]
+    points = (start + delta * s[None, None, :, None]).reshape(len(vertices), legs * steps, 2)
+    return np.concatenate([points, vertices[:, -1:, :]], axis=1)
+
+
+def segments_from_points(points):
+    """(E, T, 2) polylines -> (E, T-1, 2, 2) consecutive two-point segments"""
+    points = np.asarray(points)
+    return np.stack([points[:, :-1], points[:, 1:]], axis=2)
+
+
+class BranchBatch:
+    """Collects branch pieces and draws them as one LineCollection per zorder.
+
+    Each piece is a polyline (usually a two-point segment) with its own
+    RGBA color and linewidth, so tapering and alpha fades survive batching.
+    Pieces sharing a zorder keep their insertion order, which is the order
+    the old per-segment ax.plot calls were stacked in.
+    """
+
+    def __init__(self, capstyle='round', joinstyle='round'):
+        self.capstyle = capstyle
+        self.joinstyle = joinstyle
+        self._groups = {}
+
+    def add(self, pieces, rgba, widths, zorder=1):
+        """Queue pieces: (k, m, 2) array or list of (m_i, 2) arrays,
+        rgba (k, 4) or a single color, widths (k,) or a scalar."""
+        k = len(pieces)
+        if k == 0:
+            return
+        rgba = np.broadcast_to(np.asarray(rgba, dtype=np.float64), (k, 4))
+        widths = np.broadcast_to(np.asarray(widths, dtype=np.float64), (k,))
+        group = self._groups.setdefault(zorder, ([], [], []))
+        if isinstance(pieces, np.ndarray):
+            group[0].extend(pieces)
+        else:
+            group[0].extend(np.asarray(p) for p in pieces)
+        group[1].append(rgba)
+        group[2].append(widths)
+
+    def __len__(self):
+        return sum(len(g[0]) for g in self._groups.values())
+
+    def draw(self, ax):
+        """Add the collections to `ax` and return them"""
+        from matplotlib.collections import LineCollection
+
+        collections = []
+        for zorder in sorted(self._groups):
+            pieces, colors, widths = self._groups[zorder]
+            lc = LineCollection(pieces, colors=np.concatenate(colors),
+                                linewidths=np.concatenate(widths),
+                                capstyle=self.capstyle, joinstyle=self.joinstyle,
+                                zorder=zorder)
+            ax.add_collection(lc, autolim=False)
+            collections.append(lc)
+        self._groups = {}
+        return collections
+
+
+def segment_rgba(edge_rgba, alphas):
+    """Per-segment RGBA from (E, 4) edge colors and (E, S) segment alphas -> (E*S, 4)"""
+    alphas = np.asarray(alphas, dtype=np.float64)
+    rgba = np.repeat(np.asarray(edge_rgba, dtype=np.float64), alphas.shape[1], axis=0)
+    rgba[:, 3] = alphas.ravel()
+    return rgba
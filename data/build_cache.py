@@ -0,0 +1,211 @@
+"""
+Content-hash build cache for the approach scripts
+A script is only re-run when its source, the data modules it uses or the output settings change
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(DATA_DIR)
+DEFAULT_CACHE_DIR = os.path.join(REPO_ROOT, '.build_cache')
+
+# Environment variables that change what a script writes (formats, SVG mode, ...)
+PARAM_PREFIX = 'AI_TREE_'
+# ...except these, which only change where caches and profiles go
+NON_OUTPUT_PARAMS = ('AI_TREE_CACHE_DIR', 'AI_TREE_PROFILE', 'AI_TREE_PROFILE_FORMAT',
+                     'AI_TREE_PROFILE_MEMORY', 'AI_TREE_CPROFILE')
+# Libraries whose version changes rendered pixels
+RENDER_LIBRARIES = ('matplotlib', 'numpy', 'networkx', 'plotly', 'cairosvg', 'svgwrite', 'pillow')
+
+_IMPORT = re.compile(r'^\s*(?:from\s+(?:data\.)?(\w+)(?:\.\w+)*\s+import|import\s+(?:data\.)?(\w+))',
+                     re.M)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def script_sources(script):
+    """The script plus every data/ module it imports (transitively) and the
+    data/ files those modules refer to by name, e.g. tile_viewer.html"""
+    resources = [name for name in os.listdir(DATA_DIR)
+                 if not name.endswith(('.py', '.pyc')) and
+                 os.path.isfile(os.path.join(DATA_DIR, name))]
+    sources, pending = [], [os.path.abspath(script)]
+    while pending:
+        path = pending.pop()
+        if path in sources:
+            continue
+        sources.append(path)
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        for match in _IMPORT.finditer(text):
+            module = os.path.join(DATA_DIR, (match.group(1) or match.group(2)) + '.py')
+            if os.path.exists(module):
+                pending.append(module)
+        pending.extend(os.path.join(DATA_DIR, name) for name in resources if name in text)
+    return sorted(sources)
+
+
+def render_params():
+    """Output settings and library versions that belong in every cache key"""
+    from importlib import metadata
+
+    params = {key: value for key, value in os.environ.items()
+              if key.startswith(PARAM_PREFIX) and key not in NON_OUTPUT_PARAMS}
+    if params.get('AI_TREE_CATALOG'):
+        # The catalog file is an input too, not just its path
+        params['AI_TREE_CATALOG'] += ':' + file_digest(params['AI_TREE_CATALOG'])
+    versions = {'python': sys.version.split()[0]}
+    for name in RENDER_LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            pass
+    return {'env': params, 'versions': versions}
+
+
+class BuildCache:
+    """Cache records, one JSON file per target under `cache_dir`.
+
+    A record holds the target's key (a hash of its sources and parameters)
+    and the size/mtime of every output it wrote. The target is fresh when
+    the key matches and all outputs are still on disk, unmodified.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.environ.get('AI_TREE_CACHE_DIR') or DEFAULT_CACHE_DIR
+
+    def key(self, sources, params=None):
+        digest = hashlib.sha256()
+        for path in sorted(sources):
+            digest.update(os.path.relpath(path, REPO_ROOT).encode())
+            digest.update(file_digest(path).encode())
+        digest.update(json.dumps(params or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _record_path(self, name):
+        return os.path.join(self.cache_dir, re.sub(r'[^\w.-]', '_', name) + '.json')
+
+    def load(self, name):
+        try:
+            with open(self._record_path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, name, key):
+        record = self.load(name)
+        if not record or record.get('key') != key or not record.get('outputs'):
+            return False
+        for path, (size, mtime_ns) in record['outputs'].items():
+            try:
+                stat = os.stat(os.path.join(REPO_ROOT, path))
+            except OSError:
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+        return True
+
+    def record(self, name, key, outputs):
+        outputs = {os.path.relpath(os.path.abspath(p), REPO_ROOT): p for p in outputs}
+        entry = {'key': key, 'outputs': {}}
+        for rel, path in sorted(outputs.items()):
+            stat = os.stat(path)
+            entry['outputs'][rel] = [stat.st_size, stat.st_mtime_ns]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._record_path(name) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(entry, f, indent=1)
+        os.replace(tmp, self._record_path(name))
+
+    def invalidate(self, name):
+        try:
+            os.remove(self._record_path(name))
+        except OSError:
+            pass
+
+
+def files_written_since(directory, start):
+    """Every file under `directory` modified at or after `start` (time.time())"""
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.stat(path).st_mtime >= start:
+                written.append(path)
+    return sorted(written)
+
+
+def sync_file(src, dst):
+    """Copy src over dst unless dst already has the same contents; True if copied"""
+    if (os.path.exists(dst) and os.path.getsize(dst) == os.path.getsize(src)
+            and file_digest(dst) == file_digest(src)):
+        return False
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    shutil.copy2(src, dst)
+    return True
+
+
+def script_output_dir(script):
+    """Where an approach script writes: AI_TREE_OUTPUT_DIR, else <approach>/output"""
+    return os.environ.get('AI_TREE_OUTPUT_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(script))), 'output')
+
+
+def run_script(script, cache=None, force=False, output_dir=None, stdout=None):
+    """Run an approach script from its own directory unless its cached
+    outputs are fresh. Returns (ran, outputs)."""
+    cache = cache or BuildCache()
+    script = os.path.abspath(script)
+    code_dir = os.path.dirname(script)
+    output_dir = output_dir or script_output_dir(script)
+    name = os.path.relpath(script, REPO_ROOT)
+    key = cache.key(script_sources(script), render_params())
+
+    if not force and cache.is_fresh(name, key):
+        outputs = [os.path.join(REPO_ROOT, p) for p in cache.load(name)['outputs']]
+        return False, outputs
+
+    cache.invalidate(name)
+    # Filesystem mtimes can lag the wall clock slightly
+    start = time.time() - 1
+    subprocess.run([sys.executable, os.path.basename(script)], cwd=code_dir, check=True,
+                   stdout=stdout)
+    outputs = files_written_since(output_dir, start)
+    if outputs:
+        cache.record(name, key, outputs)
+    return True, outputs
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-run approach scripts whose inputs changed")
+    parser.add_argument('scripts', nargs='+', help="approach scripts, e.g. "
+                        "approach_7_poster_art/code/ai_tree_poster.py")
+    parser.add_argument('--force', action='store_true', help="ignore the cache")
+    parser.add_argument('--cache-dir', help=f"default: {DEFAULT_CACHE_DIR}")
+    args = parser.parse_args(argv)
+
+    cache = BuildCache(args.cache_dir)
+    for script in args.scripts:
+        ran, outputs = run_script(script, cache, force=args.force, stdout=subprocess.DEVNULL)
+        state = 'rebuilt' if ran else 'up to date'
+        print(f"{'🔨' if ran else '✓'} {script}: {state} ({len(outputs)} files)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Model catalog files
+Stream AI_MODELS-style 7-tuples to/from .jsonl, viewer-schema .json and ai_models.py-style modules
+"""
+
+import json
+import os
+
+
+def _slug(name):
+    return '-'.join(name.lower().replace('.', '-').split()) or 'model'
+
+
+def write_jsonl(path, records, color_scheme=None):
+    """One JSON array per line, in AI_MODELS tuple order; returns the count
+    (colors are inline, so no color scheme is needed)"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(list(record), ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def write_python(path, records, color_scheme=None, header="Synthetic AI model catalog"):
+    """A module with the same names as data/ai_models.py (AI_MODELS, COLOR_SCHEME,
+    EXTINCTION_EVENTS, BREAKTHROUGHS); only practical up to ~1e5 models"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'"""\n{header}\n"""\n\n')
+        f.write("# Format: (name, parent, year, color, importance, branch_type, extinct)\n")
+        f.write("AI_MODELS = [\n")
+        for record in records:
+            f.write(f"    {tuple(record)!r},\n")
+            count += 1
+        f.write("]\n\n")
+        f.write(f"COLOR_SCHEME = {dict(color_scheme or {})!r}\n\n")
+        f.write("EXTINCTION_EVENTS = []\n\nBREAKTHROUGHS = []\n")
+    return count
+
+
+def write_viewer_json(path, records, color_scheme=None, title="Synthetic AI model catalog"):
+    """tree_builder/ai_tree_data.json schema ({metadata, families, models}),
+    written model by model so the catalog never has to fit in memory"""
+    ids, used = {}, set()
+    families = {}
+    years = [None, None]
+    count = 0
+    tmp = path + '.models'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for name, parent, year, color, importance, branch_type, extinct in records:
+            model_id = _slug(name)
+            if model_id in used:
+                model_id = f'{model_id}-{count}'
+            ids[name] = model_id
+            used.add(model_id)
+            families.setdefault(branch_type, color)
+            years[0] = year if years[0] is None else min(years[0], year)
+            years[1] = year if years[1] is None else max(years[1], year)
+            model = {'id': model_id, 'name': name, 'year': year, 'family': branch_type,
+                     'parents': [ids[parent]] if parent in ids else [],
+                     'importance': importance, 'extinct': extinct}
+            f.write(',\n    ' if count else '\n    ')
+            f.write(json.dumps(model, ensure_ascii=False))
+            count += 1
+
+    scheme = dict(color_scheme or {})
+    header = {
+        'metadata': {'title': title, 'version': '1.0', 'totalModels': count,
+                     'yearRange': years},
+        'families': {family: {'label': family.replace('-', ' ').title(),
+                              'color': scheme.get(family, color)}
+                     for family, color in families.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write(json.dumps(header, ensure_ascii=False, indent=2)[:-2])
+        out.write(',\n  "models": [')
+        with open(tmp, encoding='utf-8') as f:
+            for block in iter(lambda: f.read(1 << 20), ''):
+                out.write(block)
+        out.write('\n  ]\n}\n')
+    os.remove(tmp)
+    return count
+
+
+WRITERS = {'.jsonl': write_jsonl, '.json': write_viewer_json, '.py': write_python}
+
+# data/ai_models.py names besides AI_MODELS that a .py catalog may define
+CATALOG_TABLES = ('COLOR_SCHEME', 'EXTINCTION_EVENTS', 'BREAKTHROUGHS')
+
+
+def write_catalog(path, records, color_scheme=None):
+    """Write records in the format implied by the file extension"""
+    ext = os.path.splitext(path)[1]
+    if ext not in WRITERS:
+        raise ValueError(f"Unknown catalog format {ext!r} (use {', '.join(WRITERS)})")
+    return WRITERS[ext](path, records, color_scheme)
+
+
+def iter_catalog(path):
+    """Yield 7-tuples from a .jsonl, viewer .json (nested or columnar) or
+    ai_models-style .py catalog"""
+    ext = os.path.splitext(path)[1]
+    if ext == '.jsonl':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield tuple(json.loads(line))
+    elif ext == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if 'columns' in data:
+            from columnar_json import decode, model_records
+            header, columns = decode(data)
+            yield from model_records(columns, {family: info.get('color') for family, info
+                                               in header.get('families', {}).items()})
+            return
+        colors = {family: info.get('color') for family, info in data['families'].items()}
+        names = {model['id']: model['name'] for model in data['models']}
+        for model in data['models']:
+            parents = model.get('parents') or []
+            yield (model['name'], names.get(parents[0]) if parents else None, model['year'],
+                   colors.get(model['family']), model['importance'], model['family'],
+                   bool(model.get('extinct', False)))
+    elif ext == '.py':
+        import runpy
+        yield from (tuple(m) for m in runpy.run_path(path)['AI_MODELS'])
+    else:
+        raise ValueError(f"Unknown catalog format {ext!r} (use {', '.join(WRITERS)})")
+
+
+def read_catalog(path):
+    """The whole catalog as an AI_MODELS-style list"""
+    return list(iter_catalog(path))
+
+
+def read_catalog_tables(path):
+    """{name: value} for the data/ai_models.py names a catalog defines:
+    AI_MODELS always, the CATALOG_TABLES a .py catalog sets, and a viewer
+    .json's family colors as COLOR_SCHEME"""
+    ext = os.path.splitext(path)[1]
+    if ext == '.py':
+        import runpy
+        namespace = runpy.run_path(path)
+        tables = {name: namespace[name] for name in CATALOG_TABLES if name in namespace}
+        tables['AI_MODELS'] = [tuple(m) for m in namespace['AI_MODELS']]
+        return tables
+    tables = {'AI_MODELS': read_catalog(path)}
+    if ext == '.json':
+        scheme = {}
+        for _, _, _, color, _, branch_type, _ in tables['AI_MODELS']:
+            if color:
+                scheme.setdefault(branch_type, color)
+        tables['COLOR_SCHEME'] = scheme
+    return tables
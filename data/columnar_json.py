@@ -0,0 +1,335 @@
+"""
+Columnar JSON for the D3 viewers
+One array per field, dictionary-encoded families/colors, parent indices and quantized numbers, written in one streaming pass
+"""
+
+import array
+import base64
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+
+FORMAT = 'ai-tree-columns'
+VERSION = 1
+
+Field = namedtuple('Field', ['name', 'kind', 'step'], defaults=(None,))
+Field.__doc__ = """One column.
+
+kind    'str'       plain strings
+        'category'  strings stored once in a dictionary, rows hold indices
+        'int'       integers, stored relative to the column minimum
+        'float'     quantized to multiples of `step`, then stored like 'int'
+        'bool'      0/1
+        'parent'    index of the row whose first field equals this value
+                    (-1 for none), e.g. a parent name or id
+"""
+
+# Column order follows the AI_MODELS tuple, so its rows go in unchanged
+MODEL_FIELDS = (Field('name', 'str'), Field('parent', 'parent'), Field('year', 'int'),
+                Field('color', 'category'), Field('importance', 'int'),
+                Field('family', 'category'), Field('extinct', 'bool'))
+# tree_builder/ai_tree_data.json models (single parent, as every model has)
+VIEWER_FIELDS = (Field('id', 'str'), Field('name', 'str'), Field('parent', 'parent'),
+                 Field('year', 'int'), Field('family', 'category'), Field('importance', 'int'),
+                 Field('extinct', 'bool'), Field('breakthrough', 'bool'),
+                 Field('description', 'str'))
+
+# (typecode, dtype, min, max) from narrowest up; dtype names match JS typed arrays
+_DTYPES = [('B', 'uint8', 0, 2 ** 8 - 1), ('b', 'int8', -2 ** 7, 2 ** 7 - 1),
+           ('H', 'uint16', 0, 2 ** 16 - 1), ('h', 'int16', -2 ** 15, 2 ** 15 - 1),
+           ('I', 'uint32', 0, 2 ** 32 - 1), ('i', 'int32', -2 ** 31, 2 ** 31 - 1)]
+_CHUNK = 1 << 16
+
+
+class ColumnWriter:
+    """Streaming writer: add() one row at a time, close() writes the file.
+
+    Strings are spooled to temporary files and numbers kept in compact
+    arrays, so memory grows by a few bytes per row and no per-node dict
+    or nested hierarchy is ever built. binary=True stores numeric columns
+    as base64 little-endian typed arrays instead of JSON number lists.
+    """
+
+    def __init__(self, path, fields, binary=False):
+        self.path = path
+        self.fields = fields
+        self.binary = binary
+        self.rows = 0
+        self._spool = tempfile.TemporaryDirectory(prefix='columns_',
+                                                  dir=os.path.dirname(os.path.abspath(path)))
+        self._columns = []
+        for i, field in enumerate(fields):
+            if field.kind == 'str':
+                spool = open(os.path.join(self._spool.name, str(i)), 'w', encoding='utf-8')
+                self._columns.append(spool)
+            elif field.kind == 'category':
+                self._columns.append(({}, array.array('q')))
+            elif field.kind in ('int', 'float', 'bool', 'parent'):
+                self._columns.append(array.array('q'))
+            else:
+                raise ValueError(f"Unknown column kind {field.kind!r}")
+        self._keys = {}
+        self._forward = []
+
+    def add(self, row):
+        for field, column, value in zip(self.fields, self._columns, row):
+            kind = field.kind
+            if kind == 'str':
+                column.write((',' if self.rows else '') + json.dumps(value, ensure_ascii=False))
+            elif kind == 'category':
+                codes, values = column
+                values.append(codes.setdefault(value, len(codes)))
+            elif kind == 'float':
+                column.append(round(value / field.step))
+            elif kind == 'parent':
+                row_index = self._keys.get(value, -1)
+                if row_index < 0 and value is not None:
+                    self._forward.append((self.rows, value))
+                column.append(row_index)
+            else:
+                column.append(int(value))
+        self._keys[row[0]] = self.rows
+        self.rows += 1
+
+    def close(self, header=None):
+        """Write {format, version, count, **header, columns} and return the row count"""
+        # Parents listed after their children
+        for i, field in enumerate(self.fields):
+            if field.kind == 'parent':
+                for row, key in self._forward:
+                    self._columns[i][row] = self._keys.get(key, -1)
+        head = {'format': FORMAT, 'version': VERSION, 'count': self.rows, **(header or {})}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as out:
+            out.write(json.dumps(head, ensure_ascii=False, separators=(',', ':'))[:-1])
+            out.write(',"columns":{')
+            for i, (field, column) in enumerate(zip(self.fields, self._columns)):
+                out.write(('' if i == 0 else ',') + json.dumps(field.name) + ':')
+                self._write_column(out, field, column)
+            out.write('}}\n')
+        os.replace(tmp, self.path)
+        self._spool.cleanup()
+        return self.rows
+
+    def _write_column(self, out, field, column):
+        if field.kind == 'str':
+            column.close()
+            out.write('{"type":"str","values":[')
+            with open(column.name, encoding='utf-8') as f:
+                shutil.copyfileobj(f, out)
+            out.write(']}')
+            return
+        meta = {'type': field.kind}
+        if field.kind == 'category':
+            codes, column = column
+            meta['dict'] = list(codes)
+        elif field.kind in ('int', 'float'):
+            if field.kind == 'float':
+                meta['step'] = field.step
+            offset = min(column) if column else 0
+            if offset:
+                meta['offset'] = offset * field.step if field.step else offset
+                column = array.array('q', (v - offset for v in column))
+        out.write(json.dumps(meta, ensure_ascii=False, separators=(',', ':'))[:-1])
+        if self.binary:
+            typecode, dtype = _dtype(column)
+            out.write(f',"dtype":"{dtype}","values":"')
+            _write_base64(out, array.array(typecode, column))
+            out.write('"}')
+        else:
+            out.write(',"values":[')
+            for start in range(0, len(column), _CHUNK):
+                out.write((',' if start else '') + ','.join(map(str, column[start:start + _CHUNK])))
+            out.write(']}')
+
+
+def _dtype(values):
+    low, high = (min(values), max(values)) if values else (0, 0)
+    for typecode, dtype, lowest, highest in _DTYPES:
+        if lowest <= low and high <= highest:
+            return typecode, dtype
+    raise ValueError(f"Column values {low}..{high} do not fit in 32 bits")
+
+
+def _write_base64(out, values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    data = memoryview(values).cast('B')
+    # A multiple of 3 bytes per chunk keeps the pieces concatenable
+    step = 3 * _CHUNK
+    for start in range(0, len(data), step):
+        out.write(base64.b64encode(data[start:start + step]).decode('ascii'))
+
+
+def write_columns(path, rows, fields, header=None, binary=False):
+    """Stream `rows` (tuples in `fields` order) into a columnar file"""
+    writer = ColumnWriter(path, fields, binary)
+    for row in rows:
+        writer.add(row)
+    return writer.close(header)
+
+
+def write_models(path, models, header=None, binary=False):
+    """AI_MODELS-style 7-tuples (any iterable, e.g. catalog_io.iter_catalog)"""
+    return write_columns(path, models, MODEL_FIELDS, header, binary)
+
+
+def viewer_rows(models):
+    """tree_builder/ai_tree_data.json model dicts as VIEWER_FIELDS rows"""
+    for model in models:
+        parents = model.get('parents') or []
+        yield (model['id'], model['name'], parents[0] if parents else None, model['year'],
+               model['family'], model['importance'], model.get('extinct', False),
+               model.get('breakthrough', False), model.get('description', ''))
+
+
+# --- Precompressed variants --------------------------------------------------
+
+def brotli_available():
+    return _brotli() is not None
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def precompress(path, encodings=('gz', 'br')):
+    """Write path.gz / path.br next to `path` for servers that serve
+    precompressed files (nginx gzip_static/brotli_static, ...). Brotli needs
+    the optional `brotli` package and is skipped without it. Returns the
+    paths written."""
+    written = []
+    for encoding in encodings:
+        target = f'{path}.{encoding}'
+        if encoding == 'gz':
+            with open(path, 'rb') as src, gzip.open(target, 'wb', compresslevel=9) as dst:
+                shutil.copyfileobj(src, dst)
+        elif encoding == 'br':
+            brotli = _brotli()
+            if brotli is None:
+                continue
+            compressor = brotli.Compressor(quality=11)
+            with open(path, 'rb') as src, open(target, 'wb') as dst:
+                for block in iter(lambda: src.read(1 << 20), b''):
+                    dst.write(compressor.process(block))
+                dst.write(compressor.finish())
+        else:
+            raise ValueError(f"Unknown encoding {encoding!r} (use gz, br)")
+        written.append(target)
+    return written
+
+
+# --- Reading -----------------------------------------------------------------
+
+def decode_column(column):
+    """A column object back to a Python list"""
+    values = column['values']
+    if isinstance(values, str):
+        typecode = next(t for t, dtype, _, _ in _DTYPES if dtype == column['dtype'])
+        values = array.array(typecode, base64.b64decode(values))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        values = values.tolist()
+    kind = column['type']
+    if kind == 'category':
+        return [column['dict'][v] for v in values]
+    if kind == 'bool':
+        return [bool(v) for v in values]
+    if kind == 'float':
+        offset, step = column.get('offset', 0), column['step']
+        return [offset + v * step for v in values]
+    if kind == 'int' and column.get('offset'):
+        return [column['offset'] + v for v in values]
+    return list(values)
+
+
+def read_columns(path):
+    """(header, {field: list}) from a columnar file, gzipped or not"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    return decode(data)
+
+
+def decode(data):
+    if data.get('format') != FORMAT:
+        raise ValueError(f"Not a {FORMAT} payload")
+    columns = data.pop('columns')
+    return data, {name: decode_column(column) for name, column in columns.items()}
+
+
+def model_records(columns, family_colors=None):
+    """AI_MODELS-style 7-tuples from decoded MODEL_FIELDS or VIEWER_FIELDS
+    columns; without a color column each model gets its family's color"""
+    names = columns['name']
+    colors = columns.get('color') or [(family_colors or {}).get(f) for f in columns['family']]
+    for name, parent, year, color, importance, family, extinct in zip(
+            names, columns['parent'], columns['year'], colors, columns['importance'],
+            columns['family'], columns['extinct']):
+        yield (name, names[parent] if parent >= 0 else None, year, color, importance,
+               family, extinct)
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Convert a catalog or viewer JSON to columnar JSON")
+    parser.add_argument('input', help="tree_builder/ai_tree_data.json, or any catalog_io catalog")
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--binary', action='store_true',
+                        help="numeric columns as base64 typed arrays")
+    parser.add_argument('--compress', default='', help="precompressed variants, e.g. gz,br")
+    parser.add_argument('--no-descriptions', action='store_true',
+                        help="drop the per-model descriptions of viewer JSON")
+    parser.add_argument('--layouts', action='store_true',
+                        help="add precomputed tree_viewer.html layouts (radial, fountain, "
+                             "vertical, horizontal)")
+    parser.add_argument('--tiles', action='store_true',
+                        help="add spatial tiles of those layouts (implies --layouts), so the "
+                             "viewer only draws what is in view")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    viewer = None
+    if args.input.endswith('.json'):
+        with open(args.input, encoding='utf-8') as f:
+            viewer = json.load(f)
+    if viewer is not None and 'models' in viewer:
+        fields, rows, header = VIEWER_FIELDS, viewer_rows(viewer.pop('models')), viewer
+        columns = {'key': 0, 'parent': 2, 'year': 3}
+        importance = 5
+        if args.no_descriptions:
+            fields, rows = fields[:-1], (row[:-1] for row in rows)
+    else:
+        from catalog_io import iter_catalog
+        fields, rows, header = MODEL_FIELDS, iter_catalog(args.input), {}
+        columns = {'key': 0, 'parent': 1, 'year': 2}
+        importance = 4
+    if args.layouts or args.tiles:
+        # Needs numpy and the whole tree in memory, unlike the rest
+        from viewer_layouts import with_layouts
+        rows, fields, header['layouts'] = with_layouts(rows, fields, **columns)
+    if args.tiles:
+        from spatial_tiles import viewer_tiles
+        header['tiles'] = viewer_tiles(rows, fields, importance=importance, **columns)
+    count = write_columns(args.output, rows, fields, header, args.binary)
+    print(f"✓ Saved: {args.output} ({count:,} models, {os.path.getsize(args.output):,} bytes, "
+          f"{time.time() - start:.1f}s)")
+    encodings = [e.strip() for e in args.compress.split(',') if e.strip()]
+    for path in precompress(args.output, encodings):
+        print(f"✓ Saved: {path} ({os.path.getsize(path):,} bytes)")
+    if 'br' in encodings and not brotli_available():
+        print("⚠ brotli is not installed (pip install brotli); skipped .br")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Subtree-chunked viewer data
+A small root manifest plus content-hashed columnar chunks, one per branch or family, that the viewers fetch on demand
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter, deque
+
+from columnar_json import ColumnWriter, precompress
+
+MANIFEST = 'manifest.json'
+SPLITS = ('branch', 'family')
+DEFAULT_EXPAND = ('Transformers',)
+DEFAULT_MAX_MODELS = 2000
+# Branches listed per file, about: what keeps the manifest's size flat
+MAX_REFS = 64
+
+_CHUNK_FILE = re.compile(r'^chunk-[0-9a-f]{16}\.json(\.gz|\.br)?$')
+
+
+def plan_chunks(index, families, split='branch', expand=DEFAULT_EXPAND,
+                max_models=DEFAULT_MAX_MODELS):
+    """Files as {'members', 'roots', 'nested'} dicts, the manifest first.
+
+    members are node indices in breadth-first order (parents before
+    children), nested the plan positions of the chunks hanging off them.
+    split='branch' keeps the path from the root to the `expand` models in
+    the manifest and makes every other branch off it a chunk (the
+    top-level branches under Transformers by default); split='family'
+    starts a chunk wherever the family changes. Either way no file holds
+    more than `max_models` models or much more than MAX_REFS chunk refs:
+    the deeper part of a bigger subtree moves into chunks of its own, so
+    the manifest stays the same size as the catalog grows.
+    """
+    children, size = index.children, index.subtree_size
+
+    def fill(roots, family=None):
+        members, frontier = [], []
+        queue = deque(roots)
+        while queue:
+            node = queue.popleft()
+            members.append(node)
+            for child in children[node]:
+                if ((family is not None and families[child] != family)
+                        or len(members) + len(queue) >= max_models):
+                    frontier.append(child)
+                else:
+                    queue.append(child)
+        return members, frontier
+
+    def groups(frontier, small):
+        # A chunk per big branch; the small ones share chunks (by family
+        # under split='family'), whose own overflow then nests below them
+        small = max(small, sum(size[node] for node in frontier) // MAX_REFS)
+        packed = {}
+        for node in frontier:
+            if size[node] >= small:
+                yield [node]
+            else:
+                packed.setdefault(families[node] if split == 'family' else None, []).append(node)
+        for nodes in packed.values():
+            for start in range(0, len(nodes), max_models):
+                yield nodes[start:start + max_models]
+
+    if split == 'branch':
+        trunk = set()
+        for name in expand:
+            node = index.index.get(name)
+            while node is not None and node >= 0 and node not in trunk:
+                trunk.add(node)
+                node = index.parent[node]
+        trunk = trunk or set(index.roots)
+        members = [node for node in index.preorder if node in trunk]
+        frontier = [child for node in members for child in children[node] if child not in trunk]
+    elif split == 'family':
+        members, frontier = [], []
+        for root in index.roots:
+            more, edge = fill([root], families[root])
+            members += more
+            frontier += edge
+    else:
+        raise ValueError(f"Unknown split {split!r} (use {', '.join(SPLITS)})")
+
+    plan = [{'members': members, 'roots': [], 'frontier': frontier}]
+    position = 0
+    while position < len(plan):
+        entry = plan[position]
+        entry['nested'] = []
+        # Every branch off the manifest gets its own chunk (leaves aside,
+        # and up to about MAX_REFS of them); further down, branches under a
+        # fiftieth of a file are packed
+        small = 2 if position == 0 else max(2, max_models // 50)
+        for group in groups(entry.pop('frontier'), small):
+            members, frontier = fill(group, families[group[0]] if split == 'family' else None)
+            entry['nested'].append(len(plan))
+            plan.append({'members': members, 'roots': group, 'frontier': frontier})
+        position += 1
+    return plan
+
+
+def write_chunks(directory, rows, fields, header=None, key=0, parent=1, year=2, family=5,
+                 binary=False, compress=(), **options):
+    """Write MANIFEST and its chunks into `directory` and return the manifest path.
+
+    Every file is columnar JSON (see columnar_json) for the rows of one
+    plan_chunks() entry. A chunk's top rows have no parent in the file;
+    its 'attach' header lists their parents' keys in row order. Each file
+    lists the chunks below it as {file, parents, count, family, years}
+    refs (plus the extent of any layout columns, for loading a branch as it
+    scrolls into view). Chunk names are the hash of their content, so they
+    can be cached for good; chunks are written before the files that name
+    them, so a changed chunk renames every file on its way up to the
+    manifest, the only name that stays fixed.
+    """
+    from tree_index import TreeIndex
+
+    rows = list(rows)
+    index = TreeIndex([row[key] for row in rows], [row[parent] for row in rows])
+    if 'expand' in options and 'name' in [field.name for field in fields]:
+        # Viewer JSON is keyed by id; --expand Transformers should still work
+        by_name = {row[[f.name for f in fields].index('name')]: row[key] for row in rows}
+        options['expand'] = [by_name.get(name, name) for name in options['expand']]
+    plan = plan_chunks(index, [row[family] for row in rows], **options)
+    layouts = [i for i, field in enumerate(fields) if field.name in (header or {}).get('layouts', {})]
+
+    os.makedirs(directory, exist_ok=True)
+    written = set()
+    for position in range(len(plan) - 1, -1, -1):
+        entry = plan[position]
+        members = entry['members']
+        refs = [plan[nested]['ref'] for nested in entry['nested']]
+        head = {'attach': [index.names[index.parent[node]] for node in entry['roots']],
+                'chunks': refs}
+        if position == 0:
+            head = {**(header or {}), 'chunks': refs, 'chunkCount': len(plan) - 1,
+                    'totalCount': len(rows)}
+        path = os.path.join(directory, MANIFEST if position == 0 else 'chunk.json.tmp')
+        writer = ColumnWriter(path, fields, binary)
+        for node in members:
+            writer.add(rows[node])
+        writer.close(head)
+        if position == 0:
+            written.add(MANIFEST)
+            continue
+
+        with open(path, 'rb') as f:
+            name = f'chunk-{hashlib.sha256(f.read()).hexdigest()[:16]}.json'
+        os.replace(path, os.path.join(directory, name))
+        written.add(name)
+        years = [rows[node][year] for node in members] + [y for ref in refs for y in ref['years']]
+        entry['ref'] = {
+            'file': name,
+            'parents': list(dict.fromkeys(head['attach'])),
+            'count': sum(index.subtree_size[node] for node in entry['roots']),
+            'family': Counter(rows[node][family] for node in members).most_common(1)[0][0],
+            'years': [min(years), max(years)],
+        }
+        if layouts:
+            entry['ref']['extent'] = {}
+            for i in layouts:
+                name = fields[i].name
+                values = [rows[node][i] for node in members]
+                entry['ref']['extent'][name] = [
+                    round(min(values + [ref['extent'][name][0] for ref in refs]), 6),
+                    round(max(values + [ref['extent'][name][1] for ref in refs]), 6)]
+
+    for name in sorted(written):
+        for path in precompress(os.path.join(directory, name), compress):
+            written.add(os.path.basename(path))
+    # Chunks of earlier runs are named after content that is gone
+    for name in os.listdir(directory):
+        if _CHUNK_FILE.match(name) and name not in written:
+            os.remove(os.path.join(directory, name))
+    return os.path.join(directory, MANIFEST)
+
+
+def write_model_chunks(directory, models, header=None, binary=False, compress=(), **options):
+    """AI_MODELS-style 7-tuples"""
+    from columnar_json import MODEL_FIELDS
+    return write_chunks(directory, models, MODEL_FIELDS, header, binary=binary,
+                        compress=compress, **options)
+
+
+def read_chunks(path):
+    """(header, {field: list}) for a manifest and all of its chunks, as one
+    table with parent indices resolved across files"""
+    from columnar_json import read_columns
+
+    header, columns = read_columns(path)
+    directory = os.path.dirname(path)
+    keys = columns.get('id') or columns['name']
+    lookup = {key: i for i, key in enumerate(keys)}
+    pending = deque(header['chunks'])
+    while pending:
+        head, chunk = read_columns(os.path.join(directory, pending.popleft()['file']))
+        offset = len(keys)
+        attach = iter(head['attach'])
+        for name, values in chunk.items():
+            if name == 'parent':
+                values = [lookup[next(attach)] if p < 0 else p + offset for p in values]
+            columns[name].extend(values)
+        lookup.update((key, i) for i, key in enumerate(keys[offset:], offset))
+        pending += head['chunks']
+    return header, columns
+
+
+def main(argv=None):
+    import argparse
+    import json
+    import time
+
+    from columnar_json import MODEL_FIELDS, VIEWER_FIELDS, brotli_available, viewer_rows
+
+    parser = argparse.ArgumentParser(description="Split a catalog or viewer JSON into a manifest "
+                                                 "and content-hashed subtree chunks")
+    parser.add_argument('input', help="tree_builder/ai_tree_data.json, or any catalog_io catalog")
+    parser.add_argument('-o', '--output-dir', required=True)
+    parser.add_argument('--split', choices=SPLITS, default='branch',
+                        help="a chunk per branch off the path to --expand (default), "
+                             "or wherever the family changes")
+    parser.add_argument('--expand', nargs='+', default=list(DEFAULT_EXPAND), metavar='NAME',
+                        help="models whose branches are chunked (default: Transformers)")
+    parser.add_argument('--max-models', type=int, default=DEFAULT_MAX_MODELS,
+                        help=f"per file (default: {DEFAULT_MAX_MODELS})")
+    parser.add_argument('--binary', action='store_true')
+    parser.add_argument('--compress', default='', help="precompressed variants, e.g. gz,br")
+    parser.add_argument('--layouts', action='store_true',
+                        help="add precomputed tree_viewer.html layouts")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    viewer = None
+    if args.input.endswith('.json'):
+        with open(args.input, encoding='utf-8') as f:
+            viewer = json.load(f)
+    if viewer is not None and 'models' in viewer:
+        fields, rows, header = VIEWER_FIELDS, viewer_rows(viewer.pop('models')), viewer
+        columns = {'key': 0, 'parent': 2, 'year': 3, 'family': 4}
+    else:
+        from catalog_io import iter_catalog
+        fields, rows, header = MODEL_FIELDS, iter_catalog(args.input), {}
+        columns = {'key': 0, 'parent': 1, 'year': 2, 'family': 5}
+    if args.layouts:
+        from viewer_layouts import with_layouts
+        rows, fields, header['layouts'] = with_layouts(
+            rows, fields, **{k: v for k, v in columns.items() if k != 'family'})
+    encodings = [e.strip() for e in args.compress.split(',') if e.strip()]
+    path = write_chunks(args.output_dir, rows, fields, header, binary=args.binary,
+                        compress=encodings, split=args.split, expand=args.expand,
+                        max_models=args.max_models, **columns)
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    print(f"✓ Saved: {path} ({manifest['count']:,} of {manifest['totalCount']:,} models, "
+          f"{os.path.getsize(path):,} bytes) + {manifest['chunkCount']:,} chunks "
+          f"({time.time() - start:.1f}s)")
+    if 'br' in encodings and not brotli_available():
+        print("⚠ brotli is not installed (pip install brotli); skipped .br")
+
+
+if __name__ == '__main__':
+    main()
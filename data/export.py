@@ -0,0 +1,166 @@
+"""
+Single-pass multi-format export for the matplotlib renderers
+Tight bounding box computed once, every format written concurrently
+"""
+
+import os
+
+# Figure being exported; forked workers inherit it instead of unpickling it
+_FIGURE = None
+
+# Keys written only when asked for by name: a deep-zoom pyramid renders the
+# print resolution over again
+OPT_IN_FORMATS = {'tiles'}
+
+
+def requested_formats(default=None):
+    """Format keys to write, from AI_TREE_FORMATS (e.g. "png,svg"); None means all"""
+    value = os.environ.get('AI_TREE_FORMATS')
+    if not value:
+        return default
+    return {f.strip().lower() for f in value.split(',') if f.strip()}
+
+
+def default_jobs():
+    """Worker processes a pool starts by default: AI_TREE_JOBS (build.py
+    shares the CPUs out among the approaches it runs at once), else one per
+    CPU"""
+    value = os.environ.get('AI_TREE_JOBS')
+    return max(1, int(value)) if value else os.cpu_count() or 1
+
+
+def selected_targets(targets, formats=None):
+    """[(key, path, options)] of the {key: (path, options)} `targets` to
+    write: those in `formats`, else in AI_TREE_FORMATS, else all but the
+    OPT_IN_FORMATS"""
+    if formats is None:
+        formats = requested_formats()
+    if formats is None:
+        return [(key, path, options) for key, (path, options) in targets.items()
+                if key not in OPT_IN_FORMATS]
+    return [(key, path, options) for key, (path, options) in targets.items() if key in formats]
+
+
+def tile_check_setting():
+    """AI_TREE_CHECK_TILES ("dpi" or "dpi:tolerance") as (dpi, tolerance
+    levels), or None when unset"""
+    value = os.environ.get('AI_TREE_CHECK_TILES')
+    if not value:
+        return None
+    dpi, _, tolerance = value.partition(':')
+    return float(dpi), int(tolerance or 0)
+
+
+def tight_bbox(fig, pad_inches=None):
+    """The box bbox_inches='tight' would produce, from one layout-only draw"""
+    import matplotlib as mpl
+
+    if pad_inches is None:
+        pad_inches = mpl.rcParams['savefig.pad_inches']
+    fig.draw_without_rendering()
+    return fig.get_tightbbox(fig.canvas.get_renderer()).padded(pad_inches)
+
+
+def _save(path, kwargs, in_worker=False):
+    tile_rows = kwargs.pop('tile_rows', None)
+    pyramid = kwargs.pop('tile_pyramid', None)
+    if pyramid:
+        # Deep-zoom tiles for the kiosk viewer; `path` is a directory. In an
+        # export worker the strips are drawn in-process: a pool per worker
+        # would start up to cpu_count**2 processes
+        from tile_pyramid import save_figure_pyramid
+        save_figure_pyramid(_FIGURE, path, fmt=pyramid, jobs=1 if in_worker else None, **kwargs)
+    elif tile_rows:
+        # Print-size rasters are streamed tile by tile (see tiled_render)
+        from tiled_render import check_tiled_png, save_tiled_png
+        check = tile_check_setting()
+        if check:
+            # Regression check: two tile heights against an untiled savefig,
+            # at a dpi the untiled image fits in memory at
+            check_tiled_png(_FIGURE, **dict(kwargs, dpi=check[0], tolerance=check[1]))
+        save_tiled_png(_FIGURE, path, tile_rows=tile_rows, **kwargs)
+    elif path.endswith('.svg'):
+        _save_svg(path, kwargs)
+    else:
+        _FIGURE.savefig(path, **kwargs)
+    return path
+
+
+def _save_svg(path, kwargs):
+    import matplotlib as mpl
+    from svg_compact import compact_svg_file, svg_options, write_svgz
+
+    precision, svgz = svg_options()
+    if precision is None:
+        _FIGURE.savefig(path, **kwargs)
+    else:
+        # Compact mode: real <text> instead of embedded glyph outlines,
+        # then rounded geometry and shared style classes
+        with mpl.rc_context({'svg.fonttype': 'none'}):
+            _FIGURE.savefig(path, **kwargs)
+        compact_svg_file(path, precision)
+    if svgz:
+        write_svgz(path)
+
+
+def fork_context():
+    """multiprocessing fork context, or None where fork is unavailable"""
+    import multiprocessing
+
+    # Only fork shares the finished figure (or parsed SVG) for free; spawn
+    # would re-run the renderer script in every worker
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def export_figure(fig, targets, formats=None, jobs=None, pad_inches=None, **savefig_kwargs):
+    """Write `fig` to several files, yielding (key, path) as each one is done.
+
+    targets         {key: (path, extra savefig kwargs)}, e.g.
+                    {'png': ('out.png', {'dpi': 300}), 'svg': ('out.svg', {})};
+                    a 'tile_rows' entry renders that PNG in memory-bounded tiles,
+                    'tile_pyramid': 'png' or 'webp' writes a deep-zoom tile
+                    directory (with index.html viewer) instead of one file
+    formats         keys to write (default: AI_TREE_FORMATS, else all but
+                    the OPT_IN_FORMATS)
+    jobs            worker processes (default: default_jobs(), capped at
+                    the number of files); 1 writes everything in-process
+    savefig_kwargs  shared savefig options such as facecolor
+
+    The tight bounding box is computed once and passed to every savefig,
+    so each file costs a single draw with its own backend.
+    """
+    global _FIGURE
+    import instrument
+
+    selected = selected_targets(targets, formats)
+    if not selected:
+        return
+
+    bbox = tight_bbox(fig, pad_inches)
+    jobs = min(jobs or default_jobs(), len(selected))
+    context = fork_context() if jobs > 1 else None
+
+    _FIGURE = fig
+    try:
+        if context is None:
+            for key, path, extra in selected:
+                kwargs = dict(savefig_kwargs, bbox_inches=bbox, **extra)
+                instrument.timed_result(f'save {key}', instrument.timed_call(_save, path, kwargs))
+                yield key, path
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+            # Each save is timed where it runs; with AI_TREE_PROFILE set the
+            # parent records it as a 'save <key>' stage
+            futures = {pool.submit(instrument.timed_call, _save, path,
+                                   dict(savefig_kwargs, bbox_inches=bbox, **extra), True): key
+                       for key, path, extra in selected}
+            for future in as_completed(futures):
+                key = futures[future]
+                yield key, instrument.timed_result(f'save {key}', future.result())
+    finally:
+        _FIGURE = None
@@ -0,0 +1,237 @@
+"""
+Per-stage instrumentation for the renderers
+Wall/CPU time, tracemalloc peak and artist counts per named stage, off unless AI_TREE_PROFILE is set
+"""
+
+import atexit
+import os
+import sys
+import time
+
+_OFF = ('', '0', 'false', 'no', 'off')
+
+
+class Profiler:
+    """Records consecutive named stages of one run.
+
+    stage(name) closes the running stage and opens the next one, so a flat
+    script only needs one call where each step starts. Stages measured
+    elsewhere (e.g. in export worker processes) are added with record().
+
+    path        report file; None prints the summary only
+    fmt         'json' (stage list) or 'chrome' (chrome://tracing / Perfetto)
+    memory      trace allocations with tracemalloc (slows Python code down)
+    cprofile    stage names to run under cProfile; each writes a .prof file
+    """
+
+    def __init__(self, path=None, fmt='json', memory=True, cprofile=()):
+        self.path = path
+        self.fmt = fmt
+        self.memory = memory
+        self.cprofile = set(cprofile)
+        self.origin = time.time()
+        self.records = []
+        self._current = None
+        self._figure = None
+        self._count = None
+        self._finished = False
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        atexit.register(self.finish)
+
+    def _artists(self):
+        """Artists in the figure, not counting axis ticks (they come and go
+        with autoscaling, which would make the deltas meaningless)"""
+        if self._figure is None:
+            return None
+        from matplotlib.axis import Axis
+
+        count, stack = 0, [self._figure]
+        while stack:
+            artist = stack.pop()
+            count += 1
+            stack.extend(child for child in artist.get_children() if not isinstance(child, Axis))
+        return count
+
+    def stage(self, name, fig=None):
+        self._close()
+        if fig is not None:
+            self._figure = fig
+        profile = None
+        if name in self.cprofile:
+            import cProfile
+            profile = cProfile.Profile()
+        if self.memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        self._current = (name, time.time(), time.process_time(), self._artists(), profile)
+        if profile is not None:
+            profile.enable()
+
+    def count(self, n):
+        """Items the current stage produced, where there are no artists to count"""
+        self._count = n
+
+    def _close(self):
+        if self._current is None:
+            return
+        name, start, cpu, artists, profile = self._current
+        if profile is not None:
+            profile.disable()
+        end, cpu_end = time.time(), time.process_time()
+        self._current = None
+
+        entry = {'name': name, 'start_s': round(start - self.origin, 6),
+                 'wall_s': round(end - start, 6), 'cpu_s': round(cpu_end - cpu, 6),
+                 'pid': os.getpid()}
+        if self.memory:
+            import tracemalloc
+            entry['mem_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        after = self._artists()
+        if artists is not None and after is not None:
+            entry['artists'] = after - artists
+        if self._count is not None:
+            entry['items'], self._count = self._count, None
+        if profile is not None:
+            entry['cprofile'] = self._dump_profile(profile, name)
+        self.records.append(entry)
+
+    def record(self, name, start, wall_s, cpu_s, pid, mem_peak_kb=None):
+        """Add a stage measured somewhere else (start is a time.time() value)"""
+        entry = {'name': name, 'start_s': round(start - self.origin, 6),
+                 'wall_s': round(wall_s, 6), 'cpu_s': round(cpu_s, 6), 'pid': pid}
+        if mem_peak_kb is not None:
+            entry['mem_peak_kb'] = mem_peak_kb
+        self.records.append(entry)
+
+    def _dump_profile(self, profile, name):
+        import pstats
+
+        base = os.path.splitext(self.path)[0] if self.path else 'profile'
+        prof_path = f"{base}.{''.join(c if c.isalnum() else '_' for c in name)}.prof"
+        profile.dump_stats(prof_path)
+        print(f"\n⏱️  cProfile of stage {name!r} -> {prof_path}", file=sys.stderr)
+        pstats.Stats(profile, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+        return prof_path
+
+    def stages(self):
+        return sorted(self.records, key=lambda entry: entry['start_s'])
+
+    def report(self):
+        return {'script': os.path.basename(sys.argv[0]) if sys.argv else None,
+                'total_s': round(time.time() - self.origin, 6),
+                'stages': self.stages()}
+
+    def chrome_trace(self):
+        """Trace Event Format: one complete ('X') event per stage, one lane per process"""
+        events = []
+        for entry in self.stages():
+            args = {k: v for k, v in entry.items()
+                    if k not in ('name', 'start_s', 'wall_s', 'pid')}
+            events.append({'name': entry['name'], 'ph': 'X', 'pid': entry['pid'], 'tid': 0,
+                           'ts': round(entry['start_s'] * 1e6), 'dur': round(entry['wall_s'] * 1e6),
+                           'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def summary(self):
+        lines = [f"{'stage':<28}{'wall s':>9}{'cpu s':>9}{'peak MB':>9}{'count':>9}"]
+        for entry in self.stages():
+            peak = entry.get('mem_peak_kb')
+            count = entry.get('artists', entry.get('items'))
+            lines.append(f"{entry['name'][:27]:<28}{entry['wall_s']:>9.3f}{entry['cpu_s']:>9.3f}"
+                         f"{'' if peak is None else f'{peak / 1024:.1f}':>9}"
+                         f"{'' if count is None else count:>9}")
+        return '\n'.join(lines)
+
+    def finish(self):
+        """Close the last stage and write the report (also runs at exit)"""
+        if self._finished:
+            return
+        self._close()
+        self._finished = True
+        if self.path:
+            import json
+            data = self.chrome_trace() if self.fmt == 'chrome' else self.report()
+            with open(self.path, 'w') as f:
+                json.dump(data, f, indent=1)
+        print('\n' + self.summary(), file=sys.stderr)
+        if self.path:
+            print(f"⏱️  Profile saved: {self.path}", file=sys.stderr)
+
+
+def _from_env():
+    """AI_TREE_PROFILE=1 (summary on stderr), =report.json, =run.trace.json or
+    =directory/; a --profile argument works like AI_TREE_PROFILE=1"""
+    value = os.environ.get('AI_TREE_PROFILE', '')
+    if value.lower() in _OFF and '--profile' in sys.argv[1:]:
+        value = '1'
+    if value.lower() in _OFF:
+        return None
+    path = None if value.lower() in ('1', 'true', 'yes', 'on') else value
+    fmt = os.environ.get('AI_TREE_PROFILE_FORMAT') or (
+        'chrome' if path and path.endswith('.trace.json') else 'json')
+    if path and (path.endswith(os.sep) or os.path.isdir(path)):
+        # A directory collects one report per script (used by build.py --profile)
+        os.makedirs(path, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ''))[0] or 'profile'
+        path = os.path.join(path, stem + ('.trace.json' if fmt == 'chrome' else '.json'))
+    memory = os.environ.get('AI_TREE_PROFILE_MEMORY', '1').lower() not in _OFF
+    cprofile = [s.strip() for s in os.environ.get('AI_TREE_CPROFILE', '').split(',') if s.strip()]
+    return Profiler(path, fmt, memory, cprofile)
+
+
+PROFILER = _from_env()
+
+
+def enabled():
+    return PROFILER is not None
+
+
+def stage(name, fig=None):
+    """Start stage `name` (ending the previous one); pass the figure once to
+    get per-stage artist counts. No-op unless profiling is on."""
+    if PROFILER is not None:
+        PROFILER.stage(name, fig)
+
+
+def count(n):
+    if PROFILER is not None:
+        PROFILER.count(n)
+
+
+def record(name, start, wall_s, cpu_s, pid, mem_peak_kb=None):
+    if PROFILER is not None:
+        PROFILER.record(name, start, wall_s, cpu_s, pid, mem_peak_kb)
+
+
+def finish():
+    if PROFILER is not None:
+        PROFILER.finish()
+
+
+def timed_call(func, *args):
+    """(func(*args), stage timing or None); runs in export worker processes,
+    which inherit the profiler when forked"""
+    if PROFILER is None:
+        return func(*args), None
+    import tracemalloc
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    start, cpu = time.time(), time.process_time()
+    result = func(*args)
+    timing = {'start': start, 'wall_s': time.time() - start,
+              'cpu_s': time.process_time() - cpu, 'pid': os.getpid(),
+              'mem_peak_kb': tracemalloc.get_traced_memory()[1] // 1024 if tracing else None}
+    return result, timing
+
+
+def timed_result(name, outcome):
+    """Result of a timed_call, recording its timing as stage `name`"""
+    result, timing = outcome
+    if timing is not None:
+        record(name, **timing)
+    return result
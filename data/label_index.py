@@ -0,0 +1,162 @@
+"""
+Label collision index for the renderers
+Uniform grid hash over placed labels, so each overlap check only looks at nearby labels
+"""
+
+import math
+from collections import defaultdict
+
+
+class PointLabelIndex:
+    """Placed label anchors, bucketed in a uniform grid.
+
+    Cartesian mode answers "is any placed label closer than min_distance
+    to (x, y)?". Polar mode takes (angle, radius) pairs and uses the
+    distance the polar renderers always used,
+        sqrt((r - r')**2 + (r * angle_diff)**2)
+    with angle_diff wrapped around 2*pi. Results are the same as scanning
+    the full list of placed labels; only the candidates differ.
+    """
+
+    def __init__(self, min_distance=0.08, polar=False):
+        if min_distance <= 0:
+            raise ValueError("min_distance must be positive")
+        self.min_distance = min_distance
+        self.polar = polar
+        self.cell = min_distance
+        self._cells = defaultdict(list)
+        self._count = 0
+        if polar:
+            # Angle cells tile the full circle evenly so wraparound is a modulo
+            self._n_angle = max(1, int(2 * math.pi // min_distance))
+            self._angle_cell = 2 * math.pi / self._n_angle
+
+    def __len__(self):
+        return self._count
+
+    def _key(self, a, b):
+        if self.polar:
+            return (int((a % (2 * math.pi)) // self._angle_cell) % self._n_angle,
+                    int(b // self.cell))
+        return (int(a // self.cell), int(b // self.cell))
+
+    def _candidates(self, a, b, min_distance):
+        reach = math.ceil(min_distance / self.cell)
+        if self.polar:
+            ka, kr = self._key(a, b)
+            # An arc of min_distance at radius b spans min_distance / b radians
+            if b > 0:
+                span = math.ceil(min_distance / b / self._angle_cell)
+            else:
+                span = self._n_angle
+            if 2 * span + 1 >= self._n_angle:
+                angle_keys = range(self._n_angle)
+            else:
+                angle_keys = [(ka + d) % self._n_angle for d in range(-span, span + 1)]
+            for i in angle_keys:
+                for j in range(kr - reach, kr + reach + 1):
+                    yield from self._cells.get((i, j), ())
+        else:
+            kx, ky = self._key(a, b)
+            for i in range(kx - reach, kx + reach + 1):
+                for j in range(ky - reach, ky + reach + 1):
+                    yield from self._cells.get((i, j), ())
+
+    def is_clear(self, a, b, min_distance=None):
+        """True if no placed label is within min_distance of (a, b)"""
+        if min_distance is None:
+            min_distance = self.min_distance
+        for pa, pb in self._candidates(a, b, min_distance):
+            if self.polar:
+                angle_diff = abs(a - pa)
+                if angle_diff > math.pi:
+                    angle_diff = 2 * math.pi - angle_diff
+                dist = math.sqrt((b - pb)**2 + (b * angle_diff)**2)
+            else:
+                dist = math.sqrt((a - pa)**2 + (b - pb)**2)
+            if dist < min_distance:
+                return False
+        return True
+
+    def add(self, a, b):
+        """Record a placed label at (x, y), or (angle, radius) in polar mode"""
+        self._cells[self._key(a, b)].append((a, b))
+        self._count += 1
+
+
+def _box_corners(x, y, width, height, angle):
+    c, s = math.cos(angle), math.sin(angle)
+    hw, hh = width / 2, height / 2
+    return [(x + dx * c - dy * s, y + dx * s + dy * c)
+            for dx, dy in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+
+
+def _boxes_overlap(a, b, padding):
+    """Separating-axis test for two (x, y, w, h, angle) boxes grown by `padding`"""
+    ax, ay, aw, ah, aa = a
+    bx, by, bw, bh, ba = b
+    if aa == 0 and ba == 0:
+        return (abs(ax - bx) < (aw + bw)/2 + padding and
+                abs(ay - by) < (ah + bh)/2 + padding)
+
+    corners_a = _box_corners(ax, ay, aw + 2 * padding, ah + 2 * padding, aa)
+    corners_b = _box_corners(bx, by, bw, bh, ba)
+    for angle in (aa, aa + math.pi / 2, ba, ba + math.pi / 2):
+        nx, ny = math.cos(angle), math.sin(angle)
+        proj_a = [px * nx + py * ny for px, py in corners_a]
+        proj_b = [px * nx + py * ny for px, py in corners_b]
+        if max(proj_a) <= min(proj_b) or max(proj_b) <= min(proj_a):
+            return False
+    return True
+
+
+class BoxLabelIndex:
+    """Placed label boxes (center, size, optional rotation), bucketed in a grid.
+
+    Boxes are registered in every cell their axis-aligned bounds touch.
+    Unrotated boxes use the same overlap rule as the SVG renderer's old
+    check_label_space; rotated ones fall back to a separating-axis test.
+    """
+
+    def __init__(self, cell_size=50.0):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell = cell_size
+        self._cells = defaultdict(list)
+        self._boxes = []
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def _cell_range(self, x, y, width, height, angle, pad):
+        width, height = width + 2 * pad, height + 2 * pad
+        if angle:
+            c, s = abs(math.cos(angle)), abs(math.sin(angle))
+            width, height = width * c + height * s, width * s + height * c
+        half_w, half_h = width / 2, height / 2
+        return (int((x - half_w) // self.cell), int((x + half_w) // self.cell),
+                int((y - half_h) // self.cell), int((y + half_h) // self.cell))
+
+    def is_clear(self, x, y, width, height, padding=0, angle=0):
+        """True if the box (grown by `padding`) overlaps no placed box"""
+        box = (x, y, width, height, angle)
+        x0, x1, y0, y1 = self._cell_range(x, y, width, height, angle, padding)
+        seen = set()
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                for k in self._cells.get((i, j), ()):
+                    if k in seen:
+                        continue
+                    seen.add(k)
+                    if _boxes_overlap(box, self._boxes[k], padding):
+                        return False
+        return True
+
+    def add(self, x, y, width, height, angle=0):
+        """Record a placed label box centered at (x, y)"""
+        k = len(self._boxes)
+        self._boxes.append((x, y, width, height, angle))
+        x0, x1, y0, y1 = self._cell_range(x, y, width, height, angle, 0)
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                self._cells[(i, j)].append(k)
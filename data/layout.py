@@ -0,0 +1,189 @@
+"""
+Vectorized radial layout engine
+Angular spans and radii for the whole tree from NumPy array operations
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+RadialLayout = namedtuple('RadialLayout', ['radius', 'angle', 'span_start', 'span'])
+RadialLayout.__doc__ = """Per-node layout arrays, indexed like the TreeIndex/dataset.
+
+radius      distance from the center (year-based)
+angle       node angle in radians
+span_start  first angle of the wedge allocated to the node's subtree
+span        angular width of that wedge
+"""
+
+
+def year_radius(years, min_year=1958, max_year=2026, exponent=1.0, scale=1.0):
+    """Map years to radii: ((year - min) / (max - min)) ** exponent * scale"""
+    t = (np.asarray(years, dtype=np.float64) - min_year) / (max_year - min_year)
+    if exponent != 1.0:
+        t = np.power(t, exponent)
+    return t * scale
+
+
+def _levels(depth):
+    """Node indices grouped by depth (dataset order inside each level)"""
+    order = np.argsort(depth, kind='stable')
+    bounds = np.searchsorted(depth[order], np.arange(depth.max() + 2))
+    return [order[bounds[d]:bounds[d + 1]] for d in range(len(bounds) - 1)]
+
+
+def _sibling_fractions(parent, w):
+    """Each node's share of its parent's span and the share of the siblings before it.
+
+    Roots are treated as children of one virtual super-root so forests split
+    the full angle range the same way siblings do.
+    """
+    n = len(parent)
+    group = np.where(parent < 0, n, parent)
+
+    totals = np.bincount(group, weights=w, minlength=n + 1)
+    # Siblings keep dataset order, which is the order the recursive
+    # layouts always iterated `children` in
+    order = np.lexsort((np.arange(n), group))
+    running = np.cumsum(w[order]) - w[order]
+    group_sorted = group[order]
+    first = np.searchsorted(group_sorted, group_sorted)
+    before = np.empty(n)
+    before[order] = running - running[first]
+
+    denom = totals[group]
+    denom[denom == 0] = 1.0
+    return before / denom, w / denom
+
+
+def radial_layout(index, years, angle_start, angle_end, weight='leaves',
+                  placement='center', min_year=1958, max_year=2026,
+                  exponent=1.0, scale=1.0):
+    """Lay out the whole tree in one go.
+
+    index       TreeIndex for the dataset
+    years       per-node years (list or array, dataset order)
+    weight      'leaves' (leaf-weighted spans), 'descendants' (subtree-size
+                weighted, the old count_descendants) or a per-node array
+    placement   'center'   - node at the middle of its wedge
+                'centroid' - leaves at the middle, parents at the mean of
+                             their children's angles
+    exponent    radius power scaling, e.g. 0.85 for np.power(t, 0.85)
+    scale       radius multiplier (e.g. a pixel radius)
+
+    Returns a RadialLayout of float64 arrays. Leaf weighting is a closed
+    form over the preorder; other weights and centroid placement take one
+    array pass per tree level, so there is no Python recursion at all.
+    """
+    parent = np.asarray(index.parent, dtype=np.int64)
+    n = len(parent)
+    total = angle_end - angle_start
+    radius = year_radius(years, min_year, max_year, exponent, scale)
+    if n == 0:
+        empty = np.empty(0)
+        return RadialLayout(empty, empty, empty, empty)
+
+    depth = None
+    if isinstance(weight, str) and weight == 'leaves':
+        # span(v) = total * leaves(v) / leaves(all), and a subtree starts
+        # after every leaf that precedes it in preorder
+        leaf_count = np.asarray(index.leaf_count, dtype=np.float64)
+        preorder = np.asarray(index.preorder, dtype=np.int64)
+        is_leaf = np.asarray(index.subtree_size) == 1
+        leaves_before = np.empty(n)
+        leaves_before[preorder] = np.cumsum(is_leaf[preorder]) - is_leaf[preorder]
+        all_leaves = is_leaf.sum()
+        span = total * leaf_count / all_leaves
+        start = angle_start + total * leaves_before / all_leaves
+    else:
+        if isinstance(weight, str):
+            if weight != 'descendants':
+                raise ValueError(f"Unknown weight mode: {weight!r}")
+            w = np.asarray(index.subtree_size, dtype=np.float64)
+        else:
+            w = np.asarray(weight, dtype=np.float64)
+        before, share = _sibling_fractions(parent, w)
+
+        depth = np.asarray(index.depth, dtype=np.int64)
+        start = np.empty(n)
+        span = np.empty(n)
+        levels = _levels(depth)
+        roots = levels[0]
+        span[roots] = total * share[roots]
+        start[roots] = angle_start + total * before[roots]
+        for level in levels[1:]:
+            p = parent[level]
+            start[level] = start[p] + span[p] * before[level]
+            span[level] = span[p] * share[level]
+
+    angle = start + span / 2
+    if placement == 'centroid':
+        if depth is None:
+            depth = np.asarray(index.depth, dtype=np.int64)
+        _centroid(parent, depth, angle)
+    elif placement != 'center':
+        raise ValueError(f"Unknown placement mode: {placement!r}")
+
+    return RadialLayout(radius, angle, start, span)
+
+
+def _centroid(parent, depth, position):
+    """Move every parent (in place) to the mean position of its children"""
+    n_children = np.bincount(parent[parent >= 0], minlength=len(parent))
+    acc = np.zeros(len(parent))
+    # Deepest level first so every child position is final before its
+    # parent averages it
+    for level in reversed(_levels(depth)[1:]):
+        p = parent[level]
+        np.add.at(acc, p, position[level])
+        done = np.unique(p)
+        position[done] = acc[done] / n_children[done]
+
+
+def linear_layout(index, start=-0.5, width=1.0, weight='leaves', extent=None):
+    """Cross-axis positions for the tree_viewer.html-style linear layouts.
+
+    The root gets [start, start + width]. A node's children split a
+    range that begins where the node's own range begins and is `extent`
+    wide (per-node array; default: the node's own width) by `weight`
+    ('leaves', 'descendants' or a per-node array, as in radial_layout).
+    Leaves sit in the middle of their range, parents at the mean of their
+    children: the viewer's fountain layout is extent = width-at-year, its
+    vertical and horizontal layouts weight = 1 per node.
+    """
+    parent = np.asarray(index.parent, dtype=np.int64)
+    n = len(parent)
+    if n == 0:
+        return np.empty(0)
+    if isinstance(weight, str):
+        if weight not in ('leaves', 'descendants'):
+            raise ValueError(f"Unknown weight mode: {weight!r}")
+        w = np.asarray(index.leaf_count if weight == 'leaves' else index.subtree_size,
+                       dtype=np.float64)
+    else:
+        w = np.asarray(weight, dtype=np.float64)
+    before, share = _sibling_fractions(parent, w)
+
+    depth = np.asarray(index.depth, dtype=np.int64)
+    lo = np.empty(n)
+    size = np.empty(n)
+    levels = _levels(depth)
+    lo[levels[0]] = start
+    size[levels[0]] = width
+    for level in levels[1:]:
+        p = parent[level]
+        room = size[p] if extent is None else extent[p]
+        lo[level] = lo[p] + room * before[level]
+        size[level] = room * share[level]
+
+    position = lo + size / 2
+    _centroid(parent, depth, position)
+    return position
+
+
+def polar_to_xy(layout, center=(0.0, 0.0), flip_y=False):
+    """Cartesian coordinates for a RadialLayout (flip_y for SVG-style axes)"""
+    x = center[0] + layout.radius * np.cos(layout.angle)
+    dy = layout.radius * np.sin(layout.angle)
+    y = center[1] - dy if flip_y else center[1] + dy
+    return x, y
@@ -0,0 +1,123 @@
+"""
+On-disk layout cache
+Computed layouts saved as .npy arrays keyed by dataset hash + layout parameters, memory-mapped on load
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+_LAYOUT_SOURCE = os.path.join(DATA_DIR, 'layout.py')
+
+
+def cache_dir():
+    """<AI_TREE_CACHE_DIR or .build_cache>/layouts"""
+    root = os.environ.get('AI_TREE_CACHE_DIR') or os.path.join(os.path.dirname(DATA_DIR),
+                                                               '.build_cache')
+    return os.path.join(root, 'layouts')
+
+
+def enabled():
+    """AI_TREE_LAYOUT_CACHE=0 turns the cache off"""
+    return os.environ.get('AI_TREE_LAYOUT_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def dataset_hash(parent, years):
+    """Hash of everything a layout reads from the dataset: tree shape and years"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(parent, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(years, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _code_digest(code, digest):
+    """Bytecode and constants of a function, nested functions included (their
+    reprs carry memory addresses, so they are hashed recursively instead)"""
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _code_digest(const, digest)
+        else:
+            digest.update(repr(const).encode())
+    digest.update(repr(code.co_names).encode())
+
+
+def _param(value):
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return 'sha256:' + hashlib.sha256(np.asarray(value, dtype=np.float64).tobytes()).hexdigest()
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    return value
+
+
+def layout_key(kind, data_hash, params, compute=None, source=None):
+    """Cache key for one layout: what it is, the dataset it was computed from,
+    its parameters and the code that computes it (a function and/or a file,
+    or several files)"""
+    digest = hashlib.sha256()
+    digest.update(kind.encode())
+    digest.update(data_hash.encode())
+    digest.update(json.dumps({k: _param(v) for k, v in params.items()}, sort_keys=True).encode())
+    if compute is not None:
+        _code_digest(compute.__code__, digest)
+    for path in [source] if isinstance(source, str) else source or ():
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cached_array(key, compute):
+    """float64 array for `key`: memory-mapped from disk when cached, else
+    compute() (anything np.asarray accepts) is saved and returned.
+
+    Cached arrays are read-only views of the file; copy before modifying.
+    """
+    if not enabled():
+        return np.asarray(compute(), dtype=np.float64)
+
+    path = os.path.join(cache_dir(), key[:2], key + '.npy')
+    try:
+        return np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+
+    array = np.ascontiguousarray(compute(), dtype=np.float64)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique temp name so concurrent builds never read a half-written file
+    tmp = f'{path}.{os.getpid()}.tmp.npy'
+    np.save(tmp, array)
+    os.replace(tmp, path)
+    return array
+
+
+def tree_hash(parent):
+    """Hash of the tree shape alone; angles depend on nothing else"""
+    return hashlib.sha256(np.ascontiguousarray(parent, dtype=np.int64).tobytes()).hexdigest()
+
+
+def cached_radial_layout(index, years, angle_start, angle_end, min_year=1958, max_year=2026,
+                         exponent=1.0, scale=1.0, **params):
+    """layout.radial_layout, cached: same arguments, same RadialLayout result
+    (with read-only memory-mapped arrays when it comes from disk).
+
+    Only the angles are cached, keyed by the tree shape: radii are a closed
+    form over the years, so edits that keep the shape (years, colors,
+    importance, ...) never recompute the angular layout.
+    """
+    from layout import RadialLayout, radial_layout, year_radius
+
+    params.update(angle_start=angle_start, angle_end=angle_end)
+    key = layout_key('radial_angles', tree_hash(index.parent), params, source=_LAYOUT_SOURCE)
+
+    def compute():
+        kwargs = dict(params)
+        layout = radial_layout(index, years, kwargs.pop('angle_start'), kwargs.pop('angle_end'),
+                               **kwargs)
+        return np.stack([layout.angle, layout.span_start, layout.span])
+
+    angle, span_start, span = cached_array(key, compute)
+    return RadialLayout(year_radius(years, min_year, max_year, exponent, scale), angle,
+                        span_start, span)
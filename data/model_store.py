@@ -0,0 +1,192 @@
+"""
+Columnar model store for the AI evolution dataset
+Struct-of-arrays view of AI_MODELS for vectorized layout and styling
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+
+def _code_dtype(n_categories):
+    """Smallest unsigned dtype that can hold `n_categories` codes"""
+    if n_categories <= 1 << 8:
+        return np.uint8
+    if n_categories <= 1 << 16:
+        return np.uint16
+    return np.uint32
+
+
+def pack_rgba(hex_color, alpha=255):
+    """'#RRGGBB' (or '#RRGGBBAA') -> 0xRRGGBBAA"""
+    h = hex_color.lstrip('#')
+    if len(h) == 6:
+        h += f"{alpha:02x}"
+    if len(h) != 8:
+        raise ValueError(f"Unsupported color: {hex_color!r}")
+    return int(h, 16)
+
+
+def unpack_rgba(packed):
+    """Packed uint32 colors -> (..., 4) float RGBA in [0, 1] for matplotlib"""
+    packed = np.asarray(packed, dtype=np.uint32)
+    shifts = np.array([24, 16, 8, 0], dtype=np.uint32)
+    return ((packed[..., None] >> shifts) & 0xFF).astype(np.float64) / 255.0
+
+
+class ModelStore:
+    """Struct-of-arrays storage for the model catalog.
+
+    Columns (one entry per model, in dataset order):
+        parent        int32, index of the parent model, -1 for roots
+        year          int16
+        importance    uint8
+        branch_code   categorical code into `branch_types`
+        color_code    categorical code into `color_table` (packed RGBA uint32)
+        extinct       bool
+
+    Names stay a plain list with an O(1) name -> index dict. `records`
+    is a read-only view that yields the original 7-tuples, so code written
+    against AI_MODELS keeps working on a store.
+    """
+
+    def __init__(self, names, parent, year, importance, branch_code, branch_types,
+                 color_code, color_table, extinct, dangling_parents=None, color_labels=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Model names must be unique")
+
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.year = np.asarray(year, dtype=np.int16)
+        self.importance = np.asarray(importance, dtype=np.uint8)
+        self.branch_types = list(branch_types)
+        self.branch_code = np.asarray(branch_code, dtype=_code_dtype(len(self.branch_types)))
+        self.color_table = np.asarray(color_table, dtype=np.uint32)
+        self.color_code = np.asarray(color_code, dtype=_code_dtype(len(self.color_table)))
+        # Original color strings, so '#rrggbb' spellings survive the round trip
+        self.color_labels = list(color_labels) if color_labels is not None else [
+            f"#{int(c) >> 8:06X}" for c in self.color_table]
+        self.extinct = np.asarray(extinct, dtype=bool)
+
+        # Parent names that did not resolve to a model; kept only so the
+        # tuple view round-trips exactly
+        self.dangling_parents = dict(dangling_parents or {})
+
+        n = len(self.names)
+        for column in ('parent', 'year', 'importance', 'branch_code', 'color_code', 'extinct'):
+            if len(getattr(self, column)) != n:
+                raise ValueError(f"Column {column!r} has the wrong length")
+
+    @classmethod
+    def from_records(cls, models):
+        """Build a store from (name, parent, year, color, importance, branch_type, extinct) tuples"""
+        names = [m[0] for m in models]
+        index = {}
+        for i, name in enumerate(names):
+            if name in index:
+                raise ValueError(f"Duplicate model name: {name!r}")
+            index[name] = i
+
+        n = len(names)
+        parent = np.full(n, -1, dtype=np.int32)
+        year = np.empty(n, dtype=np.int16)
+        importance = np.empty(n, dtype=np.uint8)
+        extinct = np.empty(n, dtype=bool)
+        branch_ids, branch_codes = {}, []
+        color_ids, color_codes = {}, []
+        dangling = {}
+
+        for i, (name, parent_name, yr, color, imp, branch_type, is_extinct) in enumerate(models):
+            if parent_name:
+                p = index.get(parent_name, -1)
+                parent[i] = p
+                if p < 0:
+                    dangling[i] = parent_name
+            if not (-32768 <= yr <= 32767):
+                raise ValueError(f"Year out of range for {name!r}: {yr}")
+            if not (0 <= imp <= 255):
+                raise ValueError(f"Importance out of range for {name!r}: {imp}")
+            year[i] = yr
+            importance[i] = imp
+            extinct[i] = bool(is_extinct)
+            branch_codes.append(branch_ids.setdefault(branch_type, len(branch_ids)))
+            color_codes.append(color_ids.setdefault(color, len(color_ids)))
+
+        return cls(
+            names, parent, year, importance,
+            branch_codes, list(branch_ids),
+            color_codes, [pack_rgba(c) for c in color_ids],
+            extinct, dangling, list(color_ids)
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, name):
+        """Index of the model called `name` (KeyError if unknown)"""
+        return self.index[name]
+
+    @property
+    def records(self):
+        """Backward-compatible AI_MODELS view (sequence of 7-tuples)"""
+        return ModelRecords(self)
+
+    @property
+    def branch_type(self):
+        """Branch type string per model (materialized list)"""
+        types = self.branch_types
+        return [types[c] for c in self.branch_code]
+
+    @property
+    def color(self):
+        """Color string per model (materialized list)"""
+        labels = self.color_labels
+        return [labels[c] for c in self.color_code]
+
+    def rgba(self, alpha=None):
+        """(n, 4) float RGBA per model; `alpha` may be a scalar or per-model array"""
+        colors = unpack_rgba(self.color_table)[self.color_code]
+        if alpha is not None:
+            colors[:, 3] = alpha
+        return colors
+
+    def row(self, i):
+        """The model at index `i` as an AI_MODELS-style tuple"""
+        p = int(self.parent[i])
+        if p >= 0:
+            parent_name = self.names[p]
+        else:
+            parent_name = self.dangling_parents.get(i)
+        return (
+            self.names[i], parent_name, int(self.year[i]),
+            self.color_labels[self.color_code[i]],
+            int(self.importance[i]), self.branch_types[self.branch_code[i]],
+            bool(self.extinct[i])
+        )
+
+    @property
+    def nbytes(self):
+        """Bytes held by the numeric columns (names excluded)"""
+        return sum(a.nbytes for a in (self.parent, self.year, self.importance,
+                                       self.branch_code, self.color_code,
+                                       self.color_table, self.extinct))
+
+
+class ModelRecords(Sequence):
+    """Read-only tuple view over a ModelStore, usable wherever AI_MODELS is"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._store.row(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("model index out of range")
+        return self._store.row(i)
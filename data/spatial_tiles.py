@@ -0,0 +1,114 @@
+"""
+Spatial tiles for tree_viewer.html
+A quadtree over each precomputed layout: nodes and edges bucketed per tile and zoom level, with importance-ranked labels per tile
+"""
+
+import math
+
+import numpy as np
+
+# Labels kept per tile and level; the viewer shows the tiles of one level
+LABELS_PER_TILE = 8
+# Nodes per deepest tile, about, when picking the number of levels
+NODES_PER_TILE = 64
+MAX_LEVELS = 8
+
+
+def default_levels(n):
+    return max(1, min(MAX_LEVELS, math.ceil(math.log(max(n, 1) / NODES_PER_TILE, 4))))
+
+
+def quadtree_tiles(u, t, parent, importance, levels=None, labels_per_tile=LABELS_PER_TILE):
+    """Row lists per 'z/x/y' tile of the unit square, for points (u, t).
+
+    nodes   every row, in its tile at the deepest level
+    edges   the row of each edge's child, in the tiles of the deepest
+            level where the box between its two ends spans at most 2 x 2
+            tiles (long edges sit near the root, so a viewer walking down
+            the quadtree meets them all; an edge can be in up to 4 tiles)
+    labels  per level, the `labels_per_tile` most important rows of each
+            tile (ties: earlier rows first)
+    """
+    u = np.clip(np.asarray(u, dtype=np.float64), 0, 1)
+    t = np.clip(np.asarray(t, dtype=np.float64), 0, 1)
+    parent = np.asarray(parent, dtype=np.int64)
+    importance = np.asarray(importance, dtype=np.int64)
+    levels = default_levels(len(u)) if levels is None else levels
+    side = 1 << levels
+    x = np.minimum((u * side).astype(np.int64), side - 1)
+    y = np.minimum((t * side).astype(np.int64), side - 1)
+    rows = np.arange(len(u))
+
+    nodes = _buckets(np.full(len(u), levels), x, y, rows)
+
+    child = rows[parent >= 0]
+    x0, x1 = np.minimum(x[child], x[parent[child]]), np.maximum(x[child], x[parent[child]])
+    y0, y1 = np.minimum(y[child], y[parent[child]]), np.maximum(y[child], y[parent[child]])
+    # The deepest level where the box spans at most 2 x 2 tiles
+    shift = np.zeros(len(child), dtype=np.int64)
+    for s in range(levels, -1, -1):
+        fits = ((x1 >> s) - (x0 >> s) <= 1) & ((y1 >> s) - (y0 >> s) <= 1)
+        shift[fits] = s
+    z = levels - shift
+    parts = [(x0 >> shift, y0 >> shift), (x1 >> shift, y0 >> shift),
+             (x0 >> shift, y1 >> shift), (x1 >> shift, y1 >> shift)]
+    # Each tile once per edge: skip corners that repeat an earlier one
+    edges = _buckets(z, *parts[0], child)
+    for i, (px, py) in enumerate(parts[1:], 1):
+        fresh = np.ones(len(child), dtype=bool)
+        for qx, qy in parts[:i]:
+            fresh &= (px != qx) | (py != qy)
+        for key, bucket in _buckets(z[fresh], px[fresh], py[fresh], child[fresh]).items():
+            edges.setdefault(key, []).extend(bucket)
+    for bucket in edges.values():
+        bucket.sort()
+
+    labels = {}
+    for z in range(levels + 1):
+        shift = levels - z
+        tile = ((x >> shift) << z) | (y >> shift)
+        order = np.lexsort((rows, -importance, tile))
+        tile = tile[order]
+        first = np.r_[0, np.flatnonzero(np.diff(tile)) + 1]
+        rank = np.arange(len(tile)) - np.repeat(first, np.diff(np.r_[first, len(tile)]))
+        keep = order[rank < labels_per_tile]
+        labels.update(_buckets(np.full(len(keep), z), x[keep] >> shift, y[keep] >> shift, keep,
+                               sort=False))
+    return {'levels': levels, 'nodes': nodes, 'edges': edges, 'labels': labels}
+
+
+def _buckets(z, x, y, rows, sort=True):
+    # {'z/x/y': [rows]}, rows in ascending order unless sort=False keeps theirs
+    buckets = {}
+    for zi, xi, yi, row in zip(z.tolist(), x.tolist(), y.tolist(), rows.tolist()):
+        buckets.setdefault(f'{zi}/{xi}/{yi}', []).append(row)
+    if sort:
+        for bucket in buckets.values():
+            bucket.sort()
+    return buckets
+
+
+def viewer_tiles(rows, fields, key=0, parent=2, year=3, importance=5, levels=None,
+                 labels_per_tile=LABELS_PER_TILE):
+    """header['tiles'] for rows that carry viewer_layouts.LAYOUT_FIELDS:
+    per layout, its quadtree over (layout coordinate, year), both scaled to
+    the unit square by the 'extent' and 'years' kept alongside"""
+    from tree_index import TreeIndex
+    from viewer_layouts import LAYOUT_FIELDS
+
+    names = [field.name for field in fields]
+    index = TreeIndex([row[key] for row in rows], [row[parent] for row in rows])
+    years = np.array([row[year] for row in rows], dtype=np.float64)
+    year_min, year_max = int(years.min()), int(years.max())
+    t = (years - year_min) / ((year_max - year_min) or 1)
+    ranks = [row[importance] for row in rows]
+
+    tiles = {}
+    for field in LAYOUT_FIELDS:
+        column = names.index(field.name)
+        coord = np.array([row[column] for row in rows], dtype=np.float64)
+        low, high = float(coord.min()), float(coord.max())
+        u = (coord - low) / ((high - low) or 1)
+        tiles[field.name] = {'extent': [low, high], 'years': [year_min, year_max],
+                             **quadtree_tiles(u, t, index.parent, ranks, levels, labels_per_tile)}
+    return tiles
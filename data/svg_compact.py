@@ -0,0 +1,116 @@
+"""
+Compact SVG output
+Coordinate quantization, shared CSS classes and optional .svgz for the SVG exports
+"""
+
+import gzip
+import os
+import re
+import shutil
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+# Geometry attributes whose numbers are safe to round; transforms are left
+# alone except for translate(), since glyph scale() factors are tiny
+_GEOMETRY_ATTRS = re.compile(r'(\s(?:d|x|y|x1|y1|x2|y2|cx|cy|r|rx|ry|width|height|points)=")([^"]*)(")')
+_TRANSLATE = re.compile(r'translate\(([^)]*)\)')
+_STYLE_ATTR = re.compile(r'<(\w+)([^<>]*?)\sstyle="([^"]*)"')
+_METADATA = re.compile(r'\s*<metadata>.*?</metadata>', re.S)
+
+
+def svg_options():
+    """(precision, svgz) from AI_TREE_SVG_PRECISION / AI_TREE_SVGZ.
+
+    precision None means the default full-precision output; any integer
+    turns on compact mode with that many decimals.
+    """
+    value = os.environ.get('AI_TREE_SVG_PRECISION', '').strip()
+    precision = int(value) if value else None
+    svgz = os.environ.get('AI_TREE_SVGZ', '').strip().lower() in ('1', 'true', 'yes')
+    return precision, svgz
+
+
+def format_number(value, precision):
+    """Shortest fixed-point spelling of `value` rounded to `precision` decimals"""
+    text = f'{float(value):.{precision}f}'
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return '0' if text in ('-0', '') else text
+
+
+def quantize(text, precision):
+    """Round every number inside an attribute string (path data, point lists)"""
+    return _NUMBER.sub(lambda m: format_number(m.group(), precision), text)
+
+
+def compact_path_data(d, precision):
+    """Round path data and drop the whitespace around command letters"""
+    d = ' '.join(quantize(d, precision).split())
+    d = re.sub(r'\s*([A-Za-z])\s*', r'\1', d)
+    # Every number is fixed-point now, so a leading '-' separates values too
+    return d.replace(' -', '-')
+
+
+def _compact_geometry(match, precision):
+    head, value, tail = match.groups()
+    if head.strip() == 'd="':
+        value = compact_path_data(value, precision)
+    else:
+        value = quantize(value, precision)
+    return head + value + tail
+
+
+def compact_svg(svg_text, precision=2):
+    """Shrink a matplotlib (or any flat) SVG document.
+
+    Drops the <metadata> block and pretty-printing whitespace, rounds
+    geometry to `precision` decimals and moves every inline style="..."
+    used more than once into a shared CSS class.
+    """
+    svg_text = _METADATA.sub('', svg_text)
+    svg_text = re.sub(r'>\n\s*<', '><', svg_text)
+    svg_text = _GEOMETRY_ATTRS.sub(lambda m: _compact_geometry(m, precision), svg_text)
+    svg_text = _TRANSLATE.sub(lambda m: f'translate({quantize(m.group(1), precision)})', svg_text)
+
+    counts = {}
+    for match in _STYLE_ATTR.finditer(svg_text):
+        if ' class="' not in match.group(2):
+            style = match.group(3)
+            counts[style] = counts.get(style, 0) + 1
+    shared = {style: f's{i}' for i, style in
+              enumerate(s for s, n in counts.items() if n > 1)}
+    if not shared:
+        return svg_text
+
+    def to_class(match):
+        tag, attrs, style = match.groups()
+        if style not in shared or ' class="' in attrs:
+            return match.group()
+        return f'<{tag}{attrs} class="{shared[style]}"'
+
+    svg_text = _STYLE_ATTR.sub(to_class, svg_text)
+    rules = ''.join('.%s{%s}' % (name, re.sub(r'\s*([:;])\s*', r'\1', style))
+                    for style, name in shared.items())
+    if '</style>' in svg_text:
+        return svg_text.replace('</style>', rules + '</style>', 1)
+    # No stylesheet yet: open one right after the root element
+    root_end = svg_text.index('>', svg_text.index('<svg')) + 1
+    return (svg_text[:root_end] + f'<defs><style type="text/css">{rules}</style></defs>'
+            + svg_text[root_end:])
+
+
+def compact_svg_file(path, precision=2):
+    """Rewrite the SVG at `path` in compact form; returns (old, new) sizes"""
+    with open(path, encoding='utf-8') as f:
+        original = f.read()
+    compacted = compact_svg(original, precision)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(compacted)
+    return len(original.encode('utf-8')), len(compacted.encode('utf-8'))
+
+
+def write_svgz(path):
+    """Gzip `path` (an .svg) to a sibling .svgz and return its path"""
+    target = os.path.splitext(path)[0] + '.svgz'
+    with open(path, 'rb') as src, gzip.open(target, 'wb', compresslevel=9) as dst:
+        shutil.copyfileobj(src, dst)
+    return target
@@ -0,0 +1,123 @@
+"""
+Parse-once SVG rasterization
+One cairosvg parse, any number of PNG sizes (print, screen, thumbnails) rendered in parallel
+"""
+
+import os
+import re
+
+# Parsed SVG being rasterized; forked workers inherit it instead of re-parsing
+_TREE = None
+
+_LENGTH = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+))\s*([a-z%]*)\s*$')
+_INCHES_PER_UNIT = {'mm': 1 / 25.4, 'cm': 1 / 2.54, 'in': 1.0, 'pt': 1 / 72, 'pc': 1 / 6,
+                    'px': 1 / 96, '': 1 / 96}
+
+
+def svg_size_inches(tree):
+    """Document (width, height) in inches from the root width/height
+    attributes, falling back to the viewBox in CSS pixels"""
+    sizes = []
+    for attribute, box_index in (('width', 2), ('height', 3)):
+        match = _LENGTH.match(tree.get(attribute) or '')
+        if match and match.group(2) in _INCHES_PER_UNIT:
+            sizes.append(float(match.group(1)) * _INCHES_PER_UNIT[match.group(2)])
+        else:
+            view_box = (tree.get('viewBox') or '').replace(',', ' ').split()
+            if len(view_box) != 4:
+                raise ValueError(f"SVG has no usable {attribute}")
+            sizes.append(float(view_box[box_index]) / 96)
+    return tuple(sizes)
+
+
+def raster_size(size_inches, options):
+    """Pixel size for one target: {'dpi': 300}, {'width': 400} (thumbnail,
+    height keeps the aspect ratio), {'height': ...} or both"""
+    width_in, height_in = size_inches
+    if 'dpi' in options:
+        # Same truncation the renderers always used: int(mm * dpi / 25.4)
+        return int(width_in * options['dpi']), int(height_in * options['dpi'])
+    width, height = options.get('width'), options.get('height')
+    if width and not height:
+        height = round(width * height_in / width_in)
+    elif height and not width:
+        width = round(height * width_in / height_in)
+    if not (width and height):
+        raise ValueError(f"Raster target needs 'dpi', 'width' or 'height': {options}")
+    return int(width), int(height)
+
+
+def _render(path, width, height, background_color, tile_rows, pyramid, in_worker=False):
+    if pyramid:
+        # No pool of its own inside a rasterize_svg worker (see export._save)
+        from tile_pyramid import save_svg_pyramid
+        save_svg_pyramid(_TREE, path, width, height, background_color, fmt=pyramid,
+                         jobs=1 if in_worker else None)
+    elif tile_rows:
+        from tiled_render import tree_to_tiled_png
+        tree_to_tiled_png(_TREE, path, width, height, background_color, tile_rows=tile_rows)
+    else:
+        from cairosvg.surface import PNGSurface
+        surface = PNGSurface(_TREE, path, 96, output_width=width, output_height=height,
+                             background_color=background_color)
+        surface.finish()
+    return path, (width, height)
+
+
+def rasterize_svg(url, targets, formats=None, background_color=None, jobs=None):
+    """Render one SVG to several PNGs, yielding (key, path, (width, height))
+    as each one is done.
+
+    targets   {key: (path, options)}, options as in raster_size plus an
+              optional 'tile_rows' to stream a huge PNG in strips, or
+              'tile_pyramid': 'png'/'webp' for a deep-zoom tile directory, e.g.
+              {'print': ('print.png', {'dpi': 600, 'tile_rows': 1024}),
+               'thumb': ('thumb.png', {'width': 400})}
+    formats   keys to write (default: AI_TREE_FORMATS, else all but
+              export.OPT_IN_FORMATS)
+    jobs      worker processes (default: export.default_jobs(), capped at
+              the number of files); 1 renders everything in-process
+
+    The file is parsed once; workers are forked with the parsed tree.
+    """
+    global _TREE
+    from cairosvg.parser import Tree
+    import instrument
+    from export import default_jobs, fork_context, selected_targets, tile_check_setting
+
+    selected = selected_targets(targets, formats)
+    if not selected:
+        return
+
+    tree = Tree(url=url)
+    size_inches = svg_size_inches(tree)
+    check = tile_check_setting()
+    if check and any(options.get('tile_rows') for _, _, options in selected):
+        # Regression check of the strip renderer, at a size svg2png can hold
+        from tiled_render import check_tiled_svg
+        check_tiled_svg(url, *raster_size(size_inches, {'dpi': check[0]}), background_color,
+                        tolerance=check[1])
+    work = [(key, (path, *raster_size(size_inches, options), background_color,
+                   options.get('tile_rows'), options.get('tile_pyramid')))
+            for key, path, options in selected]
+    jobs = min(jobs or default_jobs(), len(work))
+    context = fork_context() if jobs > 1 else None
+
+    _TREE = tree
+    try:
+        if context is None:
+            for key, args in work:
+                yield (key, *instrument.timed_result(f'rasterize {key}',
+                                                     instrument.timed_call(_render, *args)))
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+            futures = {pool.submit(instrument.timed_call, _render, *args, True): key
+                       for key, args in work}
+            for future in as_completed(futures):
+                key = futures[future]
+                yield (key, *instrument.timed_result(f'rasterize {key}', future.result()))
+    finally:
+        _TREE = None
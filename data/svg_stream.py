@@ -0,0 +1,150 @@
+"""
+Streaming SVG writer for the pure-SVG renderer
+Elements are written to the file as they are generated instead of kept in a DOM
+"""
+
+from contextlib import contextmanager
+
+from svg_compact import compact_path_data, format_number, quantize
+
+SVG_NAMESPACES = {
+    'xmlns': 'http://www.w3.org/2000/svg',
+    'xmlns:ev': 'http://www.w3.org/2001/xml-events',
+    'xmlns:xlink': 'http://www.w3.org/1999/xlink',
+}
+
+
+def _escape_text(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _escape_attrib(value):
+    return (_escape_text(value).replace('"', '&quot;').replace('\r', '&#13;')
+            .replace('\n', '&#10;').replace('\t', '&#09;'))
+
+
+def _attribs(attribs):
+    """svgwrite keyword rules: 'stroke_width' -> 'stroke-width', 'in_' -> 'in'"""
+    return {key.rstrip('_').replace('_', '-'): value for key, value in attribs.items()}
+
+
+def element(tag, text=None, **attribs):
+    """One leaf element as a (tag, attribs, text) tuple"""
+    return tag, _attribs(attribs), text
+
+
+def path(d, **attribs):
+    return element('path', d=d, **attribs)
+
+
+def circle(center, r, **attribs):
+    return element('circle', cx=center[0], cy=center[1], r=r, **attribs)
+
+
+def rect(insert, size, **attribs):
+    return element('rect', x=insert[0], y=insert[1], width=size[0], height=size[1], **attribs)
+
+
+def text(content, insert, **attribs):
+    return element('text', content, x=insert[0], y=insert[1], **attribs)
+
+
+def use(href, insert, **attribs):
+    """Reference to a <symbol> (or any element with an id) placed at `insert`"""
+    return element('use', x=insert[0], y=insert[1], **{'xlink:href': href}, **attribs)
+
+
+class SVGStreamWriter:
+    """Writes an SVG document incrementally.
+
+    Leaf elements are serialized as soon as they are written and only the
+    stack of open groups is kept, so memory does not grow with the number
+    of elements. Markup matches what svgwrite's Drawing.save() produces
+    for the same elements: sorted attributes, str() values, empty
+    attributes dropped and childless elements self-closed.
+
+    With `precision` set, float attributes and path data are rounded to
+    that many decimals (see svg_compact).
+    """
+
+    def __init__(self, filename, size, viewBox=None, profile='full', precision=None):
+        self._file = open(filename, 'w', encoding='utf-8')
+        self._stack = []
+        self.precision = precision
+        self._file.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+        root = dict(SVG_NAMESPACES, width=size[0], height=size[1], version='1.1',
+                    baseProfile=profile, viewBox=viewBox)
+        self._open('svg', root)
+
+    def _tag(self, tag, attribs):
+        parts = [tag]
+        for key, value in sorted(attribs.items()):
+            if value is None:
+                continue
+            if self.precision is not None:
+                if isinstance(value, float):
+                    value = format_number(value, self.precision)
+                elif key == 'd':
+                    value = compact_path_data(value, self.precision)
+                elif key == 'points':
+                    value = quantize(value, self.precision)
+            value = str(value)
+            if value:
+                parts.append(f'{key}="{_escape_attrib(value)}"')
+        return '<' + ' '.join(parts)
+
+    def _flush_open(self):
+        # A group's start tag is held back until its first child arrives,
+        # so empty groups can still be self-closed
+        if self._stack and not self._stack[-1][2]:
+            tag, start, _ = self._stack[-1]
+            self._file.write(start + '>')
+            self._stack[-1] = (tag, start, True)
+
+    def _open(self, tag, attribs):
+        self._flush_open()
+        self._stack.append((tag, self._tag(tag, attribs), False))
+
+    def _close(self):
+        tag, start, started = self._stack.pop()
+        self._file.write(f'</{tag}>' if started else start + ' />')
+
+    def write(self, item):
+        """Write one (tag, attribs, text) element"""
+        tag, attribs, content = item
+        self._flush_open()
+        start = self._tag(tag, attribs)
+        if content is None or content == '':
+            self._file.write(start + ' />')
+        else:
+            self._file.write(f'{start}>{_escape_text(str(content))}</{tag}>')
+
+    def write_all(self, items):
+        """Write every element from an iterable (typically a generator); returns the count"""
+        count = 0
+        for item in items:
+            self.write(item)
+            count += 1
+        return count
+
+    @contextmanager
+    def group(self, tag='g', **attribs):
+        """Open a container element (g, defs, filter, ...) for the with-block"""
+        self._open(tag, _attribs(attribs))
+        try:
+            yield self
+        finally:
+            self._close()
+
+    def close(self):
+        if self._file.closed:
+            return
+        while self._stack:
+            self._close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
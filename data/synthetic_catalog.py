@@ -0,0 +1,188 @@
+"""
+Synthetic AI model catalogs for scale testing
+Seeded, vectorized generator of AI_MODELS-shaped catalogs from 1k to 10M models
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+BRANCHING = ('uniform', 'preferential', 'lineage')
+GROWTH = ('explosion', 'exponential', 'linear')
+
+Catalog = namedtuple('Catalog', ['parent', 'year', 'depth', 'family', 'importance',
+                                 'extinct', 'families', 'colors'])
+Catalog.__doc__ = """Generated catalog as columns, in dataset order (parents first).
+
+parent      int32, -1 for the root
+year        int16, non-decreasing, never before the parent's year
+depth       int32 edges from the root
+family      int16 index into `families` (the branch_type)
+importance  uint8, 1-5
+extinct     bool
+families    branch_type names; families[0] is 'root'
+colors      hex color per family
+"""
+
+
+def _reference():
+    """Family colors, extinction rates and importance mix of the curated dataset"""
+    from ai_models import AI_MODELS, COLOR_SCHEME
+
+    families = ['root'] + [f for f in COLOR_SCHEME if f != 'root']
+    extinct = {f: [] for f in families}
+    for _, _, _, _, _, branch_type, is_extinct in AI_MODELS:
+        extinct.setdefault(branch_type, []).append(is_extinct)
+    extinct_rate = np.array([np.mean(extinct[f]) if extinct[f] else 0.0 for f in families])
+    importance = np.bincount([m[4] for m in AI_MODELS], minlength=6)[1:].astype(np.float64)
+    return families, [COLOR_SCHEME[f] for f in families], extinct_rate, importance / importance.sum()
+
+
+def year_weights(years, growth='explosion'):
+    """Relative number of new models per year.
+
+    'explosion'    flat until the mid-2010s, then a logistic jump of ~40x
+                   centred on 2017 (the transformer era)
+    'exponential'  steady growth, doubling about every 7 years
+    'linear'       the same number every year
+    """
+    years = np.asarray(years, dtype=np.float64)
+    if growth == 'explosion':
+        return 1 + 40 / (1 + np.exp(-(years - 2017.5) * 1.2))
+    if growth == 'exponential':
+        return np.exp((years - years[0]) * np.log(2) / 7)
+    if growth == 'linear':
+        return np.ones_like(years)
+    raise ValueError(f"Unknown growth curve: {growth!r} (use {', '.join(GROWTH)})")
+
+
+def generate(n, seed=0, branching='preferential', max_depth=None, growth='explosion',
+             start_year=1958, end_year=2025, family_switch=0.02, lineage_window=64):
+    """Generate an n-model catalog; the same arguments always give the same catalog.
+
+    branching       how a new model picks its parent among the older ones:
+                    'uniform'       any older model (shallow, ~log n depth)
+                    'preferential'  proportional to children + 1, so a few
+                                    hubs get many descendants (like Transformers)
+                    'lineage'       one of the last `lineage_window` models,
+                                    giving long version chains (GPT-1 -> 2 -> 3)
+    max_depth       cap on edges from the root; deeper picks climb to the
+                    ancestor at the cap
+    growth          year distribution, see year_weights
+    family_switch   chance a model founds a different family than its parent
+
+    Models are added in year order, in vectorized chunks that attach to
+    the models before the chunk, so 10M models take seconds.
+    """
+    if n < 1:
+        raise ValueError("A catalog needs at least one model")
+    if branching not in BRANCHING:
+        raise ValueError(f"Unknown branching: {branching!r} (use {', '.join(BRANCHING)})")
+    rng = np.random.default_rng(seed)
+    families, colors, extinct_rate, importance_mix = _reference()
+
+    span = np.arange(start_year, end_year + 1)
+    weights = year_weights(span, growth)
+    year = np.sort(rng.choice(span, size=n, p=weights / weights.sum())).astype(np.int16)
+    year[0] = start_year
+
+    parent = np.full(n, -1, dtype=np.int32)
+    depth = np.zeros(n, dtype=np.int32)
+    family = np.zeros(n, dtype=np.int16)
+    max_chunk = lineage_window if branching == 'lineage' else 1 << 16
+
+    i = 1
+    while i < n:
+        size = min(n - i, max(1, min(i // 4, max_chunk)))
+        if branching == 'uniform' or i == 1:
+            p = rng.integers(0, i, size)
+        elif branching == 'preferential':
+            # The parent of a random non-root model is picked proportionally to
+            # its child count; mixing in a uniform pick adds the +1
+            edge_parent = parent[rng.integers(1, i, size)]
+            p = np.where(rng.random(size) < 0.5, edge_parent, rng.integers(0, i, size))
+        else:
+            p = np.maximum(0, i - rng.geometric(1 / lineage_window, size))
+        if max_depth is not None:
+            over = depth[p] >= max_depth
+            while over.any():
+                p[over] = parent[p[over]]
+                over = depth[p] >= max_depth
+
+        chunk = slice(i, i + size)
+        parent[chunk] = p
+        depth[chunk] = depth[p] + 1
+        inherited = family[p]
+        switch = (p == 0) | (rng.random(size) < family_switch)
+        family[chunk] = np.where(switch, rng.integers(1, len(families), size), inherited)
+        i += size
+
+    importance = rng.choice(np.arange(1, 6), size=n, p=importance_mix).astype(np.uint8)
+    importance[0] = 5
+    extinct = rng.random(n) < extinct_rate[family]
+    return Catalog(parent, year, depth, family, importance, extinct, families, colors)
+
+
+def model_names(catalog):
+    """Unique names: 'Perceptron' for the root (the renderers expect it),
+    '<Family>-<index>' for everything else"""
+    families = [f.title() for f in catalog.families]
+    yield 'Perceptron'
+    for i in range(1, len(catalog.parent)):
+        yield f'{families[catalog.family[i]]}-{i}'
+
+
+def iter_records(catalog):
+    """Stream the catalog as AI_MODELS 7-tuples, without materializing the list"""
+    names = []
+    parent = catalog.parent.tolist()
+    for i, name, year, family, importance, extinct in zip(
+            range(len(parent)), model_names(catalog), catalog.year.tolist(),
+            catalog.family.tolist(), catalog.importance.tolist(), catalog.extinct.tolist()):
+        names.append(name)
+        yield (name, names[parent[i]] if parent[i] >= 0 else None, year,
+               catalog.colors[family], importance, catalog.families[family], extinct)
+
+
+def to_store(catalog):
+    """ModelStore straight from the columns (no tuples, no name lookups)"""
+    from model_store import ModelStore, pack_rgba
+
+    return ModelStore(list(model_names(catalog)), catalog.parent, catalog.year,
+                      catalog.importance, catalog.family, catalog.families,
+                      catalog.family, [pack_rgba(c) for c in catalog.colors],
+                      catalog.extinct, color_labels=catalog.colors)
+
+
+def main(argv=None):
+    import argparse
+    import time
+    from catalog_io import WRITERS, write_catalog
+
+    parser = argparse.ArgumentParser(description="Write a synthetic AI model catalog")
+    parser.add_argument('size', type=lambda s: int(float(s)), help="number of models, e.g. 1e6")
+    parser.add_argument('-o', '--output', required=True,
+                        help=f"catalog file ({', '.join(WRITERS)}); use with AI_TREE_CATALOG")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--branching', choices=BRANCHING, default='preferential')
+    parser.add_argument('--growth', choices=GROWTH, default='explosion')
+    parser.add_argument('--max-depth', type=int)
+    parser.add_argument('--family-switch', type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    catalog = generate(args.size, args.seed, args.branching, args.max_depth, args.growth,
+                       family_switch=args.family_switch)
+    children = np.bincount(catalog.parent[1:], minlength=args.size)
+    print(f"🌳 Generated {args.size:,} models in {time.time() - start:.1f}s "
+          f"(max depth {catalog.depth.max()}, widest node {children.max():,} children, "
+          f"{catalog.extinct.mean():.0%} extinct)")
+
+    start = time.time()
+    count = write_catalog(args.output, iter_records(catalog), dict(zip(catalog.families,
+                                                                      catalog.colors)))
+    print(f"✓ Saved: {args.output} ({count:,} models, {time.time() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
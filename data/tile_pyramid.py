@@ -0,0 +1,244 @@
+"""
+Deep-zoom tile pyramids for poster-size renders
+XYZ tiles ({z}/{x}/{y}.png) per zoom level, rendered in parallel strips, with a small local viewer
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+TILE_SIZE = 256
+# Coarsest dpi a matplotlib level is drawn at; smaller levels are downsampled
+MIN_RENDER_DPI = 36
+
+# Strip renderer for the pyramid being built, (z, top, rows) -> RGBA rows;
+# forked workers inherit it instead of re-rendering the figure
+_RENDER_ROWS = None
+
+_VIEWER_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tile_viewer.html')
+
+
+def zoom_levels(width, height, tile_size=TILE_SIZE):
+    """Number of levels so that level 0 fits in one tile and the last is full size"""
+    return max(0, math.ceil(math.log2(max(width, height) / tile_size))) + 1
+
+
+def _background_rgba(color):
+    from matplotlib.colors import to_rgba
+
+    if color is None:
+        return np.zeros(4, dtype=np.int16)
+    return np.round(np.array(to_rgba(color)) * 255).astype(np.int16)
+
+
+def _is_empty(tile, background):
+    # One LSB of slack for the renderers' float -> 8-bit rounding
+    return np.abs(tile.astype(np.int16) - background).max() <= 1
+
+
+def _write_tile(tile, path, fmt):
+    from PIL import Image
+
+    image = Image.fromarray(np.ascontiguousarray(tile), 'RGBA')
+    if (tile[..., 3] == 255).all():
+        image = image.convert('RGB')
+    if fmt == 'webp':
+        image.save(path, 'WEBP', quality=90, method=4)
+    else:
+        image.save(path, 'PNG')
+
+
+def _write_tiles(out_dir, z, first_row, pixels, tile_size, fmt, background):
+    """Cut full-width rows of level z into tiles and write the non-empty ones;
+    returns first_row and a '0'/'1' mask per tile row"""
+    columns = math.ceil(pixels.shape[1] / tile_size)
+    masks = []
+    for r in range(math.ceil(len(pixels) / tile_size)):
+        band = pixels[r * tile_size:(r + 1) * tile_size]
+        mask = []
+        for x in range(columns):
+            tile = band[:, x * tile_size:(x + 1) * tile_size]
+            if _is_empty(tile, background):
+                mask.append('0')
+                continue
+            column_dir = os.path.join(out_dir, str(z), str(x))
+            os.makedirs(column_dir, exist_ok=True)
+            _write_tile(tile, os.path.join(column_dir, f'{first_row + r}.{fmt}'), fmt)
+            mask.append('1')
+        masks.append(''.join(mask))
+    return first_row, masks
+
+
+def _render_strip(out_dir, z, first_row, n_rows, level_width, level_height,
+                  tile_size, fmt, background):
+    """Render tile rows [first_row, first_row + n_rows) of level z and write their tiles"""
+    top = first_row * tile_size
+    rows = min(n_rows * tile_size, level_height - top)
+    return _write_tiles(out_dir, z, first_row, _RENDER_ROWS(z, top, rows), tile_size, fmt,
+                        background)
+
+
+def _read_level(out_dir, z, level, tile_size, fmt, background):
+    """Stitch a written level back into one RGBA image (empty tiles = background)"""
+    from PIL import Image
+
+    image = np.empty((level['height'], level['width'], 4), dtype=np.uint8)
+    image[:] = background
+    for y in range(level['rows']):
+        for x in range(level['columns']):
+            if level['tiles'][y * level['columns'] + x] == '1':
+                tile = Image.open(os.path.join(out_dir, str(z), str(x), f'{y}.{fmt}'))
+                tile = np.asarray(tile.convert('RGBA'))
+                image[y * tile_size:y * tile_size + tile.shape[0],
+                      x * tile_size:x * tile_size + tile.shape[1]] = tile
+    return image
+
+
+def _level_info(width, height, tile_size, rows):
+    return {'width': width, 'height': height, 'columns': math.ceil(width / tile_size),
+            'rows': math.ceil(height / tile_size), 'tiles': ''.join(rows)}
+
+
+def build_pyramid(out_dir, rendered_sizes, render_rows, background=None, tile_size=TILE_SIZE,
+                  fmt='png', jobs=None, strip_tiles=4):
+    """Write an XYZ tile pyramid plus tiles.json and an index.html viewer.
+
+    rendered_sizes  [(width, height)] of the levels to render, coarsest
+                    first, each about twice the previous one
+    render_rows     callable (k, top, rows) -> (rows, width, 4) uint8 RGBA
+                    for rendered level k
+    background      color of empty canvas; tiles that are only background
+                    are not written (the viewer paints it instead)
+    fmt             'png' or 'webp'
+    jobs            worker processes (default: export.default_jobs())
+    strip_tiles     tile rows per rendered strip
+
+    Rendered levels are drawn as full-width strips of `strip_tiles` tile
+    rows, spread over forked workers. Coarser levels, down to one that
+    fits in a single tile, are 2x2 box-filtered from the coarsest rendered
+    level. Returns the metadata written to tiles.json.
+    """
+    global _RENDER_ROWS
+    from concurrent.futures import ProcessPoolExecutor
+    from PIL import Image
+    from export import default_jobs, fork_context
+
+    if fmt not in ('png', 'webp'):
+        raise ValueError(f"Unsupported tile format: {fmt!r}")
+    os.makedirs(out_dir, exist_ok=True)
+    background_rgba = _background_rgba(background)
+
+    # Levels below the coarsest rendered one are downsampled
+    width, height = rendered_sizes[0]
+    n_down = zoom_levels(width, height, tile_size) - 1
+
+    tasks = []
+    for k, (width, height) in enumerate(rendered_sizes):
+        n_rows = math.ceil(height / tile_size)
+        for first_row in range(0, n_rows, strip_tiles):
+            tasks.append((out_dir, n_down + k, first_row, min(strip_tiles, n_rows - first_row),
+                          width, height, tile_size, fmt, background_rgba))
+    # Biggest levels first so the slowest strips start early
+    tasks.sort(key=lambda task: -task[1])
+
+    jobs = min(jobs or default_jobs(), len(tasks))
+    context = fork_context() if jobs > 1 else None
+    masks = {}
+
+    _RENDER_ROWS = lambda z, top, rows: render_rows(z - n_down, top, rows)
+    try:
+        if context is None:
+            for task in tasks:
+                first_row, rows = _render_strip(*task)
+                masks[task[1], first_row] = rows
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+                futures = {pool.submit(_render_strip, *task): task[1] for task in tasks}
+                for future, z in futures.items():
+                    first_row, rows = future.result()
+                    masks[z, first_row] = rows
+    finally:
+        _RENDER_ROWS = None
+
+    levels = {}
+    for k, (width, height) in enumerate(rendered_sizes):
+        z = n_down + k
+        n_rows = math.ceil(height / tile_size)
+        rows = [row for first_row in range(0, n_rows, strip_tiles)
+                for row in masks[z, first_row]]
+        levels[z] = _level_info(width, height, tile_size, rows)
+
+    image = None
+    for z in range(n_down - 1, -1, -1):
+        if image is None:
+            image = Image.fromarray(_read_level(out_dir, z + 1, levels[z + 1], tile_size, fmt,
+                                                background_rgba))
+        image = image.reduce(2)
+        _, rows = _write_tiles(out_dir, z, 0, np.asarray(image), tile_size, fmt, background_rgba)
+        levels[z] = _level_info(image.width, image.height, tile_size, rows)
+
+    background_hex = '#%02x%02x%02x' % tuple(int(c) for c in background_rgba[:3])
+    meta = {'tile_size': tile_size, 'format': fmt, 'background': background_hex,
+            'levels': [levels[z] for z in sorted(levels)]}
+    with open(os.path.join(out_dir, 'tiles.json'), 'w') as f:
+        json.dump(meta, f)
+    write_viewer(out_dir, meta)
+    return meta
+
+
+def write_viewer(out_dir, meta):
+    """index.html that pans/zooms the pyramid and only loads visible tiles.
+
+    The metadata is inlined so the page also works from file://.
+    """
+    with open(_VIEWER_TEMPLATE, encoding='utf-8') as f:
+        page = f.read()
+    page = page.replace('/*PYRAMID*/null', json.dumps(meta, separators=(',', ':')))
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(page)
+
+
+def save_figure_pyramid(fig, out_dir, dpi, bbox_inches=None, tile_size=TILE_SIZE, fmt='png',
+                        jobs=None, **savefig_kwargs):
+    """Tile pyramid of a matplotlib figure whose deepest level is the image
+    savefig(dpi=dpi, bbox_inches=bbox_inches) would produce.
+
+    Levels are rendered at dpi, dpi/2, dpi/4, ... down to MIN_RENDER_DPI
+    (FreeType cannot size text much below that); coarser ones are
+    downsampled.
+    """
+    from tiled_render import render_rows
+
+    if bbox_inches is None:
+        bbox_inches = fig.bbox_inches
+    level_dpi = [dpi]
+    while (level_dpi[0] / 2 >= MIN_RENDER_DPI and
+           max(bbox_inches.width, bbox_inches.height) * level_dpi[0] > tile_size):
+        level_dpi.insert(0, level_dpi[0] / 2)
+    sizes = [(int(bbox_inches.width * d), int(bbox_inches.height * d)) for d in level_dpi]
+
+    def rows_for_level(k, top, rows):
+        return render_rows(fig, level_dpi[k], bbox_inches, top, rows, **savefig_kwargs)
+
+    background = savefig_kwargs.get('facecolor', fig.get_facecolor())
+    return build_pyramid(out_dir, sizes, rows_for_level, background, tile_size, fmt, jobs)
+
+
+def save_svg_pyramid(tree, out_dir, output_width, output_height, background_color=None,
+                     tile_size=TILE_SIZE, fmt='png', jobs=None):
+    """Tile pyramid of a parsed cairosvg Tree whose deepest level is
+    output_width x output_height pixels; every level is rendered"""
+    from tiled_render import render_svg_rows
+
+    n_levels = zoom_levels(output_width, output_height, tile_size)
+    level_scale = [2 ** (n_levels - 1 - z) for z in range(n_levels)]
+    sizes = [(int(round(output_width / s)), int(round(output_height / s))) for s in level_scale]
+
+    def rows_for_level(k, top, rows):
+        s = level_scale[k]
+        return render_svg_rows(tree, output_width / s, output_height / s, top, rows,
+                               background_color)
+
+    return build_pyramid(out_dir, sizes, rows_for_level, background_color, tile_size, fmt, jobs)
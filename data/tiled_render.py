@@ -0,0 +1,817 @@
+"""
+Tiled, memory-bounded rasterization for print-resolution PNGs
+Figures are drawn one horizontal tile at a time and streamed into the PNG
+"""
+
+import math
+import struct
+import sys
+import warnings
+import zlib
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg, RendererAgg
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2D
+
+# _TileRenderer hooks into RendererAgg internals (_update_methods, the
+# collection iterators, the C++ draw_path_collection signature) and
+# re-implements agg::conv_dash, as of this matplotlib release series; the
+# README pins it. check_seams is the regression check to run before moving
+# the pin. On any other version the strips are plain savefig crops, which
+# can show seams, with a warning
+AGG_HOOKS_MATPLOTLIB = (3, 11)
+
+
+class PNGStreamWriter:
+    """Writes an 8-bit RGBA PNG tile by tile.
+
+    Only the rows handed to write() are ever held in memory; they are
+    filtered, compressed and appended as IDAT data straight away.
+    """
+
+    def __init__(self, path, width, height, dpi=None, compression=6):
+        self.width = int(width)
+        self.height = int(height)
+        self.rows_written = 0
+        self._file = open(path, 'wb')
+        self._zlib = zlib.compressobj(compression)
+
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bits per channel, color type 6 (RGBA), no interlacing
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 6, 0, 0, 0))
+        if dpi:
+            ppm = int(round(dpi / 0.0254))
+            self._chunk(b'pHYs', struct.pack('>IIB', ppm, ppm, 1))
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write(self, rows):
+        """Append (k, width, 4) uint8 RGBA rows"""
+        rows = np.asarray(rows, dtype=np.uint8)
+        if rows.ndim != 3 or rows.shape[1:] != (self.width, 4):
+            raise ValueError(f"Expected (rows, {self.width}, 4) RGBA data, got {rows.shape}")
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError("More rows than the PNG height")
+
+        # "Sub" filter: each byte minus the same channel of the pixel to its left
+        flat = rows.reshape(len(rows), -1)
+        filtered = np.empty((len(rows), flat.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:5] = flat[:, :4]
+        np.subtract(flat[:, 4:], flat[:, :-4], out=filtered[:, 5:])
+
+        data = self._zlib.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"PNG has {self.height} rows, only {self.rows_written} written")
+            self._chunk(b'IDAT', self._zlib.flush())
+            self._chunk(b'IEND', b'')
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+def _tiles(height, tile_rows):
+    for top in range(0, height, tile_rows):
+        yield top, min(tile_rows, height - top)
+
+
+# Agg's vertex_dist_epsilon: closer vertices count as one
+_VERTEX_DIST_EPSILON = 1e-14
+
+
+def _agg_dashes(path, dashes, offset):
+    """A cleaned, curve-free pixel-space path cut into its dashes, as a
+    Path of solid pieces.
+
+    Follows agg::conv_dash (vcgen_dash and its vertex_sequence) step by
+    step, with the same floating point operations, so the pieces are the
+    ones Agg would stroke.
+    """
+    if len(dashes) % 2:
+        dashes = list(dashes) * 2
+    dashes = list(dashes)[:32]
+    out_vertices, out_codes = [], []
+    state = [0, 0.0]  # current dash, distance into it
+
+    def link(seq, i, j):
+        # vertex_dist::operator(): stores the distance from i to j
+        dx, dy = seq[j][0] - seq[i][0], seq[j][1] - seq[i][1]
+        seq[i][2] = math.sqrt(dx * dx + dy * dy)
+        if seq[i][2] > _VERTEX_DIST_EPSILON:
+            return True
+        seq[i][2] = 1.0 / _VERTEX_DIST_EPSILON
+        return False
+
+    def add(seq, x, y):
+        if len(seq) > 1 and not link(seq, -2, -1):
+            seq.pop()
+        seq.append([x, y, 0.0])
+
+    def generate(seq, closed):
+        while len(seq) > 1 and not link(seq, -2, -1):
+            last = seq.pop()
+            seq.pop()
+            add(seq, last[0], last[1])
+        if closed:
+            while len(seq) > 1 and not link(seq, -1, 0):
+                seq.pop()
+        if len(dashes) < 2 or len(seq) < 2:
+            return
+        v1, v2, vertex = seq[0], seq[1], 1
+        rest = v1[2]
+        out_vertices.append((v1[0], v1[1]))
+        out_codes.append(Path.MOVETO)
+        if offset >= 0:
+            ds = offset
+            state[:] = [0, 0.0]
+            while ds > 0:
+                if ds > dashes[state[0]]:
+                    ds -= dashes[state[0]]
+                    state[0] = (state[0] + 1) % len(dashes)
+                    state[1] = 0.0
+                else:
+                    state[1], ds = ds, 0.0
+        while True:
+            dash_rest = dashes[state[0]] - state[1]
+            code = Path.MOVETO if state[0] & 1 else Path.LINETO
+            if rest > dash_rest:
+                rest -= dash_rest
+                state[0] = (state[0] + 1) % len(dashes)
+                state[1] = 0.0
+                out_vertices.append((v2[0] - (v2[0] - v1[0]) * rest / v1[2],
+                                     v2[1] - (v2[1] - v1[1]) * rest / v1[2]))
+                out_codes.append(code)
+                continue
+            state[1] += rest
+            out_vertices.append((v2[0], v2[1]))
+            out_codes.append(code)
+            vertex += 1
+            v1 = v2
+            rest = v1[2]
+            if vertex > len(seq) or (vertex == len(seq) and not closed):
+                return
+            v2 = seq[vertex % len(seq)]
+
+    # conv_adaptor_vcgen: one run of the generator per subpath, each
+    # starting from the last move_to
+    vertices, codes = path.vertices.tolist(), path.codes.tolist()
+    if not codes or codes[0] == Path.STOP:
+        return Path(np.zeros((0, 2)))
+    start, i = vertices[0], 1
+    while True:
+        seq, closed = [], False
+        add(seq, *start)
+        while i < len(codes):
+            code, i = codes[i], i + 1
+            if code == Path.MOVETO:
+                start = vertices[i - 1]
+                break
+            if code == Path.CLOSEPOLY:
+                closed = True
+                break
+            if code == Path.STOP:
+                break
+            add(seq, *vertices[i - 1])
+        generate(seq, closed)
+        if i >= len(codes) or codes[i - 1] == Path.STOP:
+            break
+    if not out_vertices:
+        return Path(np.zeros((0, 2)))
+    return Path(np.array(out_vertices), out_codes)
+
+
+def _stroke_reach(width, joinstyle):
+    """How far (pixels) a stroke `width` wide can reach past its path: half
+    the width, times Agg's miter limit (the width itself) for miter joins"""
+    return width / 2 * (max(width, math.sqrt(2)) if joinstyle == 'miter' else math.sqrt(2))
+
+
+def _line_segments(path):
+    """Mask over the consecutive vertex pairs of `path` joined by a line
+    (Agg flattens curves into short segments, which stay near the edges)"""
+    if path.codes is None:
+        return np.ones(max(len(path.vertices) - 1, 0), dtype=bool)
+    return path.codes[1:] == Path.LINETO
+
+
+def _collection_run(run, count, *sequences):
+    """The entries of each of a collection's per-path `sequences` (cycled,
+    as Agg does) for the paths at indices `run` of the `count` drawn"""
+    if len(run) == count:
+        return sequences
+    return [sequence if len(sequence) <= 1
+            else [sequence[i] for i in run % len(sequence)] if isinstance(sequence, list)
+            else sequence[run % len(sequence)] for sequence in sequences]
+
+
+def strip_overlap(fig, dpi):
+    """Overlap (pixels) strips of `fig` need so the strip edges never show:
+    the reach of its widest stroke, plus the pixel Agg clips outside the
+    canvas and one of antialiasing"""
+    from matplotlib.collections import Collection
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+    from matplotlib.text import Text
+
+    reach = 0.0
+    for artist in fig.findobj():
+        if isinstance(artist, Text) and artist.get_bbox_patch() is not None:
+            artist = artist.get_bbox_patch()
+        if isinstance(artist, Line2D):
+            strokes = [(artist.get_linewidth(), artist.get_solid_joinstyle()),
+                       (artist.get_linewidth(), artist.get_dash_joinstyle())]
+        elif isinstance(artist, Collection):
+            strokes = [(width, artist.get_joinstyle()) for width in artist.get_linewidths()]
+        elif isinstance(artist, Patch):
+            strokes = [(artist.get_linewidth(), artist.get_joinstyle())]
+        else:
+            continue
+        for width, joinstyle in strokes:
+            reach = max(reach, _stroke_reach(width * dpi / 72, joinstyle))
+    return int(np.ceil(reach)) + 2
+
+
+class _TileRenderer(RendererAgg):
+    """Agg renderer for one strip of a bigger image, drawing the strip the
+    way the whole image draws it.
+
+    Agg clips a stroked path to the canvas before it simplifies and dashes
+    it, so a strip would simplify and dash the path from where it enters
+    the strip, not from its start. Here stroked paths first go through
+    Agg's own clip, snap and simplify steps (Path.cleaned) against the
+    whole image, and dashes are cut the way Agg cuts them (_agg_dashes);
+    Agg then only has to rasterize the result. What the strip's clipping
+    still changes lies within `reach` pixels of the rows kept from it,
+    `keep_rows` (see render_rows): the largest stroke reach drawn, or the
+    whole length of a segment that runs into those rows across their top or
+    bottom, since Agg starts a clipped segment's outline from a rounded
+    point on the canvas edge.
+
+    Collection.draw also asks whether a single path fits in the figure
+    before blitting it as a marker; that is answered for the whole image
+    (`image_bbox`), not the strip. Hatch patterns are tiled from the
+    canvas's top left corner, so `hatched` tells render_rows to start a
+    strip drawing one on a whole hatch tile.
+    """
+
+    def __init__(self, width, height, dpi, image_height, image_top, image_bbox, keep_rows):
+        super().__init__(width, height, dpi)
+        self.image_height = image_height
+        self.image_bbox = image_bbox
+        self.keep_rows = keep_rows
+        self.reach = 0.0
+        self.hatched = False
+        # Strip display coordinates <-> whole-image Agg pixels (y down)
+        self._to_image = Affine2D().scale(1, -1).translate(0, height + image_top)
+        self._from_image = Affine2D().translate(0, -(height + image_top)).scale(1, -1)
+
+    def _update_methods(self):
+        super()._update_methods()
+        # Agg's collection drawing would clip and dash each path per strip
+        del self.draw_path_collection
+
+    def draw_path(self, gc, path, transform, rgbFace=None):
+        face = rgbFace is not None and (
+            gc.get_alpha() if gc.get_forced_alpha() or len(rgbFace) == 3 else rgbFace[3]) != 0
+        self.hatched |= gc.get_hatch_path() is not None
+        if face or gc.get_hatch_path() is not None:
+            # Filled and hatched paths are never clipped or simplified
+            reach = _stroke_reach(self.points_to_pixels(gc.get_linewidth()), gc.get_joinstyle())
+            image_path = (transform + self._to_image).transform_path(path)
+            self.reach = max(self.reach, reach, self._crossing_reach(
+                image_path.vertices, _line_segments(image_path), reach))
+            return super().draw_path(gc, path, transform, rgbFace)
+        width = self.points_to_pixels(gc.get_linewidth())
+        self._draw_stroke(gc, path, transform, rgbFace, path.should_simplify,
+                          width if gc.get_rgb()[3] != 0 else 0.0)
+
+    def draw_path_collection(self, gc, master_transform, paths, all_transforms, offsets,
+                             offset_trans, facecolors, edgecolors, linewidths, linestyles,
+                             antialiaseds, urls, offset_position, *, hatchcolors=None):
+        if not len(paths):
+            return
+        self.hatched |= gc.get_hatch_path() is not None
+        if (len(paths) == 1 and len(all_transforms) <= 1 and len(facecolors) == 1
+                and len(edgecolors) == 1 and len(linewidths) == 1
+                and linestyles[0][1] is None and len(antialiaseds) == 1 and len(urls) == 1
+                and gc.get_hatch() is None):
+            # Collection.draw blits a single path as a marker when it fits in
+            # the figure: the whole image's, not the strip's
+            if len(all_transforms):
+                master_transform = Affine2D(all_transforms[0]) + master_transform
+            extents = paths[0].get_extents(master_transform)
+            if (extents.width < self.image_bbox.width
+                    and extents.height < self.image_bbox.height):
+                gc.set_foreground(tuple(edgecolors[0]), isRGBA=True)
+                gc.set_linewidth(linewidths[0])
+                gc.set_antialiased(antialiaseds[0])
+                gc.set_url(urls[0])
+                return self.draw_markers(gc, paths[0], master_transform.frozen(),
+                                         Path(offsets), offset_trans, tuple(facecolors[0]))
+        if len(facecolors) or gc.get_hatch_path() is not None or not any(
+                dashes for _, dashes in linestyles):
+            # Nothing is simplified or dashed: Agg only clips these
+            widths = linewidths if len(linewidths) and len(edgecolors) else [0.0]
+            reach = _stroke_reach(self.points_to_pixels(max(widths)), gc.get_joinstyle())
+            vertices, segments, starts = self._collection_vertices(
+                master_transform, paths, all_transforms, offsets, offset_trans)
+            self.reach = max(self.reach, reach, self._crossing_reach(vertices, segments, reach))
+            draw = self._renderer.draw_path_collection
+            hatchcolors = [] if hatchcolors is None else hatchcolors
+            if (gc.get_snap() is not None or len(facecolors)
+                    or gc.get_hatch_path() is not None):
+                return draw(gc, master_transform, paths, all_transforms, offsets, offset_trans,
+                            facecolors, edgecolors, linewidths, linestyles, antialiaseds, urls,
+                            offset_position, hatchcolors=hatchcolors)
+            # Agg decides whether to snap a stroke from the part left after
+            # clipping, which in a strip can be just a horizontal or vertical
+            # stretch of it: decide for the whole image, and draw each run of
+            # paths that snap alike (Agg draws them in order)
+            snaps = self._snaps(vertices, segments, starts, paths)
+            for run in np.split(np.arange(len(snaps)), np.flatnonzero(np.diff(snaps)) + 1):
+                gc.set_snap(bool(snaps[run[0]]))
+                draw(gc, master_transform, *_collection_run(
+                    run, len(snaps), paths, all_transforms, offsets), offset_trans,
+                    facecolors, *_collection_run(
+                        run, len(snaps), edgecolors, linewidths, linestyles, antialiaseds,
+                        urls), offset_position, hatchcolors=hatchcolors)
+            gc.set_snap(None)
+            return
+        # RendererBase.draw_path_collection, with Agg's collection steps:
+        # no simplification, the line width always snaps
+        path_ids = self._iter_collection_raw_paths(master_transform, paths, all_transforms)
+        for xo, yo, path_id, gc0, rgbFace in self._iter_collection(
+                gc, list(path_ids), offsets, offset_trans, facecolors, edgecolors, linewidths,
+                linestyles, antialiaseds, urls, offset_position, hatchcolors=[]):
+            path, transform = path_id
+            if xo != 0 or yo != 0:
+                transform = transform.frozen()
+                transform.translate(xo, yo)
+            self._draw_stroke(gc0, path, transform, rgbFace, False,
+                              self.points_to_pixels(gc0.get_linewidth()))
+
+    def _crossing_reach(self, vertices, segments, reach):
+        """How far beyond the kept rows the line segments between `vertices`
+        (whole-image pixels; `segments` masks the pairs joined by one) that
+        cross their top or bottom run, widened by `reach`. Vertical segments
+        clip exactly and don't count"""
+        if len(vertices) < 2:
+            return 0.0
+        xs, ys = vertices[:, 0], vertices[:, 1]
+        segments = segments & (xs[:-1] != xs[1:])
+        lo = np.minimum(ys[:-1], ys[1:])[segments] - reach
+        hi = np.maximum(ys[:-1], ys[1:])[segments] + reach
+        top, bottom = self.keep_rows
+        extent = 0.0
+        if top > 0:
+            crossing = (lo < top) & (hi > top)
+            if crossing.any():
+                extent = top - lo[crossing].min()
+        if bottom < self.image_height:
+            crossing = (lo < bottom) & (hi > bottom)
+            if crossing.any():
+                extent = max(extent, hi[crossing].max() - bottom)
+        return float(extent)
+
+    def _collection_vertices(self, master_transform, paths, all_transforms, offsets,
+                             offset_trans):
+        """The vertices (whole-image pixels) of every path a collection
+        draws, run together, with the mask of line segments between them
+        (see _crossing_reach) and the index each path starts at"""
+        if len(all_transforms) > 1 or len(offsets) > 1:
+            # One transform per drawn path, as RendererBase._iter_collection pairs them
+            transforms = list(self._iter_collection_raw_paths(
+                master_transform, paths, all_transforms))
+            offsets = offset_trans.transform(offsets) if len(offsets) else np.zeros((1, 2))
+            drawn, vertices = [], []
+            for i in range(max(len(transforms), len(offsets))):
+                path, transform = transforms[i % len(transforms)]
+                drawn.append(path)
+                vertices.append((transform + self._to_image).transform(path.vertices)
+                                + offsets[i % len(offsets)] * (1, -1))
+            vertices = np.concatenate(vertices)
+        else:
+            # Every path shares one transform
+            if len(all_transforms):
+                master_transform = Affine2D(all_transforms[0]) + master_transform
+            drawn = paths
+            vertices = (master_transform + self._to_image).transform(
+                np.concatenate([path.vertices for path in paths]))
+            if len(offsets):
+                vertices += offset_trans.transform(offsets)[0] * (1, -1)
+        segments = np.concatenate([np.append(_line_segments(path), False) for path in drawn])
+        starts = np.cumsum([0] + [len(path.vertices) for path in drawn[:-1]])
+        return vertices, segments[:-1], starts
+
+    @staticmethod
+    def _snaps(vertices, segments, starts, paths):
+        """Whether Agg snaps each path of a collection in the whole image:
+        PathSnapper's test, paths of straight horizontal and vertical lines
+        of up to 1024 vertices"""
+        if len(vertices) < 2:
+            return np.zeros(len(starts), dtype=bool)
+        steps = np.abs(np.diff(vertices, axis=0))
+        slanted = segments & (steps[:, 0] >= 1e-4) & (steps[:, 1] >= 1e-4)
+        snaps = np.add.reduceat(slanted, np.minimum(starts, len(slanted) - 1)) == 0
+        counts = np.diff(starts, append=len(vertices))
+        snaps &= (counts > 0) & (counts <= 1024)
+        curved = [i for i, path in enumerate(paths) if path.codes is not None
+                  and np.isin(path.codes, (Path.CURVE3, Path.CURVE4)).any()]
+        if curved:
+            snaps &= ~np.isin(np.arange(len(starts)) % len(paths), curved)
+        return snaps
+
+    def _draw_stroke(self, gc, path, transform, rgbFace, simplify, snap_width):
+        width = self.points_to_pixels(gc.get_linewidth())
+        reach = _stroke_reach(width, gc.get_joinstyle())
+        self.reach = max(self.reach, reach)
+        offset, dashes = gc.get_dashes()
+        cleaned = path.cleaned(transform + self._to_image, remove_nans=True,
+                               clip=(0, 0, self.width, self.image_height), simplify=simplify,
+                               curves=not dashes, stroke_width=snap_width, snap=gc.get_snap())
+        snap = gc.get_snap()
+        gc.set_snap(False)
+        try:
+            if dashes:
+                # Dashes::dash_to_stroke
+                scale = self.dpi / 72.0
+                pattern = [d * scale for d in dashes]
+                if not gc.get_antialiased():
+                    pattern = [int(d) + 0.5 for d in pattern]
+                cleaned = _agg_dashes(cleaned, pattern, (offset or 0) * scale)
+                gc.set_dashes(0, None)
+            cleaned.should_simplify = False
+            self.reach = max(self.reach, self._crossing_reach(
+                cleaned.vertices, _line_segments(cleaned), reach))
+            if len(cleaned.vertices):
+                super().draw_path(gc, cleaned, self._from_image, rgbFace)
+        finally:
+            gc.set_snap(snap)
+            if dashes:
+                gc.set_dashes(offset, dashes)
+
+
+class _TileCanvas(FigureCanvasAgg):
+    # Set by render_rows: the whole image's height, the strip's top row in
+    # it, its figure bbox (pixels) and the rows kept from the strip
+    image_height = image_top = 0
+    image_bbox = keep_rows = None
+
+    def get_renderer(self):
+        w, h = self.get_width_height(physical=True)
+        key = w, h, self.figure.dpi
+        if self._lastKey != key:
+            self.renderer = _TileRenderer(w, h, self.figure.dpi, self.image_height,
+                                          self.image_top, self.image_bbox, self.keep_rows)
+            self._lastKey = key
+        return self.renderer
+
+
+def agg_hooks_supported():
+    """Whether this matplotlib is the one _TileRenderer was written against"""
+    version = tuple(int(part) for part in matplotlib.__version__.split('.')[:2])
+    return version == AGG_HOOKS_MATPLOTLIB
+
+
+def render_rows(fig, dpi, bbox_inches, top, rows, margin=None, **savefig_kwargs):
+    """RGBA pixels (rows, width, 4) for rows [top, top + rows) of the image
+    savefig(dpi=dpi, bbox_inches=bbox_inches) would produce.
+
+    The strip is drawn through savefig with a bbox shifted by a whole
+    number of pixels, through a renderer that processes every path as in
+    the whole image (see _TileRenderer). The strip's own clipping only
+    changes strokes near its edges, so it is drawn with `margin` pixels of
+    overlap on its inner edges (default: strip_overlap) and cropped; should
+    a stroke reach further than that, the strip is drawn again with more.
+    """
+    return _render_strip(fig, dpi, bbox_inches, top, rows, margin, **savefig_kwargs)[0]
+
+
+def _render_strip(fig, dpi, bbox_inches, top, rows, margin=None, **savefig_kwargs):
+    """render_rows, also returning the overlap (pixels) the strip needed:
+    neighbouring strips need about as much, so drawing the next one with it
+    saves drawing that one twice"""
+    from io import BytesIO
+    from matplotlib.transforms import Bbox
+
+    hooks = agg_hooks_supported()
+    if not hooks:
+        warnings.warn(f"tiled_render's Agg hooks are for matplotlib "
+                      f"{'.'.join(map(str, AGG_HOOKS_MATPLOTLIB))}.x, not "
+                      f"{matplotlib.__version__}: strips are plain savefig crops and seams "
+                      f"may show (see check_seams)", RuntimeWarning)
+    x0, y0 = bbox_inches.x0, bbox_inches.y0
+    # The sizes Agg would use for the whole image (it truncates)
+    width = int(bbox_inches.width * dpi)
+    height = int(bbox_inches.height * dpi)
+    pad = strip_overlap(fig, dpi) if margin is None else margin
+    align = 1
+
+    while True:
+        above = min(pad, top)
+        above += (top - above) % align
+        below = min(pad, height - top - rows)
+        drawn = above + rows + below
+        # PNG rows run downwards from the top of the bbox
+        bottom = y0 + (height - top - rows - below) / dpi
+        strip = Bbox.from_bounds(x0, bottom, bbox_inches.width, (drawn + 0.5) / dpi)
+
+        original_canvas = fig.canvas
+        if hooks:
+            canvas = _TileCanvas(fig)
+            canvas.image_height, canvas.image_top = height, top - above
+            canvas.keep_rows = top, top + rows
+            canvas.image_bbox = Bbox.from_bounds(0, 0, bbox_inches.width * dpi,
+                                                 bbox_inches.height * dpi)
+        else:
+            canvas = FigureCanvasAgg(fig)
+        try:
+            buf = BytesIO()
+            fig.savefig(buf, format='raw', dpi=dpi, bbox_inches=strip, **savefig_kwargs)
+            reach = canvas.renderer.reach if hooks else 0.0
+        finally:
+            fig.set_canvas(original_canvas)
+        needed = int(np.ceil(reach)) + 2
+        # Agg's hatch tiles are int(dpi) pixels square
+        hatch = int(dpi) if hooks and canvas.renderer.hatched else 1
+        wide_enough = needed <= pad or (above == top and below == height - top - rows)
+        if wide_enough and (top - above) % hatch == 0:
+            break
+        pad, align = max(pad, needed), hatch
+    pixels = np.frombuffer(buf.getbuffer(), dtype=np.uint8).reshape(drawn, width, 4)
+    return pixels[above:above + rows], needed
+
+
+def save_tiled_png(fig, path, dpi, bbox_inches=None, tile_rows=1024, margin=None,
+                   **savefig_kwargs):
+    """Save `fig` as a PNG without ever allocating the full-size Agg buffer.
+
+    The image is drawn as full-width strips of `tile_rows` rows (see
+    render_rows) and streamed into the file. Returns the image (width, height).
+
+    The pixels are savefig(dpi=dpi, bbox_inches=bbox_inches)'s (check_seams
+    asserts it). Agg strokes in floating point at absolute canvas
+    coordinates, though: where a path has long runs of nearly collinear
+    vertices (a straight line sampled every pixel, say), its joins can
+    round a level differently in a strip, as they do in a plain savefig of
+    a canvas cropped at the top. check_tiled_png measures this for a given
+    figure.
+    """
+    if bbox_inches is None:
+        bbox_inches = fig.bbox_inches
+    width = int(bbox_inches.width * dpi)
+    height = int(bbox_inches.height * dpi)
+    if margin is None:
+        margin = strip_overlap(fig, dpi)
+
+    needed = margin
+    with PNGStreamWriter(path, width, height, dpi=dpi) as png:
+        for top, rows in _tiles(height, tile_rows):
+            pixels, needed = _render_strip(fig, dpi, bbox_inches, top, rows,
+                                           max(margin, needed), **savefig_kwargs)
+            png.write(pixels)
+    return width, height
+
+
+def check_tiled_png(fig, dpi, bbox_inches=None, tile_rows=(1024, 333), tolerance=0,
+                    **savefig_kwargs):
+    """Draw `fig` in strips of each of `tile_rows` rows and compare every
+    result with a plain savefig at the same `dpi`.
+
+    Returns {tile_rows: (pixels that differ, largest difference)}; raises
+    ValueError if a difference exceeds `tolerance` levels (none by default).
+    Meant for a dpi small enough to hold the untiled image in memory.
+    """
+    from io import BytesIO
+
+    if bbox_inches is None:
+        bbox_inches = fig.bbox_inches
+    width = int(bbox_inches.width * dpi)
+    height = int(bbox_inches.height * dpi)
+    margin = strip_overlap(fig, dpi)
+
+    buf = BytesIO()
+    fig.savefig(buf, format='raw', dpi=dpi, bbox_inches=bbox_inches, **savefig_kwargs)
+    untiled = np.frombuffer(buf.getbuffer(), dtype=np.uint8).reshape(height, width, 4)
+
+    report = {}
+    for rows in tile_rows:
+        diff = np.zeros((height, width), dtype=np.uint8)
+        needed = margin
+        for top, count in _tiles(height, rows):
+            strip, needed = _render_strip(fig, dpi, bbox_inches, top, count,
+                                          max(margin, needed), **savefig_kwargs)
+            diff[top:top + count] = np.abs(
+                strip.astype(np.int16) - untiled[top:top + count]).max(axis=2)
+        report[rows] = int(np.count_nonzero(diff)), int(diff.max())
+    worst = {rows: found for rows, found in report.items() if found[1] > tolerance}
+    if worst:
+        raise ValueError(f"Tiled render differs from savefig by more than {tolerance} levels "
+                         f"(tile_rows: (pixels, largest difference)): {worst}")
+    return report
+
+
+def _seam_figure():
+    """A figure with a path of every kind _TileRenderer treats specially,
+    all crossing many strip edges: dashed and simplified lines, dashed and
+    plain collections, a single-path collection taller than a strip (the
+    marker shortcut), fills, hatches, markers and text"""
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle, Rectangle
+
+    rng = np.random.default_rng(7)
+    fig = Figure(figsize=(6, 6), facecolor='#FEFEFE')
+    ax = fig.add_subplot(111)
+    t = np.linspace(0, 4 * np.pi, 2000)
+    ax.plot(t, np.sin(t) + 0.02 * rng.standard_normal(len(t)), lw=1.2)
+    ax.plot(t, np.cos(t) * 1.5, '--', lw=2.5, color='#C0392B')
+    ax.plot([0, 12], [-2, 2], '-.', lw=4, color='#27AE60', solid_joinstyle='miter')
+    # Arcs a few pixels per vertex, not nearly collinear runs (see save_tiled_png)
+    arcs = rng.uniform(0, 2 * np.pi, 30)[:, None] + np.linspace(0, 2.5, 12)
+    segments = [np.column_stack([x + 2 * np.cos(a), 1.5 * np.sin(a)])
+                for x, a in zip(rng.uniform(1, 11, 30), arcs)]
+    ax.add_collection(LineCollection(segments, linewidths=rng.uniform(0.5, 6, 30),
+                                     colors=rng.uniform(0, 1, (30, 3)), alpha=0.7))
+    ax.add_collection(LineCollection([s + [0, 0.5] for s in segments], linestyles=':',
+                                     linewidths=1.5, colors='#8E44AD'))
+    ax.fill_between(t, np.sin(t) - 0.8, np.sin(t) + 0.3, color='#2C3E50', alpha=0.1)
+    ax.add_patch(Rectangle((1, -1.5), 3, 2.5, hatch='//', fill=False, lw=2))
+    ax.add_patch(Circle((9, 0), 1.2, fc='#F1C40F', ec='#34495E', lw=3, alpha=0.6))
+    ax.scatter(rng.uniform(0, 12, 200), rng.uniform(-2, 2, 200), s=rng.uniform(5, 300, 200),
+               c=rng.uniform(0, 1, 200), edgecolors='white', linewidths=1)
+    ax.text(6, 1.8, "Seams", fontsize=28, ha='center',
+            bbox=dict(boxstyle='round', fc='white', ec='gray', lw=2))
+    ax.set(xlim=(-0.5, 12.5), ylim=(-2.2, 2.2))
+    return fig
+
+
+def check_seams(dpi=100, tile_rows=(256, 97, 33)):
+    """Regression check for _TileRenderer: a figure exercising every path
+    it handles (_seam_figure), drawn in strips, must be pixel-identical to
+    savefig. Returns check_tiled_png's report; raises ValueError otherwise"""
+    fig = _seam_figure()
+    return check_tiled_png(fig, dpi, fig.get_tightbbox().padded(0.1), tile_rows,
+                           facecolor=fig.get_facecolor())
+
+
+def _cairo_rgba(surface, width, rows):
+    """Straight RGBA from a premultiplied cairo ARGB32 image surface"""
+    surface.flush()
+    stride = surface.get_stride()
+    data = np.frombuffer(surface.get_data(), dtype=np.uint8).reshape(rows, stride)[:, :width * 4]
+    data = data.reshape(rows, width, 4).astype(np.uint32)
+    # ARGB32 is a native-endian 32-bit word
+    b, g, r, a = (data[..., i] for i in ((0, 1, 2, 3) if sys.byteorder == 'little' else (3, 2, 1, 0)))
+
+    rgba = np.zeros((rows, width, 4), dtype=np.uint8)
+    rgba[..., 3] = a
+    # Same rounding as cairo's own PNG writer
+    visible = a > 0
+    alpha = a[visible]
+    for channel, value in enumerate((r, g, b)):
+        rgba[..., channel][visible] = (value[visible] * 255 + alpha // 2) // alpha
+    return rgba
+
+
+def svg_to_tiled_png(url, write_to, output_width, output_height, background_color=None,
+                     dpi=96, tile_rows=1024):
+    """cairosvg.svg2png for huge outputs: the SVG is parsed once and drawn
+    tile by tile onto small cairo surfaces offset by whole pixels.
+
+    `dpi` is cairosvg's unit resolution, not the print resolution; as with
+    svg2png the output size comes from output_width/output_height.
+    """
+    from cairosvg.parser import Tree
+
+    return tree_to_tiled_png(Tree(url=url), write_to, output_width, output_height,
+                             background_color, dpi, tile_rows)
+
+
+def render_svg_rows(tree, output_width, output_height, top, rows, background_color=None,
+                    dpi=96):
+    """RGBA pixels (rows, width, 4) for rows [top, top + rows) of a parsed
+    cairosvg Tree rendered at output_width x output_height"""
+    import cairocffi as cairo
+    from cairosvg.surface import PNGSurface
+
+    width = int(round(output_width))
+
+    class StripSurface(PNGSurface):
+        def _create_surface(self, surface_width, surface_height):
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, rows)
+            surface.set_device_offset(0, -top)
+            return surface, int(round(surface_width)), int(round(surface_height))
+
+    strip = StripSurface(tree, None, dpi, output_width=output_width,
+                         output_height=output_height, background_color=background_color)
+    pixels = _cairo_rgba(strip.cairo, width, rows)
+    strip.finish()
+    return pixels
+
+
+def check_tiled_svg(url, output_width, output_height, background_color=None, dpi=96,
+                    tile_rows=(1024, 333), tolerance=0):
+    """Render the SVG at `url` in strips of each of `tile_rows` rows and
+    compare every result with cairosvg.svg2png at the same size.
+
+    Returns {tile_rows: (pixels that differ, largest difference)}; raises
+    ValueError if a difference exceeds `tolerance` levels (none by
+    default). As with Agg, cairo can stroke a path a strip shifts a level
+    differently along runs of nearly collinear vertices.
+    """
+    import cairosvg
+    from io import BytesIO
+    from PIL import Image
+    from cairosvg.parser import Tree
+
+    png = cairosvg.svg2png(url=url, dpi=dpi, output_width=output_width,
+                           output_height=output_height, background_color=background_color)
+    untiled = np.asarray(Image.open(BytesIO(png)).convert('RGBA'))
+    height, width = untiled.shape[:2]
+
+    tree = Tree(url=url)
+    report = {}
+    for rows in tile_rows:
+        diff = np.zeros((height, width), dtype=np.uint8)
+        for top, count in _tiles(height, rows):
+            strip = render_svg_rows(tree, output_width, output_height, top, count,
+                                    background_color, dpi)
+            diff[top:top + count] = np.abs(
+                strip.astype(np.int16) - untiled[top:top + count]).max(axis=2)
+        report[rows] = int(np.count_nonzero(diff)), int(diff.max())
+    worst = {rows: found for rows, found in report.items() if found[1] > tolerance}
+    if worst:
+        raise ValueError(f"Tiled render differs from svg2png by more than {tolerance} levels "
+                         f"(tile_rows: (pixels, largest difference)): {worst}")
+    return report
+
+
+def tree_to_tiled_png(tree, write_to, output_width, output_height, background_color=None,
+                      dpi=96, tile_rows=1024):
+    """svg_to_tiled_png for an already parsed cairosvg Tree"""
+    width, height = int(round(output_width)), int(round(output_height))
+
+    with PNGStreamWriter(write_to, width, height) as png:
+        for top, rows in _tiles(height, tile_rows):
+            png.write(render_svg_rows(tree, output_width, output_height, top, rows,
+                                      background_color, dpi))
+    return width, height
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check that figures rendered in strips match "
+                                                 "an untiled render: without arguments, the "
+                                                 "Agg regression check (check_seams)")
+    parser.add_argument('svg', nargs='?', help="SVG file to compare with cairosvg.svg2png")
+    parser.add_argument('--dpi', type=float, help="print resolution (default 600 for an SVG, "
+                                                  "100 for check_seams)")
+    parser.add_argument('--tile-rows', type=int, nargs='+')
+    parser.add_argument('--background', help="SVG background color, e.g. '#FCFCFA'")
+    parser.add_argument('--tolerance', type=int, default=0,
+                        help="largest SVG difference allowed, in levels (default 0)")
+    args = parser.parse_args(argv)
+
+    if args.svg is None:
+        report = check_seams(args.dpi or 100, args.tile_rows or (256, 97, 33))
+        for rows, (differ, largest) in report.items():
+            print(f"check_seams, {rows}-row strips: identical to savefig")
+        return
+
+    from cairosvg.parser import Tree
+    from svg_raster import raster_size, svg_size_inches
+
+    width, height = raster_size(svg_size_inches(Tree(url=args.svg)), {'dpi': args.dpi or 600})
+    report = check_tiled_svg(args.svg, width, height, args.background,
+                             tile_rows=args.tile_rows or (1024, 333), tolerance=args.tolerance)
+    for rows, (differ, largest) in report.items():
+        print(f"{width}x{height} px in {rows}-row strips: {differ} pixels differ, "
+              f"by at most {largest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Shared tree index for the AI evolution dataset
+Children, parents, depth, subtree counts and traversal orders computed once
+"""
+
+
+# Last index built per constructor, keyed by names + parents only. Edits that
+# leave the tree shape alone (years, colors, importance, ...) reuse it, and
+# processes forked after an index was built (render daemon, watch mode) never
+# rebuild it. The index is read-only, so sharing it is safe.
+_SHAPES = {}
+
+
+def _remember(key, index):
+    for old in [k for k in _SHAPES if k[0] == key[0]]:
+        del _SHAPES[old]
+    _SHAPES[key] = index
+    return index
+
+
+class TreeIndex:
+    """Flat, integer-indexed view of the model tree.
+
+    Everything is computed up front in a single iterative depth-first pass,
+    so renderers can look up subtree sizes in O(1) instead of recounting
+    descendants recursively at every level (and never hit the recursion
+    limit on long lineage chains).
+
+    Per-node lists are indexed by the model's position in the dataset:
+        parent            parent index, -1 for roots
+        children          child indices, in dataset order
+        depth             edges from the root
+        leaf_count        leaves in the subtree (1 for a leaf)
+        subtree_size      nodes in the subtree, including the node itself
+        pre_pos/post_pos  position in the preorder/postorder traversals
+    """
+
+    def __init__(self, names, parents):
+        self.names = list(names)
+        self.index = {}
+        for i, name in enumerate(self.names):
+            if name in self.index:
+                raise ValueError(f"Duplicate model name: {name!r}")
+            self.index[name] = i
+
+        # Unknown parents are treated like missing ones, matching the
+        # `parent in tree_dict` guard the renderers always used
+        self._build([self.index.get(p, -1) if p else -1 for p in parents])
+
+    @classmethod
+    def from_parent_indices(cls, names, parent):
+        """Build from integer parent indices (-1 for roots), e.g. ModelStore.parent"""
+        obj = cls.__new__(cls)
+        obj.names = list(names)
+        obj.index = {name: i for i, name in enumerate(obj.names)}
+        if len(obj.index) != len(obj.names):
+            raise ValueError("Model names must be unique")
+        obj._build([int(p) for p in parent])
+        return obj
+
+    @classmethod
+    def from_store(cls, store):
+        """Build from a ModelStore without re-resolving parent names"""
+        key = ('store', tuple(store.names), store.parent.tobytes())
+        if key in _SHAPES:
+            return _SHAPES[key]
+        obj = cls.__new__(cls)
+        obj.names = store.names
+        obj.index = store.index
+        obj._build(store.parent.tolist())
+        return _remember(key, obj)
+
+    def _build(self, parent_idx):
+        n = len(self.names)
+        self.parent = [-1] * n
+        self.children = [[] for _ in range(n)]
+        self.roots = []
+
+        for i, p in enumerate(parent_idx):
+            if p < 0:
+                self.roots.append(i)
+            else:
+                self.parent[i] = p
+                self.children[p].append(i)
+
+        self.depth = [0] * n
+        self.leaf_count = [0] * n
+        self.subtree_size = [1] * n
+        self.preorder = []
+        self.postorder = []
+
+        # One iterative DFS yields both traversal orders; counts are
+        # accumulated into the parent when a node is finished
+        for root in self.roots:
+            self.preorder.append(root)
+            stack = [(root, 0)]
+            while stack:
+                node, k = stack[-1]
+                kids = self.children[node]
+                if k < len(kids):
+                    stack[-1] = (node, k + 1)
+                    child = kids[k]
+                    self.depth[child] = self.depth[node] + 1
+                    self.preorder.append(child)
+                    stack.append((child, 0))
+                    continue
+
+                stack.pop()
+                self.postorder.append(node)
+                if not kids:
+                    self.leaf_count[node] = 1
+                p = self.parent[node]
+                if p >= 0:
+                    self.leaf_count[p] += self.leaf_count[node]
+                    self.subtree_size[p] += self.subtree_size[node]
+
+        if len(self.preorder) != n:
+            raise ValueError("Model parents contain a cycle")
+
+        self.pre_pos = [0] * n
+        self.post_pos = [0] * n
+        for pos, node in enumerate(self.preorder):
+            self.pre_pos[node] = pos
+        for pos, node in enumerate(self.postorder):
+            self.post_pos[node] = pos
+
+    @classmethod
+    def from_models(cls, models):
+        """Build the index from (name, parent, ...) tuples such as AI_MODELS"""
+        names, parents = tuple(m[0] for m in models), tuple(m[1] for m in models)
+        key = ('models', names, parents)
+        if key in _SHAPES:
+            return _SHAPES[key]
+        return _remember(key, cls(names, parents))
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def descendant_count(self):
+        """Strict descendants per node (subtree size without the node)"""
+        return [size - 1 for size in self.subtree_size]
+
+    # Name-based helpers for the scripts that work with model names
+
+    def leaves(self, name):
+        """Leaf nodes under `name` (1 if it is itself a leaf)"""
+        return self.leaf_count[self.index[name]]
+
+    def size(self, name):
+        """Nodes in the subtree rooted at `name`, counting `name` itself"""
+        return self.subtree_size[self.index[name]]
+
+    def children_of(self, name):
+        return [self.names[c] for c in self.children[self.index[name]]]
+
+    def is_ancestor(self, ancestor, name):
+        """True if `ancestor` lies on the path from a root to `name`"""
+        a, v = self.index[ancestor], self.index[name]
+        return self.pre_pos[a] <= self.pre_pos[v] < self.pre_pos[a] + self.subtree_size[a]
+
+
+def build_tree_dict(models, index=None):
+    """Name-keyed node dicts in the shape the renderers have always used"""
+    if index is None:
+        index = TreeIndex.from_models(models)
+
+    tree_dict = {}
+    for i, (name, parent, year, color, importance, branch_type, extinct) in enumerate(models):
+        tree_dict[name] = {
+            'parent': parent,
+            'year': year,
+            'color': color,
+            'importance': importance,
+            'branch_type': branch_type,
+            'extinct': extinct,
+            'children': [index.names[c] for c in index.children[i]]
+        }
+    return tree_dict
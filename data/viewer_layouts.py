@@ -0,0 +1,75 @@
+"""
+Precomputed layouts for tree_viewer.html
+Radial, fountain, vertical and horizontal positions from the shared layout engine, as columns for columnar_json
+"""
+
+import numpy as np
+
+from columnar_json import Field
+
+# tree_viewer.html constants and control defaults the positions depend on
+FOUNTAIN_ROOT_WIDTH = 1000
+FOUNTAIN_BASE_WIDTH = 300
+VERTICAL_WIDTH = 800
+HORIZONTAL_HEIGHT = 600
+DEFAULT_EXPANSION = 10
+DEFAULT_CURVE = 'linear'
+
+# radial: fraction of the angle span; the others: pixels from the canvas center
+LAYOUT_FIELDS = (Field('radial', 'float', 1e-6), Field('fountain', 'float', 0.01),
+                 Field('vertical', 'float', 0.01), Field('horizontal', 'float', 0.01))
+
+_CURVES = {
+    'linear': lambda t: t,
+    'exponential': lambda t: t * t,
+    'logarithmic': np.sqrt,
+    'sigmoid': lambda t: 1 / (1 + np.exp(-10 * (t - 0.5))),
+}
+
+
+def viewer_layouts(index, years, year_min=None, year_max=None, expansion=DEFAULT_EXPANSION,
+                   curve=DEFAULT_CURVE):
+    """({layout: per-node positions}, header) for the whole, unfiltered tree.
+
+    Matches the viewer's own recursive layouts with horizontal/vertical
+    spread and node repulsion at 1; the viewer only uses the positions
+    while those controls (and, for the fountain, the header's parameters)
+    are unchanged, and computes the layout itself otherwise.
+    """
+    from layout import linear_layout, radial_layout
+
+    years = np.asarray(years, dtype=np.float64)
+    year_min = int(years.min()) if year_min is None else year_min
+    year_max = int(years.max()) if year_max is None else year_max
+
+    # Fountain: each node spreads its children over a width that grows with its year
+    t = (years - year_min) / ((year_max - year_min) or 1)
+    spread = FOUNTAIN_BASE_WIDTH * (1 + expansion * _CURVES[curve](t))
+
+    positions = {
+        'radial': radial_layout(index, years, 0.0, 1.0, weight='leaves',
+                                placement='centroid').angle,
+        'fountain': linear_layout(index, -FOUNTAIN_ROOT_WIDTH / 2, FOUNTAIN_ROOT_WIDTH,
+                                  extent=spread),
+        'vertical': linear_layout(index, -VERTICAL_WIDTH / 2, VERTICAL_WIDTH,
+                                  weight=np.ones(len(years))),
+        'horizontal': linear_layout(index, -HORIZONTAL_HEIGHT / 2, HORIZONTAL_HEIGHT,
+                                    weight=np.ones(len(years))),
+    }
+    header = {'radial': {}, 'vertical': {}, 'horizontal': {},
+              'fountain': {'expansion': expansion, 'expansionCurve': curve,
+                           'yearMin': year_min, 'yearMax': year_max}}
+    return positions, header
+
+
+def with_layouts(rows, fields, key=0, parent=2, year=3, **options):
+    """(rows, fields, layouts header) with LAYOUT_FIELDS appended to every
+    row; needs the whole tree, so `rows` is materialized"""
+    from tree_index import TreeIndex
+
+    rows = list(rows)
+    index = TreeIndex([row[key] for row in rows], [row[parent] for row in rows])
+    positions, header = viewer_layouts(index, [row[year] for row in rows], **options)
+    columns = [positions[field.name].tolist() for field in LAYOUT_FIELDS]
+    rows = [row + extra for row, extra in zip(rows, zip(*columns))]
+    return rows, tuple(fields) + LAYOUT_FIELDS, header
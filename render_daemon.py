@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Warm render daemon
+Keeps matplotlib, the font cache, the dataset and the data/ modules loaded; each job is a fork of the warm process
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+sys.path.insert(0, DATA_DIR)
+
+from build import APPROACHES, _run_approach
+
+DEFAULT_SOCKET = os.path.join(ROOT, '.build_cache', 'render.sock')
+LOG_DIR = os.path.join(ROOT, '.build_cache', 'daemon_logs')
+# Where HTTP jobs may write (see Renderer)
+DEFAULT_OUTPUT_ROOT = os.path.join(ROOT, '.build_cache', 'daemon_output')
+
+# Job settings naming a directory or file the job writes to
+OUTPUT_PATH_SETTINGS = ('AI_TREE_OUTPUT_DIR', 'AI_TREE_CACHE_DIR', 'AI_TREE_PROFILE')
+PROFILE_SWITCHES = ('0', '1', 'false', 'true', 'no', 'yes', 'off', 'on')
+
+SCRIPTS = {name: script for name, (script, _) in APPROACHES.items()}
+SCRIPTS['d3_data'] = 'approach_9_d3_ultimate/src/generate_data.py'
+
+# Imported once in the daemon; every job starts with them loaded. instrument
+# is left out so AI_TREE_PROFILE in a job's env still takes effect.
+DATA_MODULES = ('ai_models', 'catalog_io', 'model_store', 'tree_index', 'layout', 'layout_cache',
+                'label_index', 'branch_render', 'export', 'tiled_render', 'svg_stream',
+                'svg_compact')
+BACKEND_MODULES = ('numpy', 'matplotlib.pyplot', 'matplotlib.backends.backend_agg',
+                   'matplotlib.backends.backend_pdf', 'matplotlib.backends.backend_svg',
+                   'networkx', 'plotly.graph_objects', 'cairosvg')
+
+
+# --- Daemon side -------------------------------------------------------------
+
+class Renderer:
+    """Warm state plus the job runner; one job at a time.
+
+    A job's env may only hold AI_TREE_* settings, and can't name a .py
+    catalog (catalog_io runs those). With an `output_root` (HTTP), its
+    output_dir and OUTPUT_PATH_SETTINGS must lie inside that directory;
+    relative ones are taken from it.
+    """
+
+    def __init__(self, output_root=None):
+        self.output_root = output_root and os.path.realpath(output_root)
+        self.loaded = {}
+        self.dataset = None
+        # Jobs may name another catalog; ones that don't get the daemon's own
+        self.catalog = os.environ.get('AI_TREE_CATALOG', '')
+        self.jobs = 0
+        self.started = time.time()
+
+    def warm_up(self):
+        import matplotlib
+        matplotlib.use('Agg')
+        for name in BACKEND_MODULES:
+            try:
+                importlib.import_module(name)
+            except (ImportError, OSError):
+                # Optional backend, or one whose native library is missing
+                pass
+        # Building the font list is the slowest part of a cold matplotlib start
+        from matplotlib import font_manager
+        font_manager.findfont('DejaVu Sans')
+        self._load_data_modules()
+        self.refresh({})
+
+    def _load_data_modules(self):
+        for name in DATA_MODULES:
+            module = importlib.import_module(name)
+            self.loaded[name] = os.stat(module.__file__).st_mtime_ns
+
+    def refresh(self, env):
+        """Re-import whatever changed on disk since the last job: data/ code
+        (all of it, since modules import names from each other) and the dataset"""
+        # A module missing from sys.modules failed to re-import last time.
+        # ai_models is the dataset, handled below without a full purge (which
+        # would also drop tree_index's memo of the current tree shape)
+        changed = [name for name, mtime in self.loaded.items()
+                   if name != 'ai_models' and (
+                       name not in sys.modules
+                       or os.stat(sys.modules[name].__file__).st_mtime_ns != mtime)]
+        catalog = env.get('AI_TREE_CATALOG', self.catalog)
+        source = catalog or os.path.join(DATA_DIR, 'ai_models.py')
+        dataset = (catalog, os.stat(source).st_mtime_ns)
+        if not changed and dataset == self.dataset:
+            return []
+
+        # ai_models reads the catalog from the environment at import time;
+        # only for this reload, so the next job doesn't inherit it
+        if catalog:
+            os.environ['AI_TREE_CATALOG'] = catalog
+        else:
+            os.environ.pop('AI_TREE_CATALOG', None)
+        try:
+            if changed:
+                for name in DATA_MODULES:
+                    sys.modules.pop(name, None)
+                self._load_data_modules()
+            else:
+                importlib.reload(sys.modules['ai_models'])
+                changed = ['dataset']
+        finally:
+            if self.catalog:
+                os.environ['AI_TREE_CATALOG'] = self.catalog
+            else:
+                os.environ.pop('AI_TREE_CATALOG', None)
+        self.dataset = dataset
+        return changed
+
+    def render(self, job):
+        """Run one job: {"approach", "formats", "rc", "env", "output_dir"}.
+        Returns {"ok", "artifacts", "seconds", "log", ...}"""
+        from export import fork_context
+
+        name = job.get('approach')
+        if name not in SCRIPTS:
+            return {'ok': False, 'error': f"Unknown approach {name!r} (use {', '.join(SCRIPTS)})"}
+        env = {key: str(value) for key, value in (job.get('env') or {}).items()}
+        other = sorted(key for key in env if not key.startswith('AI_TREE_'))
+        if other:
+            return {'ok': False, 'error': f"Jobs may only set AI_TREE_* env, not {', '.join(other)}"}
+        if env.get('AI_TREE_CATALOG', '').endswith('.py'):
+            return {'ok': False, 'error': "Job catalogs must be .jsonl or .json "
+                                          "(a .py catalog would run as code)"}
+        if job.get('formats'):
+            formats = job['formats']
+            env['AI_TREE_FORMATS'] = formats if isinstance(formats, str) else ','.join(formats)
+        if job.get('output_dir'):
+            env['AI_TREE_OUTPUT_DIR'] = job['output_dir']
+        for key in OUTPUT_PATH_SETTINGS:
+            value = env.get(key, '')
+            # AI_TREE_PROFILE=1 prints the profile rather than writing a file
+            if value and not (key == 'AI_TREE_PROFILE' and value.lower() in PROFILE_SWITCHES):
+                try:
+                    env[key] = self._output_path(value)
+                except ValueError as e:
+                    return {'ok': False, 'error': str(e)}
+
+        start = time.time()
+        reloaded = self.refresh(env)
+        script = os.path.join(ROOT, SCRIPTS[name])
+        output_dir = env.get('AI_TREE_OUTPUT_DIR') or os.environ.get('AI_TREE_OUTPUT_DIR') or (
+            os.path.join(os.path.dirname(os.path.dirname(script)), 'output')
+            if os.path.basename(os.path.dirname(script)) == 'code' else os.path.dirname(script))
+        before = _snapshot(output_dir)
+
+        os.makedirs(LOG_DIR, exist_ok=True)
+        self.jobs += 1
+        log_path = os.path.join(LOG_DIR, f'{self.jobs:05d}_{name}.log')
+        # A fork per job: scripts are free to mutate pyplot and module state,
+        # and the daemon stays as warm as it was
+        process = fork_context().Process(target=_run_job, args=(script, log_path, env,
+                                                                job.get('rc') or {}),
+                                         daemon=False)
+        sys.stdout.flush()
+        process.start()
+        process.join()
+
+        after = _snapshot(output_dir)
+        artifacts = sorted(path for path, mtime in after.items() if before.get(path) != mtime)
+        result = {'ok': process.exitcode == 0, 'approach': name, 'artifacts': artifacts,
+                  'seconds': round(time.time() - start, 3), 'log': log_path,
+                  'reloaded': reloaded}
+        if process.exitcode != 0:
+            with open(log_path, encoding='utf-8', errors='replace') as f:
+                result['error'] = ''.join(f.readlines()[-15:])
+        return result
+
+    def _output_path(self, path):
+        if self.output_root is None:
+            return os.path.join(os.path.abspath(path), '') if path.endswith(os.sep) else (
+                os.path.abspath(path))
+        resolved = os.path.realpath(os.path.join(self.output_root, path))
+        if os.path.commonpath([resolved, self.output_root]) != self.output_root:
+            raise ValueError(f"{path!r} is outside the daemon's output root {self.output_root}")
+        # A trailing separator marks a directory (AI_TREE_PROFILE)
+        return os.path.join(resolved, '') if path.endswith(os.sep) else resolved
+
+    def status(self):
+        return {'ok': True, 'pid': os.getpid(), 'uptime_s': round(time.time() - self.started, 1),
+                'jobs': self.jobs, 'approaches': list(SCRIPTS),
+                'backends': [m for m in BACKEND_MODULES if m in sys.modules]}
+
+
+def _snapshot(directory):
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            files[path] = os.stat(path).st_mtime_ns
+    return files
+
+
+def _run_job(script, log_path, env, rc):
+    """Forked job body: apply the job's settings, then run like build.py does"""
+    os.environ.update(env)
+    if rc:
+        import matplotlib
+        matplotlib.rcParams.update(rc)
+    # Jobs run one at a time, so each export pool gets every CPU
+    _run_approach(script, log_path, os.cpu_count() or 1)
+
+
+def handle(renderer, request):
+    """One request dict -> (response dict, keep serving?)"""
+    op = request.get('op', 'render')
+    try:
+        if op == 'render':
+            return renderer.render(request), True
+        if op == 'status':
+            return renderer.status(), True
+        if op == 'shutdown':
+            return {'ok': True}, False
+        return {'ok': False, 'error': f"Unknown op {op!r}"}, True
+    except Exception as e:
+        return {'ok': False, 'error': f"{type(e).__name__}: {e}"}, True
+
+
+def serve_unix(renderer, path):
+    import socketserver
+
+    state = {'serving': True}
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            # One JSON request per line, one JSON response per line
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    response, state['serving'] = handle(renderer, json.loads(line))
+                except ValueError as e:
+                    response = {'ok': False, 'error': f"Bad request: {e}"}
+                self.wfile.write(json.dumps(response).encode() + b'\n')
+                self.wfile.flush()
+                if not state['serving']:
+                    break
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.UnixStreamServer(path, Handler) as server:
+        print(f"🔥 Render daemon ready on {path}", flush=True)
+        try:
+            while state['serving']:
+                server.handle_request()
+        finally:
+            os.remove(path)
+
+
+def serve_http(renderer, port):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    state = {'serving': True}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, response):
+            body = json.dumps(response).encode()
+            self.send_response(200 if response.get('ok') else 400)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/status':
+                self._reply(renderer.status())
+            else:
+                self._reply({'ok': False, 'error': "GET /status, POST /render or /shutdown"})
+
+        def do_POST(self):
+            # Browsers send text/plain and form posts cross-origin without a
+            # preflight; only the client's application/json gets through
+            if self.headers.get_content_type() != 'application/json':
+                return self._reply({'ok': False, 'error': "POST bodies must be application/json"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                                     or b'{}')
+            except ValueError as e:
+                return self._reply({'ok': False, 'error': f"Bad request: {e}"})
+            request['op'] = self.path.strip('/') or 'render'
+            response, state['serving'] = handle(renderer, request)
+            self._reply(response)
+
+        def log_message(self, format, *args):
+            pass
+
+    # Localhost only: jobs run arbitrary approach scripts with arbitrary env
+    with HTTPServer(('127.0.0.1', port), Handler) as server:
+        print(f"🔥 Render daemon ready on http://127.0.0.1:{port}/", flush=True)
+        while state['serving']:
+            server.handle_request()
+
+
+# --- Client side -------------------------------------------------------------
+
+def request(message, socket_path=DEFAULT_SOCKET, url=None, timeout=None):
+    """Send one request dict to a running daemon and return its response"""
+    if url:
+        from urllib import request as urlrequest
+        from urllib.error import HTTPError
+
+        op = message.get('op', 'render')
+        req = urlrequest.Request(url.rstrip('/') + '/' + op, method='GET' if op == 'status' else 'POST',
+                                 data=None if op == 'status' else json.dumps(message).encode(),
+                                 headers={'Content-Type': 'application/json'})
+        try:
+            with urlrequest.urlopen(req, timeout=timeout) as response:
+                return json.load(response)
+        except HTTPError as e:
+            return json.load(e)
+
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def _pairs(items, parse=False):
+    pairs = {}
+    for item in items or ():
+        key, _, value = item.partition('=')
+        if parse:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        pairs[key] = value
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help="Unix socket path (default: .build_cache/render.sock)")
+    parser.add_argument('--url', help="talk to an HTTP daemon instead, e.g. http://127.0.0.1:8765")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="start the daemon (Unix socket unless --port)")
+    serve.add_argument('--port', type=int, help="serve HTTP on 127.0.0.1:PORT instead")
+    serve.add_argument('--output-root', default=DEFAULT_OUTPUT_ROOT,
+                       help="with --port, the directory jobs' outputs must be in "
+                            "(default: .build_cache/daemon_output/)")
+    render = commands.add_parser('render', help="render approaches through a running daemon")
+    render.add_argument('names', nargs='+', choices=sorted(SCRIPTS), metavar='NAME')
+    render.add_argument('--formats', help="e.g. png,svg (default: all)")
+    render.add_argument('--rc', action='append', metavar='KEY=VALUE',
+                        help="matplotlib rcParams override, e.g. font.family=serif")
+    render.add_argument('--env', action='append', metavar='KEY=VALUE',
+                        help="AI_TREE_* setting for this job, e.g. AI_TREE_SVG_PRECISION=2")
+    render.add_argument('--output-dir')
+    commands.add_parser('status', help="daemon uptime, jobs and loaded backends")
+    commands.add_parser('stop', help="shut the daemon down")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        renderer = Renderer(args.output_root if args.port else None)
+        start = time.time()
+        renderer.warm_up()
+        print(f"   Warmed up in {time.time() - start:.1f}s", flush=True)
+        if args.port:
+            serve_http(renderer, args.port)
+        else:
+            serve_unix(renderer, args.socket)
+        return 0
+
+    def send(message):
+        return request(message, args.socket, args.url)
+
+    if args.command == 'status':
+        print(json.dumps(send({'op': 'status'}), indent=1))
+        return 0
+    if args.command == 'stop':
+        send({'op': 'shutdown'})
+        print("✓ Daemon stopped")
+        return 0
+
+    failed = 0
+    for name in args.names:
+        result = send({'op': 'render', 'approach': name, 'formats': args.formats,
+                       'rc': _pairs(args.rc, parse=True), 'env': _pairs(args.env),
+                       'output_dir': args.output_dir})
+        if not result.get('ok'):
+            failed += 1
+            print(f"✗ {name} failed:\n{result.get('error')}")
+            continue
+        print(f"✓ {name} in {result['seconds']:.2f}s")
+        for path in result['artifacts']:
+            print(f"   {os.path.relpath(path)}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
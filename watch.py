@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Watch mode: re-render when the dataset changes
+Diffs the models on every save and re-renders only the approaches that use what changed, from a warm process
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+sys.path.insert(0, DATA_DIR)
+
+from build import APPROACHES, STATIC_FILES, FINAL_DIR, copy_final
+from render_daemon import SCRIPTS, Renderer
+
+VIEWER_DATA = 'ai_tree_data.json'
+# Everything a renderer can import from ai_models
+DATASET_SYMBOLS = ('AI_MODELS', 'COLOR_SCHEME', 'EXTINCTION_EVENTS', 'BREAKTHROUGHS')
+
+_AI_MODELS_IMPORT = re.compile(r'^\s*from\s+(?:data\.)?ai_models\s+import\s+(?:\(([^)]*)\)|([\w ,]+))',
+                               re.M)
+
+
+def used_symbols(script):
+    """Dataset names a script imports from ai_models"""
+    with open(os.path.join(ROOT, script), encoding='utf-8') as f:
+        text = f.read()
+    return {name.strip() for match in _AI_MODELS_IMPORT.finditer(text)
+            for name in (match.group(1) or match.group(2)).split(',')
+            if name.strip() in DATASET_SYMBOLS}
+
+
+def snapshot():
+    """The dataset as the renderers see it (ai_models, or AI_TREE_CATALOG)"""
+    import ai_models
+    return {name: getattr(ai_models, name) for name in DATASET_SYMBOLS}
+
+
+def diff_models(old, new):
+    """(added, removed, changed, reshaped) between two AI_MODELS lists;
+    changed maps a name to the fields that differ, reshaped is True when
+    a parent link changed (the only thing the angular layout depends on)"""
+    fields = ('name', 'parent', 'year', 'color', 'importance', 'branch_type', 'extinct')
+    old_by_name = {m[0]: m for m in old}
+    new_by_name = {m[0]: m for m in new}
+    added = [name for name in new_by_name if name not in old_by_name]
+    removed = [name for name in old_by_name if name not in new_by_name]
+    changed = {}
+    for name, model in new_by_name.items():
+        before = old_by_name.get(name)
+        if before is not None and tuple(before) != tuple(model):
+            changed[name] = [f for f, a, b in zip(fields, before, model) if a != b]
+    reshaped = bool(added or removed or any('parent' in f for f in changed.values())
+                    or [m[0] for m in old if m[0] in new_by_name] !=
+                    [m[0] for m in new if m[0] in old_by_name])
+    return added, removed, changed, reshaped
+
+
+def describe(added, removed, changed):
+    parts = []
+    for label, names in (('added', added), ('removed', removed)):
+        if names:
+            parts.append(f"{label} {', '.join(names[:5])}" + (' ...' if len(names) > 5 else ''))
+    for name, fields in list(changed.items())[:5]:
+        parts.append(f"{name} ({', '.join(fields)})")
+    if len(changed) > 5:
+        parts.append(f"{len(changed) - 5} more changed")
+    return '; '.join(parts)
+
+
+def affected(names, changed_symbols):
+    return [name for name in names if used_symbols(SCRIPTS[name]) & changed_symbols]
+
+
+def warm_index():
+    """Build the tree index in the watcher, so every forked render finds
+    it in tree_index's memo instead of rebuilding it"""
+    from ai_models import AI_MODELS
+    from model_store import ModelStore
+    from tree_index import TreeIndex
+
+    TreeIndex.from_store(ModelStore.from_records(AI_MODELS))
+    TreeIndex.from_models(AI_MODELS)
+
+
+def record_builds(names, failed, started):
+    """Build cache records for what was rendered, so build.py skips it"""
+    from build_cache import (BuildCache, files_written_since, render_params, script_output_dir,
+                             script_sources)
+
+    cache, params = BuildCache(), render_params()
+    for name in names:
+        script = os.path.join(ROOT, APPROACHES[name][0])
+        outputs = files_written_since(script_output_dir(script), started - 1)
+        if name not in failed and outputs:
+            cache.record(APPROACHES[name][0], cache.key(script_sources(script), params), outputs)
+
+
+def render(renderer, names, formats):
+    failed = []
+    for name in names:
+        result = renderer.render({'approach': name, 'formats': formats})
+        if not result['ok']:
+            failed.append(name)
+            print(f"   ✗ {name} failed (see {os.path.relpath(result['log'], ROOT)})")
+            continue
+        print(f"   ✓ {name} in {result['seconds']:.2f}s ({len(result['artifacts'])} files)")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(SCRIPTS), metavar='NAME',
+                        help=f"approaches to keep up to date (default: all of {', '.join(SCRIPTS)})")
+    parser.add_argument('--formats', help="e.g. svg for quick previews (default: all; "
+                                          "only full renders update final_output/)")
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help="seconds between checks (default: 0.5)")
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help="wait for the file to stop changing (default: 0.3s)")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(SCRIPTS)
+    catalog = os.environ.get('AI_TREE_CATALOG')
+    dataset_path = catalog or os.path.join(DATA_DIR, 'ai_models.py')
+    viewer_path = os.path.join(ROOT, STATIC_FILES[VIEWER_DATA])
+
+    print("🔥 Warming up...")
+    renderer = Renderer()
+    renderer.warm_up()
+    warm_index()
+    current = snapshot()
+    viewer = list(_viewer_models(viewer_path))
+    mtimes = {path: _mtime(path) for path in (dataset_path, viewer_path)}
+    print(f"👀 Watching {os.path.relpath(dataset_path, ROOT)} and "
+          f"{os.path.relpath(viewer_path, ROOT)} (Ctrl-C to stop)")
+
+    try:
+        while True:
+            time.sleep(args.interval)
+            edited = [path for path in mtimes if _mtime(path) != mtimes[path]]
+            if not edited:
+                continue
+            # Editors often save in several writes
+            while True:
+                time.sleep(args.debounce)
+                settled = {path: _mtime(path) for path in mtimes}
+                if all(settled[p] == _mtime(p) for p in mtimes):
+                    break
+            mtimes = settled
+
+            if viewer_path in edited:
+                try:
+                    models = list(_viewer_models(viewer_path))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠ {os.path.relpath(viewer_path, ROOT)} not readable yet: {e}")
+                else:
+                    added, removed, changed, _ = diff_models(viewer, models)
+                    viewer = models
+                    from build_cache import sync_file
+                    if sync_file(viewer_path, os.path.join(FINAL_DIR, VIEWER_DATA)):
+                        print(f"📝 Viewer data: {describe(added, removed, changed) or 'reformatted'}"
+                              f" -> final_output/{VIEWER_DATA}")
+
+            if dataset_path not in edited:
+                continue
+            try:
+                renderer.refresh({})
+                new = snapshot()
+            except Exception as e:
+                # Half-typed edits: keep the last good dataset and wait for the next save
+                print(f"⚠ {os.path.relpath(dataset_path, ROOT)} did not load: "
+                      f"{type(e).__name__}: {e}")
+                continue
+
+            changed_symbols = {name for name in DATASET_SYMBOLS if new[name] != current[name]}
+            if not changed_symbols:
+                print("   (no dataset change)")
+                continue
+            added, removed, changed, reshaped = diff_models(current['AI_MODELS'],
+                                                            new['AI_MODELS'])
+            current = new
+            print(f"📝 {', '.join(sorted(changed_symbols))} changed"
+                  + (f": {describe(added, removed, changed)}" if 'AI_MODELS' in changed_symbols
+                     else ''))
+            if reshaped:
+                print("   tree shape changed: one layout pass per approach")
+            warm_index()
+
+            targets = affected(names, changed_symbols)
+            started = time.time()
+            failed = render(renderer, targets, args.formats)
+            if not args.formats:
+                rendered = [name for name in targets if name in APPROACHES]
+                record_builds(rendered, failed, started)
+                copy_final(rendered, failed)
+            print(f"✨ {len(targets) - len(failed)}/{len(targets)} re-rendered in "
+                  f"{time.time() - started:.1f}s")
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+    return 0
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _viewer_models(path):
+    from catalog_io import iter_catalog
+    return iter_catalog(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())